@@ -0,0 +1,287 @@
+import os
+import json
+import threading
+import numpy as np
+
+
+def _kmeans(x, k, n_iter=20, seed=0):
+    """
+    Plain Lloyd's k-means on the rows of x. Empty clusters are re-seeded from random points.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    x_norms = np.einsum('ij,ij->i', x, x)
+    for _ in range(n_iter):
+        distances = x_norms[:, None] - 2 * (x @ centroids.T) + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+        assign = distances.argmin(axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest(x, centroids):
+    # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+    half_norms = 0.5 * np.einsum('ij,ij->i', centroids, centroids)
+    return np.argmax(x @ centroids.T - half_norms, axis=1)
+
+
+class IVFPQIndex:
+    """
+    Approximate nearest-neighbour index (inner product) over unit-normalized vectors.
+
+    Vectors are assigned to one of nlist coarse k-means cells (inverted file) and their
+    residual is product-quantized into m one-byte codes. A query scans only the nprobe
+    closest cells using per-subspace lookup tables; nprobe (and the optional exact
+    re-ranking of the best candidates) is the recall/latency knob.
+
+    With a folder, rows are appended to flat files as they are inserted and read back
+    through np.memmap, following the same layout idea as EmbeddingStore.
+    """
+    def __init__(self, dim, nlist=64, m=8, nbits=8, nprobe=8, folder=None):
+        if dim % m:
+            raise ValueError(f"dim ({dim}) must be divisible by m ({m})")
+        self.dim = int(dim)
+        self.nlist = int(nlist)
+        self.m = int(m)
+        self.ksub = 2 ** int(nbits)
+        self.nprobe = int(nprobe)
+        self.folder = folder
+        self._lock = threading.RLock()
+
+        self.centroids = None
+        self.codebooks = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._codes = np.zeros((0, self.m), dtype=np.uint8)
+        self._dead = np.zeros(0, dtype=bool)
+        self._id_rows = {}
+        self._postings = None
+
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            self._load()
+
+    # ------------------------------------------------------------------ persistence
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _load(self):
+        meta_path = self._path('meta.json')
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta['dim'] != self.dim or meta['m'] != self.m:
+            raise ValueError(f"ANN index at {self.folder} has dim={meta['dim']}, m={meta['m']}")
+        self.nlist = meta['nlist']
+        self.centroids = np.load(self._path('centroids.npy'))
+        self.codebooks = np.load(self._path('codebooks.npy'))
+        self._remap()
+
+        rows = len(self._ids)
+        self._dead = np.zeros(rows, dtype=bool)
+        if os.path.exists(self._path('deleted.bin')):
+            deleted = np.fromfile(self._path('deleted.bin'), dtype=np.int64)
+            self._dead[deleted[deleted < rows]] = True
+        self._id_rows = {int(i): row for row, i in enumerate(self._ids) if not self._dead[row]}
+
+    def _remap(self):
+        sizes = [os.path.getsize(self._path(name)) // itemsize if os.path.exists(self._path(name)) else 0
+                 for name, itemsize in (('ids.bin', 8), ('lists.bin', 4), ('codes.bin', self.m))]
+        rows = min(sizes)
+        if rows:
+            self._ids = np.memmap(self._path('ids.bin'), dtype=np.int64, mode='r', shape=(rows,))
+            self._lists = np.memmap(self._path('lists.bin'), dtype=np.int32, mode='r', shape=(rows,))
+            self._codes = np.memmap(self._path('codes.bin'), dtype=np.uint8, mode='r', shape=(rows, self.m))
+        self._postings = None
+
+    def _save_quantizers(self):
+        np.save(self._path('centroids.npy'), self.centroids)
+        np.save(self._path('codebooks.npy'), self.codebooks)
+        with open(self._path('meta.json'), 'w') as f:
+            json.dump({'dim': self.dim, 'nlist': self.nlist, 'm': self.m, 'ksub': int(self.codebooks.shape[1])}, f)
+        for name in ('ids.bin', 'lists.bin', 'codes.bin', 'deleted.bin'):
+            open(self._path(name), 'wb').close()
+
+    def _append_rows(self, ids, lists, codes):
+        if self.folder:
+            rows = len(self._ids)
+            for name, array in (('ids.bin', ids), ('lists.bin', lists), ('codes.bin', codes)):
+                with open(self._path(name), 'ab') as f:
+                    f.truncate(rows * array.itemsize * (self.m if name == 'codes.bin' else 1))
+                    f.write(np.ascontiguousarray(array).tobytes())
+            self._remap()
+        else:
+            self._ids = np.concatenate([self._ids, ids])
+            self._lists = np.concatenate([self._lists, lists])
+            self._codes = np.concatenate([self._codes, codes])
+            self._postings = None
+        self._dead = np.concatenate([self._dead, np.zeros(len(ids), dtype=bool)])
+
+    # ------------------------------------------------------------------ building
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def __len__(self):
+        return len(self._id_rows)
+
+    def train(self, vectors, n_iter=20, seed=0, max_points=None):
+        """
+        Learns the coarse cells and PQ codebooks from a sample of vectors.
+        Training resets the index contents.
+        """
+        max_points = max_points or 256 * max(self.nlist, self.ksub // 4)
+        if len(vectors) > max_points:
+            sample = np.sort(np.random.default_rng(seed).choice(len(vectors), max_points, replace=False))
+            vectors = vectors[sample]
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            nlist = min(self.nlist, len(vectors))
+            centroids = _kmeans(vectors, nlist, n_iter, seed)
+            residuals = vectors - centroids[_nearest(vectors, centroids)]
+            ksub = min(self.ksub, len(vectors))
+            dsub = self.dim // self.m
+            codebooks = np.stack([
+                _kmeans(np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub]), ksub, n_iter, seed + j)
+                for j in range(self.m)
+            ])
+
+            self.nlist = nlist
+            self.centroids = centroids.astype(np.float32)
+            self.codebooks = codebooks.astype(np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._lists = np.zeros(0, dtype=np.int32)
+            self._codes = np.zeros((0, self.m), dtype=np.uint8)
+            self._dead = np.zeros(0, dtype=bool)
+            self._id_rows = {}
+            self._postings = None
+            if self.folder:
+                self._save_quantizers()
+
+    def _encode(self, vectors):
+        lists = _nearest(vectors, self.centroids).astype(np.int32)
+        residuals = vectors - self.centroids[lists]
+        dsub = self.dim // self.m
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub]), self.codebooks[j])
+        return lists, codes
+
+    def add(self, ids, vectors):
+        """
+        Inserts vectors under integer ids. Ids that are already present are skipped.
+        """
+        if not self.is_trained:
+            raise RuntimeError("IVFPQIndex must be trained before adding vectors")
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            fresh = np.array([int(i) not in self._id_rows for i in ids], dtype=bool)
+            if not fresh.any():
+                return
+            ids, vectors = ids[fresh], vectors[fresh]
+            lists, codes = self._encode(vectors)
+            start = len(self._ids)
+            self._append_rows(ids, lists, codes)
+            for offset, i in enumerate(ids):
+                self._id_rows[int(i)] = start + offset
+
+    def delete(self, ids):
+        """
+        Removes ids from search results (tombstoned; space is reclaimed by compact()).
+        """
+        with self._lock:
+            rows = [self._id_rows.pop(int(i)) for i in ids if int(i) in self._id_rows]
+            if not rows:
+                return
+            self._dead[rows] = True
+            if self.folder:
+                with open(self._path('deleted.bin'), 'ab') as f:
+                    f.write(np.asarray(rows, dtype=np.int64).tobytes())
+
+    def compact(self):
+        """
+        Rewrites the index without tombstoned rows.
+        """
+        with self._lock:
+            alive = ~self._dead
+            ids, lists, codes = np.array(self._ids[alive]), np.array(self._lists[alive]), np.array(self._codes[alive])
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._lists = np.zeros(0, dtype=np.int32)
+            self._codes = np.zeros((0, self.m), dtype=np.uint8)
+            if self.folder:
+                self._save_quantizers()
+            self._dead = np.zeros(0, dtype=bool)
+            self._append_rows(ids, lists, codes)
+            self._id_rows = {int(i): row for row, i in enumerate(ids)}
+
+    # ------------------------------------------------------------------ search
+    def _get_postings(self):
+        if self._postings is None:
+            order = np.argsort(self._lists, kind='stable')
+            bounds = np.searchsorted(self._lists[order], np.arange(self.nlist + 1))
+            self._postings = (order, bounds)
+        return self._postings
+
+    def search(self, query, k, nprobe=None, allowed_ids=None, refine=None, refine_factor=4):
+        """
+        Returns (ids, scores) of the approximate top-k inner products, best first.
+
+        nprobe: number of coarse cells scanned (higher = better recall, slower).
+        allowed_ids: optional iterable restricting results to these ids.
+        refine: optional callable ids -> exact vectors; the best k * refine_factor
+                candidates are then re-scored exactly.
+        """
+        if not self.is_trained or not len(self._ids):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        with self._lock:
+            order, bounds = self._get_postings()
+            coarse = self.centroids @ query
+            probed = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+            rows = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probed])
+            rows = rows[~self._dead[rows]]
+            ids = np.asarray(self._ids[rows])
+            if allowed_ids is not None:
+                keep = np.isin(ids, np.fromiter(allowed_ids, dtype=np.int64))
+                rows, ids = rows[keep], ids[keep]
+            if not len(rows):
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+            dsub = self.dim // self.m
+            tables = np.einsum('jkd,jd->jk', self.codebooks, query.reshape(self.m, dsub))
+            codes = np.asarray(self._codes[rows])
+            scores = coarse[np.asarray(self._lists[rows])] + tables[np.arange(self.m), codes].sum(axis=1)
+
+        if refine is not None:
+            keep = min(len(ids), k * refine_factor)
+            best = np.argpartition(-scores, keep - 1)[:keep]
+            ids = ids[best]
+            scores = np.asarray(refine(ids), dtype=np.float32) @ query
+
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return ids[top], scores[top]
+
+
+def exact_top_k(vectors, query, k):
+    """
+    Brute-force top-k inner products; the reference for recall measurements.
+    """
+    scores = np.asarray(vectors, dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+    k = min(k, len(scores))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64), scores[:0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
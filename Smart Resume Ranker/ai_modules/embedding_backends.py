@@ -0,0 +1,85 @@
+import numpy as np
+
+# Available CPU inference backends for the sentence embedding model:
+#   torch - fp32 PyTorch (reference)
+#   int8  - PyTorch with dynamic int8 quantization of every nn.Linear layer
+#   onnx  - exported ONNX graph run by onnxruntime (sentence-transformers >= 3.2 with optimum)
+BACKENDS = ('torch', 'int8', 'onnx')
+
+# Small resume/JD-style reference set for calibration checks
+REFERENCE_TEXTS = [
+    "Senior Python developer with Django, Flask and PostgreSQL experience",
+    "Data analyst skilled in SQL, Tableau and Power BI dashboards",
+    "Frontend engineer building React and TypeScript single page applications",
+    "Registered nurse with five years of clinical patient care",
+    "Marketing manager leading brand strategy and social media campaigns",
+    "Machine learning engineer deploying scikit-learn and PyTorch models",
+    "DevOps engineer automating AWS infrastructure with Docker and Kubernetes",
+    "Accountant experienced in audit, tax preparation and financial reporting",
+    "Project manager coordinating agile teams and stakeholder communication",
+    "Java backend developer designing REST APIs and microservices",
+]
+REFERENCE_QUERIES = [
+    "Looking for a Python backend engineer",
+    "Hiring a data analyst with strong SQL",
+    "Healthcare role requiring patient care experience",
+]
+
+
+def load_encoder(snapshot_path, backend='torch'):
+    """
+    Loads the SentenceTransformer at snapshot_path on CPU with the requested backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from {', '.join(BACKENDS)}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'onnx':
+        # Exports the graph locally on first use when the snapshot ships no onnx/ folder
+        return SentenceTransformer(snapshot_path, device='cpu', backend='onnx')
+
+    model = SentenceTransformer(snapshot_path, device='cpu')
+    if backend == 'int8':
+        import torch
+        model.eval()
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def encode_normalized(model, texts, batch_size=32):
+    embeddings = model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def compare_embeddings(cand_texts, ref_texts, cand_queries, ref_queries):
+    """
+    Agreement between two encoders given their unit-normalized embeddings of the
+    same texts and queries: per-text cosine agreement and query-vs-text score agreement.
+    """
+    agreement = np.sum(cand_texts * ref_texts, axis=1)
+    cand_scores = (cand_queries @ cand_texts.T * 100).ravel()
+    ref_scores = (ref_queries @ ref_texts.T * 100).ravel()
+    correlation = np.corrcoef(cand_scores, ref_scores)[0, 1] if len(ref_scores) > 1 else 1.0
+
+    return {
+        'texts': len(ref_texts),
+        'mean_cosine_agreement': round(float(np.mean(agreement)), 4),
+        'min_cosine_agreement': round(float(np.min(agreement)), 4),
+        'max_score_diff': round(float(np.max(np.abs(cand_scores - ref_scores))), 2),
+        'score_correlation': round(float(0.0 if np.isnan(correlation) else correlation), 4)
+    }
+
+
+def calibration_report(candidate, reference, texts=None, queries=None, batch_size=32):
+    """
+    Compares a candidate encoder against the fp32 reference on a reference set.
+    """
+    texts = texts or REFERENCE_TEXTS
+    queries = queries or REFERENCE_QUERIES
+    return compare_embeddings(
+        encode_normalized(candidate, texts, batch_size),
+        encode_normalized(reference, texts, batch_size),
+        encode_normalized(candidate, queries, batch_size),
+        encode_normalized(reference, queries, batch_size)
+    )
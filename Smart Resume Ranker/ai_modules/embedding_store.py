@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Append-only, memory-mapped embedding matrix on disk keyed by document content hash.
+
+    Layout of the store folder:
+        embeddings.bin  raw row-major matrix (rows x dim) in the store dtype
+        hashes.bin      16-byte content digest per row, in row order
+        meta.json       dim and dtype of the matrix
+    """
+    HASH_BYTES = 16
+
+    def __init__(self, folder, dim, dtype='float16'):
+        self.folder = folder
+        self.dim = int(dim)
+        self.dtype = np.dtype(dtype)
+        self.matrix_path = os.path.join(folder, 'embeddings.bin')
+        self.index_path = os.path.join(folder, 'hashes.bin')
+        self.meta_path = os.path.join(folder, 'meta.json')
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+        self._check_meta()
+        self._load()
+
+    @staticmethod
+    def content_hash(text):
+        """
+        Compact digest used as the store key for a document.
+        """
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=EmbeddingStore.HASH_BYTES).digest()
+
+    def _check_meta(self):
+        meta = {'dim': self.dim, 'dtype': self.dtype.name}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(f"Embedding store at {self.folder} holds {stored}, expected {meta}")
+        else:
+            with open(self.meta_path, 'w') as f:
+                json.dump(meta, f)
+
+    def _load(self):
+        hashes = []
+        if os.path.exists(self.index_path):
+            # Sliced by hand: numpy's S dtype would strip trailing zero bytes from digests
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            size = self.HASH_BYTES
+            hashes = [data[i:i + size] for i in range(0, len(data) - len(data) % size, size)]
+
+        # Vectors are written before their hashes, so a crash mid-append can only leave
+        # trailing matrix bytes without an index entry, or a partial digest; both are ignored
+        # here and truncated away by the next append
+        row_bytes = self.dim * self.dtype.itemsize
+        matrix_rows = os.path.getsize(self.matrix_path) // row_bytes if os.path.exists(self.matrix_path) else 0
+        rows = min(len(hashes), matrix_rows)
+
+        self._hashes = list(hashes[:rows])
+        self._index = {h: row for row, h in enumerate(self._hashes)}
+        self._rows = rows
+        self._remap()
+
+    def _remap(self):
+        if self._rows:
+            self._matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode='r', shape=(self._rows, self.dim))
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=self.dtype)
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, content_hash):
+        return content_hash in self._index
+
+    def lookup(self, content_hashes):
+        """
+        Returns the row number of each hash, or -1 where it is not stored.
+        """
+        return np.array([self._index.get(h, -1) for h in content_hashes], dtype=np.int64)
+
+    def hashes_at(self, rows):
+        """
+        Content hashes stored at the given rows.
+        """
+        return [self._hashes[row] for row in rows]
+
+    def get(self, content_hash):
+        """
+        Returns a read-only view of the stored vector (no copy), or None.
+        """
+        row = self._index.get(content_hash)
+        return None if row is None else self._matrix[row]
+
+    def vectors(self, rows):
+        """
+        Returns the stored vectors for the given rows. A slice returns a zero-copy view.
+        """
+        return self._matrix[rows]
+
+    def add_many(self, content_hashes, vectors):
+        """
+        Appends a batch of vectors in one write. Hashes that are already stored are skipped.
+        Returns the row number of every input hash.
+        """
+        vectors = np.asarray(vectors)
+        with self._lock:
+            new_rows = []
+            pending = {}
+            for i, h in enumerate(content_hashes):
+                if h not in self._index and h not in pending:
+                    pending[h] = self._rows + len(new_rows)
+                    new_rows.append(i)
+
+            if new_rows:
+                batch = np.ascontiguousarray(vectors[new_rows], dtype=self.dtype)
+                with open(self.matrix_path, 'ab') as f:
+                    # Drop any orphaned bytes from an interrupted append first
+                    f.truncate(self._rows * self.dim * self.dtype.itemsize)
+                    f.write(batch.tobytes())
+                with open(self.index_path, 'ab') as f:
+                    f.truncate(self._rows * self.HASH_BYTES)
+                    f.write(b''.join(content_hashes[i] for i in new_rows))
+
+                self._index.update(pending)
+                self._hashes.extend(content_hashes[i] for i in new_rows)
+                self._rows += len(new_rows)
+                self._remap()
+
+            return self.lookup(content_hashes)
+
+    def scores(self, query_vector, rows=None):
+        """
+        Dot product of the query against stored rows (all rows by default).
+        With unit-normalized embeddings this is the cosine similarity.
+        """
+        matrix = self._matrix if rows is None else self._matrix[rows]
+        if len(matrix) == 0:
+            return np.zeros(0, dtype=np.float32)
+        return matrix.astype(np.float32, copy=False) @ np.asarray(query_vector, dtype=np.float32)
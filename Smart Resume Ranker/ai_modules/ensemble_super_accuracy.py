@@ -1,13 +1,26 @@
-from .neural_embeddings import NeuralEmbeddingRanker
-from .knowledge_graph import KnowledgeGraphMatcher
-from .genetic_algorithm import GAOptimizer
 import numpy as np
 
 class SuperAccuracyEnsemble:
-    def __init__(self):
-        self.neural_ranker = NeuralEmbeddingRanker()
-        self.graph_matcher = KnowledgeGraphMatcher()
-        self.ga_optimizer = GAOptimizer()
+    def __init__(self, registry=None):
+        """
+        Components are shared through the model registry instead of being built per ensemble.
+        """
+        if registry is None:
+            from .model_registry import default_registry
+            registry = default_registry
+        self.registry = registry
+
+    @property
+    def neural_ranker(self):
+        return self.registry.get('neural')
+
+    @property
+    def graph_matcher(self):
+        return self.registry.get('knowledge_graph')
+
+    @property
+    def ga_optimizer(self):
+        return self.registry.get('ga_optimizer')
     
     def _calculate_synergy_bonus(self, score1, score2):
         """Enhanced synergy calculation using correlation analysis"""
@@ -67,9 +80,10 @@ class SuperAccuracyEnsemble:
         confidence = (length_score * 0.4 + diversity_score * 0.3 + structure_score * 0.3)
         return 1.0 + (confidence * 0.2)  # Up to 1.2x multiplier
 
-    def get_super_accuracy_score(self, job_desc, resume_text):
-        # Individual algorithm scores
-        neural_score = self.neural_ranker.get_semantic_score(job_desc, resume_text)
+    def get_super_accuracy_score(self, job_desc, resume_text, neural_score=None):
+        # Individual algorithm scores (neural may be precomputed by a batched encode)
+        if neural_score is None:
+            neural_score = self.neural_ranker.get_semantic_score(job_desc, resume_text)
         graph_score = self.graph_matcher.graph_similarity(job_desc, resume_text)
         
         # GA-optimized base combination (Simulated optimization for this specific pair)
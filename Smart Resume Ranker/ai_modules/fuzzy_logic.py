@@ -1,13 +1,92 @@
+import numpy as np
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
+from fuzzywuzzy import utils as fuzz_utils
+from Levenshtein import ratio as levenshtein_ratio
+from .ngram_index import NGramIndex, PhraseGrams
+from utils.memory_budget import BudgetedCache
+
+# rapidfuzz (installed with python-Levenshtein) scores whole batches in C without the GIL
+try:
+    from rapidfuzz.process import cpdist
+    from rapidfuzz.distance import Indel
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
 
 class FuzzyResumeScorer:
-    def __init__(self, skill_database=None, match_threshold=80):
+    def __init__(self, skill_database=None, match_threshold=80, workers=1, thorough_matching=False):
         """
         Initialize with an optional skill database and match threshold.
+        workers: threads used to score a batch when rapidfuzz is available (-1 = all cores).
+        A skill matches when fuzz.partial_ratio of the lowercased skill and text is above the
+        threshold. With thorough_matching, it matches when any window of the text does; this
+        also finds skills that partial_ratio's block heuristic misses in long texts.
         """
         self.skill_database = skill_database if skill_database else []
         self.match_threshold = match_threshold
+        self.workers = workers
+        self.thorough_matching = thorough_matching
+        # Compiled skill lists, per-document n-gram indexes and token sets, reused across calls
+        # and sized against the process-wide memory budget
+        self._phrase_cache = BudgetedCache('fuzzy_phrases', max_entries=16)
+        self._index_cache = BudgetedCache('fuzzy_indexes', max_entries=16)
+        self._token_cache = BudgetedCache('fuzzy_tokens', max_entries=1024)
+
+    @staticmethod
+    def _token_set(text):
+        """
+        Unique tokens of the text after fuzzywuzzy's full_process, sorted and pre-joined.
+        """
+        return _SortedTokens(fuzz_utils.full_process(text, force_ascii=True).split())
+
+    def _tokens(self, text):
+        return self._token_cache.get_or_build(text, self._token_set)
+
+    @staticmethod
+    def _token_set_pairs(job_tokens, resume_tokens):
+        """
+        The three string pairs fuzz.token_set_ratio compares, built from pre-sorted token lists.
+        """
+        intersection = job_tokens.set & resume_tokens.set
+        sorted_sect = " ".join(sorted(intersection))
+        sorted_1to2 = job_tokens.join_without(intersection)
+        sorted_2to1 = resume_tokens.join_without(intersection)
+        combined_1to2 = (sorted_sect + " " + sorted_1to2).strip()
+        combined_2to1 = (sorted_sect + " " + sorted_2to1).strip()
+        return [(sorted_sect, combined_1to2), (sorted_sect, combined_2to1), (combined_1to2, combined_2to1)]
+
+    def _ratios(self, pairs):
+        """
+        fuzz.ratio for every (a, b) pair.
+        """
+        if not pairs:
+            return []
+        if RAPIDFUZZ_AVAILABLE:
+            # float64 keeps the rounding identical to fuzz.ratio
+            similarity = cpdist([a for a, _ in pairs], [b for _, b in pairs],
+                                scorer=Indel.normalized_similarity, workers=self.workers, dtype=np.float64)
+            return [int(round(100 * value)) for value in similarity.tolist()]
+        return [fuzz.ratio(a, b) for a, b in pairs]
+
+    def _fuzzy_matches(self, skills, text):
+        """
+        Whether each skill fuzzily appears in the text (partial ratio above the threshold),
+        shortlisted through the n-gram candidate index instead of aligning every skill
+        against the full text.
+        """
+        phrases = self._phrase_cache.get_or_build(tuple(skills), PhraseGrams)
+        index = self._index_cache.get_or_build(text, NGramIndex)
+        scores = index.partial_ratios(phrases, score_cutoff=self.match_threshold)
+        if self.thorough_matching:
+            return [score > self.match_threshold for score in scores]
+        # The index scores the best of all windows, an upper bound of partial_ratio, which only
+        # tries some of them: only the skills it passes need the exact check (both lowercased)
+        return [
+            (score > self.match_threshold or len(phrase) > len(index.text)) and
+            fuzz.partial_ratio(phrase, index.text) > self.match_threshold
+            for phrase, score in zip(phrases.phrases, scores)
+        ]
 
     def extract_skills(self, text):
         """
@@ -17,11 +96,8 @@ class FuzzyResumeScorer:
             # Fallback to simple keyword extraction if no database is provided
             return set(text.lower().split())
 
-        extracted_skills = set()
-        for skill in self.skill_database:
-            if fuzz.partial_ratio(skill.lower(), text.lower()) > self.match_threshold:
-                extracted_skills.add(skill)
-        return extracted_skills
+        found = self._fuzzy_matches(self.skill_database, text)
+        return {skill for skill, match in zip(self.skill_database, found) if match}
 
     def calculate_fuzzy_score(self, job_desc_text, resume_text):
         """
@@ -30,13 +106,8 @@ class FuzzyResumeScorer:
         if not job_desc_text or not resume_text:
             return 0.0
 
-        try:
-            # Token set ratio for better overlap comparison
-            score = fuzz.token_set_ratio(job_desc_text, resume_text)
-            return score
-        except Exception as e:
-            print(f"Error in Fuzzy Score Calculation: {e}")
-            return 0.0
+        # Token set ratio for better overlap comparison
+        return self.calculate_batch_fuzzy_scores(job_desc_text, [resume_text])[0]
 
     def match_skills(self, job_skills, resume_text):
         """
@@ -44,31 +115,93 @@ class FuzzyResumeScorer:
         """
         matched = []
         missing = []
-        resume_lower = resume_text.lower()
-
-        for skill in job_skills:
-            try:
-                # Use partial ratio to find skill in text
-                if fuzz.partial_ratio(skill.lower(), resume_lower) > self.match_threshold:
-                    matched.append(skill)
-                else:
-                    missing.append(skill)
-            except Exception as e:
-                print(f"Error matching skill '{skill}': {e}")
+
+        try:
+            found = self._fuzzy_matches(job_skills, resume_text)
+        except Exception as e:
+            print(f"Error matching skills: {e}")
+            return matched, missing
+
+        for skill, match in zip(job_skills, found):
+            if match:
+                matched.append(skill)
+            else:
+                missing.append(skill)
 
         return matched, missing
 
     def calculate_batch_fuzzy_scores(self, job_desc_text, resumes):
         """
         Calculates fuzzy scores for a job description against multiple resumes.
-        Returns a list of scores.
+        Returns a list of scores, identical to fuzz.token_set_ratio for each resume.
+
+        The job description is tokenized and sorted once, resume token sets come from a
+        cache, and all ratios of the batch are evaluated in one call.
         """
         if not job_desc_text or not resumes:
             return [0.0] * len(resumes)
 
         try:
-            scores = [self.calculate_fuzzy_score(job_desc_text, resume) for resume in resumes]
+            job_tokens = self._tokens(job_desc_text)
+            scores = [0.0] * len(resumes)
+            pairs, owners = [], []
+            for i, resume in enumerate(resumes):
+                if not resume:
+                    continue
+                resume_tokens = self._tokens(resume)
+                if not job_tokens or not resume_tokens:
+                    scores[i] = 0
+                    continue
+                pairs.extend(self._token_set_pairs(job_tokens, resume_tokens))
+                owners.append(i)
+
+            ratios = self._ratios(pairs)
+            for n, i in enumerate(owners):
+                scores[i] = max(ratios[3 * n:3 * n + 3])
             return scores
         except Exception as e:
             print(f"Error in Batch Fuzzy Score Calculation: {e}")
             return [0.0] * len(resumes)
+
+
+class _SortedTokens:
+    """
+    A document's unique tokens in sorted order, joined once with single spaces so the
+    tokens left after removing a (small) subset can be re-joined from string slices.
+    """
+    def __init__(self, tokens):
+        self.set = set(tokens)
+        self.sorted = sorted(self.set)
+        self.joined = " ".join(self.sorted)
+        self.rank = {token: i for i, token in enumerate(self.sorted)}
+        self.starts = []
+        position = 0
+        for token in self.sorted:
+            self.starts.append(position)
+            position += len(token) + 1
+
+    def __bool__(self):
+        return bool(self.set)
+
+    @property
+    def nbytes(self):
+        # Token strings shared by the set, list and rank dict, plus ~190 bytes of
+        # container slots and offsets per token (measured)
+        return 190 * len(self.sorted) + 2 * len(self.joined)
+
+    def join_without(self, removed):
+        """
+        Same as " ".join(t for t in self.sorted if t not in removed).
+        """
+        if not removed:
+            return self.joined
+        pieces = []
+        kept_from = 0
+        for rank in sorted(self.rank[token] for token in removed):
+            if rank > kept_from:
+                # Tokens kept_from .. rank - 1 are contiguous in the joined string
+                pieces.append(self.joined[self.starts[kept_from]:self.starts[rank] - 1])
+            kept_from = rank + 1
+        if kept_from < len(self.sorted):
+            pieces.append(self.joined[self.starts[kept_from]:])
+        return " ".join(pieces)
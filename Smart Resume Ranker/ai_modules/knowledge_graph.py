@@ -1,56 +1,116 @@
-import random
-import networkx as nx
+import numpy as np
+from scipy import sparse
+from .skill_ontology import load_skill_ontology
+from utils.memory_budget import BudgetedCache
+
+# Stored hop count of unconnected skill pairs in the dense distance matrix
+UNREACHABLE = np.iinfo(np.uint16).max
 
 class KnowledgeGraphMatcher:
-    def __init__(self):
-        # Mock Knowledge Graph connections
-        self.related_skills = {
-            'python': ['django', 'flask', 'pandas', 'numpy', 'scikit-learn'],
-            'javascript': ['react', 'node', 'vue', 'angular', 'typescript'],
-            'data': ['sql', 'analysis', 'visualization', 'tableau', 'powerbi']
-        }
-        self.graph = nx.Graph()
-        self._build_knowledge_graph()
-
-    def _build_knowledge_graph(self):
-        """
-        Builds a knowledge graph of related skills.
-        """
-        skills = {
-            'python': ['django', 'flask', 'pandas', 'numpy', 'scikit-learn'],
-            'javascript': ['react', 'node', 'vue', 'angular', 'typescript'],
-            'data': ['sql', 'analysis', 'visualization', 'tableau', 'powerbi']
-        }
-        for main_skill, related_skills in skills.items():
-            self.graph.add_node(main_skill, type='skill')
-            for related_skill in related_skills:
-                self.graph.add_node(related_skill, type='skill')
-                self.graph.add_edge(main_skill, related_skill)
+    def __init__(self, registry=None, ontology=None, dense_limit=1024, max_distance=4, row_cache_size=1024):
+        # The skill ontology is shared through the registry when one is attached
+        self.registry = registry
+        self._ontology = ontology
+        # Ontologies up to dense_limit skills get a full hop count matrix (uint16, 2 MB at
+        # 1024 skills); for larger ones the rows of job skills are computed on demand by BFS
+        # bounded at max_distance hops
+        self.dense_limit = min(dense_limit, UNREACHABLE - 1)
+        self.max_distance = max_distance
+        self.row_cache_size = row_cache_size
+        self._rows = BudgetedCache('knowledge_rows', max_entries=row_cache_size)
+        self.compile()
+
+    @property
+    def ontology(self):
+        if self._ontology is None:
+            self._ontology = self.registry.get('skill_ontology') if self.registry is not None else load_skill_ontology()
+        return self._ontology
+
+    @property
+    def skill_names(self):
+        return self.ontology.skill_names
+
+    def compile(self):
+        """
+        Precomputes the pairwise shortest path lengths behind the similarity
+        1 / (1 + shortest path length), 0 for unconnected skills. Call again after
+        swapping the ontology.
+        """
+        ontology = self.ontology
+        n = len(ontology)
+        self._rows.clear()
+        if n <= self.dense_limit:
+            adjacency = sparse.csr_matrix(
+                (np.ones(len(ontology.indices)), ontology.indices, ontology.indptr), shape=(n, n)
+            )
+            distances = sparse.csgraph.shortest_path(adjacency, unweighted=True, directed=False)
+            distances[np.isinf(distances)] = UNREACHABLE
+            self.distances = distances.astype(np.uint16)
+        else:
+            self.distances = None
+
+    def _similarity_rows(self, skill_ids):
+        """
+        Similarity of the given skills to every skill in the ontology, as a (len, n) array.
+        """
+        if self.distances is not None:
+            distances = self.distances[skill_ids].astype(np.float64)
+            return np.where(distances == UNREACHABLE, 0.0, 1 / (1 + distances))
+
+        rows = np.zeros((len(skill_ids), len(self.ontology)))
+        for i, skill_id in enumerate(skill_ids):
+            ids, similarities = self._rows.get_or_build(int(skill_id), self._bfs_row)
+            rows[i, ids] = similarities
+        return rows
+
+    def _bfs_row(self, skill_id):
+        ids, distances = self.ontology.bfs_distances(skill_id, self.max_distance)
+        return ids, 1 / (1 + distances)
 
     def graph_similarity(self, job_desc, resume_text):
         """
         Calculates similarity based on skill relationships in the knowledge graph.
         """
-        job_skills = self._extract_skills(job_desc)
-        resume_skills = self._extract_skills(resume_text)
-        
-        if not job_skills or not resume_skills:
+        job_ids = self._skill_ids(job_desc)
+        resume_ids = self._skill_ids(resume_text)
+
+        if not len(job_ids) or not len(resume_ids):
             return 0.0
-        
-        total_similarity = 0
-        for job_skill in job_skills:
-            for resume_skill in resume_skills:
-                if self.graph.has_node(job_skill) and self.graph.has_node(resume_skill):
-                    try:
-                        path_length = nx.shortest_path_length(self.graph, source=job_skill, target=resume_skill)
-                        total_similarity += 1 / (1 + path_length)
-                    except nx.NetworkXNoPath:
-                        continue
-        
-        return min(total_similarity * 20, 100.0)
+
+        total_similarity = self._similarity_rows(job_ids)[:, resume_ids].sum()
+        return min(float(total_similarity) * 20, 100.0)
+
+    def batch_graph_similarity(self, job_desc, resume_texts):
+        """
+        graph_similarity for many resumes at once: a resume x skill indicator matrix
+        multiplied by the similarity of every skill to the job's skills.
+        """
+        job_ids = self._skill_ids(job_desc)
+        if not len(job_ids) or not resume_texts:
+            return [0.0] * len(resume_texts)
+
+        indicator = self._indicator_matrix(resume_texts)
+        job_affinity = self._similarity_rows(job_ids).sum(axis=0)
+        totals = indicator @ job_affinity
+        return [min(float(total) * 20, 100.0) for total in totals]
+
+    def _indicator_matrix(self, texts):
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            ids = self._skill_ids(text)
+            rows.extend([row] * len(ids))
+            cols.extend(ids)
+        data = np.ones(len(rows), dtype=np.float64)
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(texts), len(self.skill_names)))
+
+    def _skill_ids(self, text):
+        """
+        Ids of the knowledge graph skills mentioned in the text.
+        """
+        return self.ontology.lookup(text)
 
     def _extract_skills(self, text):
         """
         Extracts skills from text based on the knowledge graph nodes.
         """
-        return {node for node in self.graph.nodes if node in text.lower()}
+        return {self.skill_names[i] for i in self._skill_ids(text)}
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import psutil
+
+from .cosine_similarity import CosineSimilarity
+from .fuzzy_logic import FuzzyResumeScorer
+from .genetic_algorithm import GAOptimizer
+from .persona_matching import PersonaMatcher
+from .career_predictor import CareerPredictor
+from .skill_gap_analyzer import SkillGapAnalyzer
+from .experience_transfer import ExperienceTransfer
+from .innovation_scorer import InnovationScorer
+from .neural_embeddings import NeuralEmbeddingRanker
+from .knowledge_graph import KnowledgeGraphMatcher
+from .skill_ontology import load_skill_ontology
+from .near_duplicates import NearDuplicateIndex
+from .ensemble_super_accuracy import SuperAccuracyEnsemble
+from .score_cache import ScoreCache
+from utils.config import Config
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of scoring components.
+    Each component is built lazily on first use and then shared by every caller.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """
+        Registers a zero-argument factory under the given name.
+        Re-registering drops any instance built by the previous factory.
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._stats.pop(name, None)
+
+    def get(self, name):
+        """
+        Returns the shared instance for a component, constructing it on first access.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have finished loading while we waited for the lock
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            if name not in self._factories:
+                raise KeyError(f"Unknown model component: '{name}'")
+
+            start_rss = psutil.Process().memory_info().rss
+            start_time = time.perf_counter()
+            instance = self._factories[name]()
+            load_time = time.perf_counter() - start_time
+            end_rss = psutil.Process().memory_info().rss
+
+            self._instances[name] = instance
+            self._stats[name] = {
+                'load_time_sec': round(load_time, 4),
+                'memory_mb': round(max(end_rss - start_rss, 0) / (1024 * 1024), 2)
+            }
+            return instance
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def get_stats(self):
+        """
+        Returns load status, load time and memory delta for every registered component.
+        """
+        with self._lock:
+            stats = {}
+            for name in self._factories:
+                entry = {'loaded': name in self._instances, 'load_time_sec': 0.0, 'memory_mb': 0.0}
+                entry.update(self._stats.get(name, {}))
+                stats[name] = entry
+            return stats
+
+    def reset(self):
+        """
+        Drops all constructed instances (factories stay registered).
+        """
+        with self._lock:
+            self._instances.clear()
+            self._stats.clear()
+
+
+def _build_default_registry():
+    registry = ModelRegistry()
+    registry.register('cosine', CosineSimilarity)
+    registry.register('fuzzy', FuzzyResumeScorer)
+    registry.register('ga_optimizer', GAOptimizer)
+    registry.register('persona', PersonaMatcher)
+    registry.register('career', CareerPredictor)
+    registry.register('skill_gap', lambda: SkillGapAnalyzer(registry=registry))
+    registry.register('transfer', ExperienceTransfer)
+    registry.register('innovation', InnovationScorer)
+    registry.register('neural', lambda: NeuralEmbeddingRanker(
+        batch_size=Config.NEURAL_BATCH_SIZE, num_threads=Config.NEURAL_NUM_THREADS
+    ))
+    registry.register('skill_ontology', load_skill_ontology)
+    registry.register('knowledge_graph', lambda: KnowledgeGraphMatcher(registry=registry))
+    registry.register('near_duplicates', lambda: NearDuplicateIndex(
+        threshold=Config.NEAR_DUPLICATE_THRESHOLD, folder=os.path.join(Config.CACHE_FOLDER, 'near_duplicates'),
+        retention_days=Config.RESULT_RETENTION_DAYS, max_entries=Config.NEAR_DUPLICATE_MAX_ENTRIES
+    ))
+    registry.register('ensemble', lambda: SuperAccuracyEnsemble(registry=registry))
+    registry.register('score_cache', lambda: ScoreCache(
+        path=Config.SCORE_CACHE_DB or None,
+        memory_bytes=int(Config.SCORE_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_bytes=int(Config.SCORE_CACHE_DISK_MB * 1024 * 1024)
+    ))
+    return registry
+
+
+default_registry = _build_default_registry()
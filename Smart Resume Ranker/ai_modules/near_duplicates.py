@@ -0,0 +1,314 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from collections import defaultdict
+import numpy as np
+from .embedding_store import EmbeddingStore
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Every value of the signature of a text without shingles (no words at all)
+EMPTY_HASH = np.iinfo(np.uint32).max
+
+# Version of the on-disk files; indexes written by other versions are rebuilt from scratch
+LAYOUT_VERSION = 2
+
+
+def _band_layout(threshold, num_perm):
+    """
+    (bands, rows) for LSH that minimizes the false positive + false negative area
+    around the Jaccard threshold, with bands * rows <= num_perm.
+    """
+    similarity = np.linspace(0, 1, 201)
+    step = similarity[1] - similarity[0]
+    below = similarity <= threshold
+    best, best_error = (1, num_perm), None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collide = 1 - (1 - similarity ** rows) ** bands
+        # Collision probability below the threshold plus miss probability above it
+        error = (collide[below].sum() + (1 - collide[~below]).sum()) * step
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of word shingles with a banded LSH index, for finding documents
+    whose estimated Jaccard similarity is at least `threshold`.
+
+    With a folder, every added document (content hash, signature, owner, label) is
+    appended to flat files and the LSH buckets are rebuilt from them at start-up, so
+    duplicates are recognised across uploads of the same owner. Documents older than
+    retention_days are dropped, and the oldest ones once more than max_entries are stored.
+    """
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=5, seed=1, folder=None,
+                 retention_days=None, max_entries=None):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+        self.bands, self.rows = _band_layout(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits; a is odd
+        self._a = rng.randint(0, 2 ** 63, num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 2 ** 63, num_perm, dtype=np.int64).astype(np.uint64)
+
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._keys = []
+        self._key_rows = {}
+        self._owners = []
+        self._labels = []
+        self._added = []
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            self._check_meta(seed)
+            self._load()
+        with self._lock:
+            self._prune()
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _check_meta(self, seed):
+        meta = {'num_perm': self.num_perm, 'shingle_size': self.shingle_size, 'seed': seed}
+        if os.path.exists(self._path('meta.json')):
+            with open(self._path('meta.json'), 'r') as f:
+                stored = json.load(f)
+            layout = stored.pop('layout', 1)
+            if stored != meta:
+                raise ValueError(f"Near-duplicate index at {self.folder} holds {stored}, expected {meta}")
+            if layout == LAYOUT_VERSION:
+                return
+            # Older layouts carry no owner or date per document, so they can't be scoped or expired
+            print(f"Discarding near-duplicate index at {self.folder} (layout {layout})")
+            for name in ('keys.bin', 'signatures.bin', 'labels.txt'):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+        with open(self._path('meta.json'), 'w') as f:
+            json.dump(dict(meta, layout=LAYOUT_VERSION), f)
+
+    def _load(self):
+        keys, lines = [], []
+        signatures = np.zeros((0, self.num_perm), dtype=np.uint32)
+        if os.path.exists(self._path('keys.bin')):
+            with open(self._path('keys.bin'), 'rb') as f:
+                data = f.read()
+            size = EmbeddingStore.HASH_BYTES
+            keys = [data[i:i + size] for i in range(0, len(data) - len(data) % size, size)]
+        if os.path.exists(self._path('signatures.bin')):
+            signatures = np.fromfile(self._path('signatures.bin'), dtype=np.uint32)
+            signatures = signatures[:len(signatures) - len(signatures) % self.num_perm].reshape(-1, self.num_perm)
+        labels_text = ''
+        if os.path.exists(self._path('labels.txt')):
+            with open(self._path('labels.txt'), 'r', encoding='utf-8') as f:
+                labels_text = f.read()
+            lines = labels_text.split('\n')[:-1]
+
+        # Rows are complete only once all three files have them (crash-safe appends)
+        rows = min(len(keys), len(signatures), len(lines))
+        if labels_text and (len(lines) > rows or not labels_text.endswith('\n')):
+            # Drop a partially written label line so later appends stay aligned
+            with open(self._path('labels.txt'), 'w', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in lines[:rows]))
+        for line in lines[:rows]:
+            # added_at <tab> owner <tab> label
+            added, owner, label = (line.split('\t', 2) + ['', ''])[:3]
+            self._added.append(float(added) if added.isdigit() else 0.0)
+            self._owners.append(owner)
+            self._labels.append(label)
+        self._keys = keys[:rows]
+        self._signatures = signatures[:rows]
+        self._key_rows = {(owner, key): row for row, (owner, key) in enumerate(zip(self._owners, self._keys))}
+        for row in range(rows):
+            self._bucket(row, self._signatures[row])
+
+    def _prune(self):
+        # Caller holds the lock. Rows are stored oldest first, so expired rows lead
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days else None
+        start = 0
+        if cutoff is not None:
+            while start < len(self._added) and self._added[start] < cutoff:
+                start += 1
+        if self.max_entries and len(self._keys) - start > self.max_entries:
+            # Down to 90% of the cap, so the files aren't rewritten on every upload at the cap
+            start = len(self._keys) - int(self.max_entries * 0.9)
+        if start == 0:
+            return
+
+        self._keys = self._keys[start:]
+        self._owners = self._owners[start:]
+        self._labels = self._labels[start:]
+        self._added = self._added[start:]
+        self._signatures = self._signatures[start:].copy()
+        self._key_rows = {(owner, key): row for row, (owner, key) in enumerate(zip(self._owners, self._keys))}
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        for row in range(len(self._keys)):
+            self._bucket(row, self._signatures[row])
+
+        if self.folder:
+            # Labels last, as with appends: a row only counts once its label is written
+            for name, data in (('signatures.bin', self._signatures.tobytes()),
+                               ('keys.bin', b''.join(self._keys)),
+                               ('labels.txt', self._label_lines(range(len(self._keys))).encode('utf-8'))):
+                with open(self._path(name + '.tmp'), 'wb') as f:
+                    f.write(data)
+                os.replace(self._path(name + '.tmp'), self._path(name))
+
+    def _label_lines(self, rows):
+        return ''.join(f"{int(self._added[r])}\t{self._owners[r]}\t{self._labels[r]}\n" for r in rows)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def shingles(self, text):
+        """
+        Hashes of the overlapping word shingles of the text.
+        """
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        size = min(self.shingle_size, len(tokens))
+        if size == 0:
+            return np.zeros(0, dtype=np.uint64)
+        return np.array(sorted({
+            zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8'))
+            for i in range(len(tokens) - size + 1)
+        }), dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        MinHash signature (num_perm uint32 values) of the text; all EMPTY_HASH for a
+        text without shingles, which is never grouped with anything.
+        """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return np.full(self.num_perm, EMPTY_HASH, dtype=np.uint32)
+        hashed = (shingles[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def _is_empty(signature):
+        return bool((np.asarray(signature) == EMPTY_HASH).all())
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _bucket(self, row, signature):
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(row)
+
+    def query(self, signature, owner=''):
+        """
+        Documents of the owner similar to the signature: [(content hash, label,
+        estimated Jaccard)], most similar first.
+        """
+        if self._is_empty(signature):
+            return []
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates = [row for row in candidates if self._owners[row] == owner]
+            if not candidates:
+                return []
+            rows = np.fromiter(candidates, dtype=np.int64)
+            estimates = (self._signatures[rows] == signature).mean(axis=1)
+            keep = estimates >= self.threshold
+            found = [(self._keys[r], self._labels[r], float(e)) for r, e in zip(rows[keep], estimates[keep])]
+        return sorted(found, key=lambda item: -item[2])
+
+    def add_many(self, keys, signatures, labels, owner=''):
+        """
+        Stores documents of the owner; keys the owner already stored and documents
+        without shingles are skipped.
+        """
+        owner = re.sub(r'\s', '', owner)
+        with self._lock:
+            new = []
+            for key, signature, label in zip(keys, signatures, labels):
+                if (owner, key) not in self._key_rows and not self._is_empty(signature):
+                    self._key_rows[(owner, key)] = len(self._keys) + len(new)
+                    new.append((key, np.asarray(signature, dtype=np.uint32), re.sub(r'[\t\n\r]', ' ', label)))
+            if not new:
+                return
+
+            start = len(self._keys)
+            batch = np.stack([signature for _, signature, _ in new])
+            self._keys.extend(key for key, _, _ in new)
+            self._owners.extend(owner for _ in new)
+            self._labels.extend(label for _, _, label in new)
+            self._added.extend(time.time() for _ in new)
+            if self.folder:
+                # Signatures and keys first: a row only counts once its label is written
+                with open(self._path('signatures.bin'), 'ab') as f:
+                    f.truncate(start * self.num_perm * 4)
+                    f.write(batch.tobytes())
+                with open(self._path('keys.bin'), 'ab') as f:
+                    f.truncate(start * EmbeddingStore.HASH_BYTES)
+                    f.write(b''.join(key for key, _, _ in new))
+                with open(self._path('labels.txt'), 'a', encoding='utf-8') as f:
+                    f.write(self._label_lines(range(start, len(self._keys))))
+
+            self._signatures = np.concatenate([self._signatures, batch])
+            for offset, (_, signature, _) in enumerate(new):
+                self._bucket(start + offset, signature)
+            self._prune()
+
+    def group(self, texts, labels=None, signatures=None, owner=None):
+        """
+        Clusters near-duplicates within a batch and, with an owner (e.g. a session id),
+        checks it against the owner's earlier batches.
+
+        Returns (representatives, previous): representatives[i] is the index of the first
+        document in the batch that document i duplicates (i itself when it is unique),
+        previous[i] is the label of the owner's most similar previously stored document
+        or None. Identical earlier copies don't count, so re-running the same files
+        reports nothing. The batch is then added to the owner's documents; without an
+        owner nothing is looked up or stored.
+        """
+        labels = labels if labels is not None else [''] * len(texts)
+        if signatures is None:
+            signatures = [self.signature(text) for text in texts]
+        keys = [EmbeddingStore.content_hash(text) for text in texts]
+
+        previous = [None] * len(texts)
+        if owner is not None:
+            # Owners are stored in a tab-separated line
+            owner = re.sub(r'\s', '', owner)
+            for i, signature in enumerate(signatures):
+                matches = [match for match in self.query(signature, owner) if match[0] != keys[i]]
+                previous[i] = matches[0][1] if matches else None
+
+        # Union-find over batch pairs that share an LSH bucket and pass the threshold
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            if self._is_empty(signature):
+                continue
+            for band, key in enumerate(self._band_keys(signature)):
+                buckets[(band, key)].append(i)
+        for members in buckets.values():
+            for n, i in enumerate(members):
+                for j in members[n + 1:]:
+                    if find(i) != find(j) and np.mean(signatures[i] == signatures[j]) >= self.threshold:
+                        a, b = sorted((find(i), find(j)))
+                        parent[b] = a
+
+        if owner is not None:
+            self.add_many(keys, signatures, labels, owner)
+        return [find(i) for i in range(len(texts))], previous
@@ -1,71 +1,394 @@
-TRANSFORMERS_AVAILABLE = False
-SentenceTransformer = None
+import os
+import threading
+import importlib.util
 
-# Disable transformers to avoid loading issues
-# try:
-#     from sentence_transformers import SentenceTransformer
-#     TRANSFORMERS_AVAILABLE = True
-# except ImportError:
-#     TRANSFORMERS_AVAILABLE = False
+# sentence_transformers pulls in torch, so only check for it here and import on first load
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec('sentence_transformers') is not None
 
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from .embedding_store import EmbeddingStore
+from .ann_index import IVFPQIndex, exact_top_k
+from .embedding_backends import BACKENDS, load_encoder, calibration_report
+from .token_batching import POOLING_MODES, split_windows, plan_batches, pool_chunks
+from utils.config import Config
+from utils.memory_budget import BudgetedCache
+
+MODELS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+WEIGHT_FILES = ('model.safetensors', 'pytorch_model.bin')
+
+
+def resolve_local_snapshot(model_name, cache_folder=MODELS_FOLDER):
+    """
+    Locates a complete Hugging Face cache snapshot for the model inside cache_folder.
+    Returns (snapshot_path, None) on success or (None, reason) when the weights are missing or incomplete.
+    """
+    repo_id = model_name if '/' in model_name else f'sentence-transformers/{model_name}'
+    repo_dir = os.path.join(cache_folder, 'models--' + repo_id.replace('/', '--'))
+    if not os.path.isdir(repo_dir):
+        return None, f"no local cache at {repo_dir}"
+
+    snapshots_dir = os.path.join(repo_dir, 'snapshots')
+    revision = None
+    ref_file = os.path.join(repo_dir, 'refs', 'main')
+    if os.path.isfile(ref_file):
+        with open(ref_file, 'r') as f:
+            revision = f.read().strip()
+    if not revision and os.path.isdir(snapshots_dir):
+        revisions = sorted(os.listdir(snapshots_dir))
+        revision = revisions[-1] if revisions else None
+
+    snapshot = os.path.join(snapshots_dir, revision) if revision else None
+    if not snapshot or not os.path.isdir(snapshot):
+        return None, "no snapshot directory"
+
+    for weight_file in WEIGHT_FILES:
+        weight_path = os.path.join(snapshot, weight_file)
+        if not os.path.isfile(weight_path):
+            continue
+        # Snapshot entries are symlinks into blobs/; a partial download leaves a *.incomplete blob
+        if os.path.realpath(weight_path).endswith('.incomplete') or os.path.getsize(weight_path) == 0:
+            return None, f"weights '{weight_file}' are incomplete"
+        return snapshot, None
+
+    blobs_dir = os.path.join(repo_dir, 'blobs')
+    if os.path.isdir(blobs_dir) and any(b.endswith('.incomplete') for b in os.listdir(blobs_dir)):
+        return None, "weights download is incomplete"
+    return None, "no weight file in snapshot"
+
 
 class NeuralEmbeddingRanker:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_folder=MODELS_FOLDER,
+                 batch_size=32, num_threads=None, lazy=True, backend=None,
+                 chunking=True, pooling='mean', token_budget=8192, chunk_stride=None, max_chunks=64,
+                 store_folder=None, store_dtype='float16', query_cache_size=32,
+                 ann_min_train=2048, ann_nlist=256, ann_m=48, ann_nprobe=16, ann_exact_limit=4096):
         """
         Initialize the ranker with a pre-trained SentenceTransformer model.
+        The model is only ever read from the local snapshot in cache_folder (no network access)
+        and is loaded on first use, or in the background via warm_up().
+        backend selects the CPU inference backend ('torch', 'int8' or 'onnx').
+        With chunking, long documents are split into model-sized token windows that are
+        batched by length under token_budget and pooled ('mean' or 'max') per document.
+        Resume embeddings are persisted in an EmbeddingStore under store_folder. Once the
+        store holds ann_min_train resumes, an IVF-PQ index is trained next to it for top_k();
+        ann_nprobe trades recall for latency.
+        """
+        self.model_name = model_name
+        self.cache_folder = cache_folder
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.backend = backend or Config.NEURAL_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{self.backend}'. Choose from {', '.join(BACKENDS)}")
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Unknown pooling mode '{pooling}'. Choose from {', '.join(POOLING_MODES)}")
+        self.chunking = chunking
+        self.pooling = pooling
+        self.token_budget = token_budget
+        self.chunk_stride = chunk_stride
+        self.max_chunks = max_chunks
+
+        # Each backend / pooling combination produces different vectors, so each gets its own store
+        store_name = model_name.replace('/', '--')
+        if self.backend != 'torch':
+            store_name += f'-{self.backend}'
+        if self.chunking:
+            store_name += f'-chunk{self.pooling}'
+        self.store_folder = store_folder or os.path.join(Config.CACHE_FOLDER, 'embeddings', store_name)
+        self.store_dtype = store_dtype
+        self.query_cache_size = query_cache_size
+
+        self.ann_min_train = ann_min_train
+        self.ann_nlist = ann_nlist
+        self.ann_m = ann_m
+        self.ann_nprobe = ann_nprobe
+        self.ann_exact_limit = ann_exact_limit
+
+        self._store = None
+        self._store_lock = threading.Lock()
+        self._index = None
+        self._query_cache = BudgetedCache('neural_queries', max_entries=query_cache_size)
+
+        self._model = None
+        self._load_attempted = False
+        self._load_lock = threading.Lock()
+        self._warmup_thread = None
+
+        if not lazy:
+            self._load_model()
+
+    @property
+    def model(self):
+        """
+        The loaded SentenceTransformer, or None when running in fallback mode.
+        Blocks until a warm-up load that is already in progress finishes.
         """
-        # Temporarily disable to avoid download issues
-        print("Neural embeddings using fallback mode (model download disabled)")
-        self.model = None
-        return
-        
+        if not self._load_attempted:
+            self._load_model()
+        return self._model
+
+    def is_available(self):
+        return self.model is not None
+
+    def warm_up(self):
+        """
+        Starts loading the model on a daemon thread so application startup is not blocked.
+        """
+        if self._load_attempted or self._warmup_thread is not None:
+            return self._warmup_thread
+        self._warmup_thread = threading.Thread(target=self._load_model, name='neural-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _load_model(self):
+        with self._load_lock:
+            if self._load_attempted:
+                return self._model
+            try:
+                self._model = self._load_offline()
+            finally:
+                self._load_attempted = True
+            return self._model
+
+    def _load_offline(self):
         if not TRANSFORMERS_AVAILABLE:
-            print("Warning: sentence_transformers not available")
-            self.model = None
-            return
-            
+            print("Warning: sentence_transformers not available, neural embeddings will use fallback scoring")
+            return None
+
+        snapshot, reason = resolve_local_snapshot(self.model_name, self.cache_folder)
+        if snapshot is None:
+            print(f"Warning: Could not load model '{self.model_name}' offline: {reason}")
+            print("Neural embeddings will use fallback scoring")
+            return None
+
+        # Make sure nothing below tries to reach the Hub
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
         try:
-            # Try to load model in offline mode first
-            self.model = SentenceTransformer(model_name, device='cpu', cache_folder='./models')
-            print(f"Successfully loaded {model_name}")
+            if self.num_threads:
+                import torch
+                torch.set_num_threads(self.num_threads)
+            model = load_encoder(snapshot, self.backend)
+            print(f"Successfully loaded {self.model_name} ({self.backend}) from {snapshot}")
+            return model
         except Exception as e:
-            print(f"Warning: Could not load model '{model_name}': {e}")
+            print(f"Warning: Could not load model '{self.model_name}': {e}")
             print("Neural embeddings will use fallback scoring")
-            self.model = None
+            return None
+
+    def calibrate(self, texts=None, queries=None):
+        """
+        Checks the active backend against the fp32 model on a reference set.
+        Returns the cosine agreement report, or None when the model is unavailable.
+        """
+        if self.model is None:
+            return None
+        if self.backend == 'torch':
+            reference = self.model
+        else:
+            snapshot, _ = resolve_local_snapshot(self.model_name, self.cache_folder)
+            reference = load_encoder(snapshot, 'torch')
+        report = calibration_report(self.model, reference, texts, queries, self.batch_size)
+        report['backend'] = self.backend
+        return report
+
+    @property
+    def store(self):
+        """
+        Persistent resume embedding store, opened on first use (None when it cannot be opened).
+        """
+        if self._store is None and self.model is not None:
+            with self._store_lock:
+                if self._store is None:
+                    try:
+                        dim = self.model.get_sentence_embedding_dimension()
+                        self._store = EmbeddingStore(self.store_folder, dim, dtype=self.store_dtype)
+                    except Exception as e:
+                        print(f"Warning: Embedding store unavailable, embeddings will not be cached: {e}")
+                        self._store = False
+        return self._store if self._store is not False else None
+
+    def _encode(self, texts):
+        """
+        Encodes texts into unit-length float32 vectors.
+        """
+        texts = list(texts)
+        if self.chunking and getattr(self.model, 'tokenizer', None) is not None:
+            return self._encode_chunked(texts)
+        embeddings = self.model.encode(texts, batch_size=self.batch_size,
+                                       convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _encode_chunked(self, texts):
+        """
+        Full-document encoding: token windows of the model's max sequence length,
+        length-bucketed batches under a fixed token budget, pooled back per document.
+        """
+        tokenizer = self.model.tokenizer
+        window = max(self.model.max_seq_length - 2, 1)  # room for [CLS] / [SEP]
+
+        chunks, owners, lengths = [], [], []
+        for doc_index, text in enumerate(texts):
+            token_ids = tokenizer(text, add_special_tokens=False, verbose=False)['input_ids']
+            for ids in split_windows(token_ids, window, self.chunk_stride)[:self.max_chunks]:
+                chunks.append(tokenizer.decode(ids))
+                owners.append(doc_index)
+                lengths.append(len(ids) + 2)
+
+        dim = self.model.get_sentence_embedding_dimension()
+        chunk_vectors = np.zeros((len(chunks), dim), dtype=np.float32)
+        for batch in plan_batches(lengths, self.token_budget):
+            chunk_vectors[batch] = self.model.encode([chunks[i] for i in batch], batch_size=len(batch),
+                                                     convert_to_numpy=True, normalize_embeddings=True)
+        return pool_chunks(chunk_vectors, owners, len(texts), self.pooling)
+
+    def _embed_query(self, job_desc):
+        """
+        Job description embedding, served from a small in-memory LRU.
+        """
+        key = EmbeddingStore.content_hash(job_desc)
+        return self._query_cache.get_or_build(key, lambda _: self._encode([job_desc])[0])
+
+    def embed_resumes(self, resumes):
+        """
+        Makes sure every resume is in the embedding store, encoding only the unseen ones
+        in a single batched call. Returns (content_hashes, store_rows).
+        """
+        hashes = [EmbeddingStore.content_hash(text) for text in resumes]
+        rows = self.store.lookup(hashes)
+        missing = {}
+        for h, text, row in zip(hashes, resumes, rows):
+            if row < 0 and h not in missing:
+                missing[h] = text
+        if missing:
+            vectors = self._encode(missing.values())
+            new_rows = self.store.add_many(list(missing.keys()), vectors)
+            rows = self.store.lookup(hashes)
+            self._index_rows(new_rows, vectors)
+        return hashes, rows
+
+    @property
+    def index(self):
+        """
+        ANN index over the embedding store rows (None until the store can be opened).
+        """
+        if self._index is None and self.store is not None:
+            with self._store_lock:
+                if self._index is None:
+                    dim = self.store.dim
+                    m = self.ann_m if dim % self.ann_m == 0 else 1
+                    self._index = IVFPQIndex(dim, nlist=self.ann_nlist, m=m, nprobe=self.ann_nprobe,
+                                             folder=os.path.join(self.store_folder, 'ann'))
+        return self._index
+
+    def _index_rows(self, rows, vectors):
+        """
+        Inserts new store rows into the ANN index, training it once the store is large enough.
+        """
+        index = self.index
+        if index is None:
+            return
+        if not index.is_trained:
+            if len(self.store) < self.ann_min_train:
+                return
+            index.train(self.store.vectors(slice(None)))
+            # Backfill everything stored so far, in bounded chunks
+            for start in range(0, len(self.store), 65536):
+                chunk = slice(start, min(start + 65536, len(self.store)))
+                index.add(np.arange(chunk.start, chunk.stop), self.store.vectors(chunk))
+            return
+        index.add(rows, vectors)
+
+    def top_k(self, job_desc, k, candidates=None, nprobe=None):
+        """
+        Returns [(content_hash, score)] for the k stored resumes closest to the job description,
+        best first. candidates optionally restricts the search to these content hashes.
+        Small pools are searched exactly; large ones through the ANN index.
+        """
+        if not job_desc or self.store is None or not len(self.store):
+            return []
+        query = self._embed_query(job_desc)
+
+        rows = None
+        if candidates is not None:
+            rows = self.store.lookup(candidates)
+            rows = np.unique(rows[rows >= 0])
+            if not len(rows):
+                return []
+
+        pool_size = len(self.store) if rows is None else len(rows)
+        index = self.index
+        if index is None or not index.is_trained or pool_size <= self.ann_exact_limit:
+            pool = np.arange(len(self.store)) if rows is None else rows
+            top, scores = exact_top_k(self.store.vectors(pool), query, k)
+            found = pool[top]
+        else:
+            found, scores = index.search(query, k, nprobe=nprobe, allowed_ids=rows,
+                                         refine=self.store.vectors)
+            wanted = min(k, pool_size)
+            if len(found) < wanted:
+                # The probed cells held too few (allowed) rows: fill up exactly from the rest
+                pool = np.arange(len(self.store)) if rows is None else rows
+                rest = pool[~np.isin(pool, found)]
+                top, extra = exact_top_k(self.store.vectors(rest), query, wanted - len(found))
+                found, scores = np.concatenate([found, rest[top]]), np.concatenate([scores, extra])
+                order = np.argsort(-scores, kind='stable')
+                found, scores = found[order], scores[order]
+
+        return [(h, round(float(score) * 100, 2)) for h, score in zip(self.store.hashes_at(found), scores)]
+
+    def score_stored(self, job_desc, content_hashes):
+        """
+        Re-ranks already stored resumes against a job description:
+        one query encode plus one matrix-vector product. Unknown hashes score 0.0.
+        """
+        if not job_desc or self.store is None:
+            return [0.0] * len(content_hashes)
+        rows = self.store.lookup(content_hashes)
+        known = rows >= 0
+        scores = np.zeros(len(content_hashes), dtype=np.float32)
+        if known.any():
+            scores[known] = self.store.scores(self._embed_query(job_desc), rows[known]) * 100
+        return [round(float(score), 2) for score in scores]
 
     def get_semantic_score(self, job_desc, resume_text):
         """
         Calculates semantic similarity score using embeddings.
         """
-        if not self.model or not job_desc or not resume_text:
-            return 0.0
-
-        try:
-            embeddings = self.model.encode([job_desc, resume_text])
-            score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0] * 100
-            return round(score, 2)
-        except Exception as e:
-            print(f"Error in Semantic Scoring: {e}")
+        if not job_desc or not resume_text:
             return 0.0
+        return self.get_batch_semantic_scores(job_desc, [resume_text])[0]
 
     def get_batch_semantic_scores(self, job_desc, resumes):
         """
         Calculates semantic similarity scores for a job description against multiple resumes.
-        Returns a list of scores.
+        Resumes already in the embedding store are not re-encoded; the rest are encoded
+        in a single batched call. Returns a list of scores.
         """
-        if not self.model or not job_desc or not resumes:
+        if not job_desc or not resumes or not self.model:
             return [0.0] * len(resumes)
 
         try:
-            documents = [job_desc] + resumes
-            embeddings = self.model.encode(documents)
-            job_desc_embedding = embeddings[0]
-            resume_embeddings = embeddings[1:]
+            # Empty resumes keep a 0.0 score instead of being encoded
+            present = [i for i, resume in enumerate(resumes) if resume]
+            scores = [0.0] * len(resumes)
+            if not present:
+                return scores
+
+            texts = [resumes[i] for i in present]
+            job_desc_embedding = self._embed_query(job_desc)
+            if self.store is not None:
+                _, rows = self.embed_resumes(texts)
+                similarities = self.store.scores(job_desc_embedding, rows) * 100
+            else:
+                resume_embeddings = self._encode(texts)
+                similarities = cosine_similarity([job_desc_embedding], resume_embeddings)[0] * 100
 
-            scores = cosine_similarity([job_desc_embedding], resume_embeddings)[0] * 100
-            return [round(score, 2) for score in scores]
+            for i, score in zip(present, similarities):
+                scores[i] = round(float(score), 2)
+            return scores
         except Exception as e:
             print(f"Error in Batch Semantic Scoring: {e}")
             return [0.0] * len(resumes)
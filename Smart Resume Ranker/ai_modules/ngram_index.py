@@ -0,0 +1,145 @@
+import numpy as np
+from Levenshtein import ratio as levenshtein_ratio
+from fuzzywuzzy import fuzz
+
+NGRAM = 3
+
+
+def _codes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _gram_keys(codes, size):
+    # Packs `size` consecutive code points into one int64 key (21 bits per character)
+    keys = np.zeros(max(len(codes) - size + 1, 0), dtype=np.int64)
+    for j in range(size):
+        keys = (keys << 21) | codes[j:len(codes) - size + 1 + j]
+    return keys
+
+
+class PhraseGrams:
+    """
+    N-grams of a fixed list of phrases (e.g. a skill database), compiled once so a
+    document can be searched for all of them in a single vectorized lookup.
+    Phrases use trigrams, or single characters when shorter than a trigram.
+    """
+    def __init__(self, phrases):
+        self.phrases = [phrase.lower() for phrase in phrases]
+        self.grams = {}
+        for size in (1, NGRAM):
+            keys, owners, offsets = [], [], []
+            for owner, phrase in enumerate(self.phrases):
+                if phrase and (len(phrase) >= NGRAM) == (size == NGRAM):
+                    phrase_keys = _gram_keys(_codes(phrase), size)
+                    keys.append(phrase_keys)
+                    owners.append(np.full(len(phrase_keys), owner, dtype=np.int64))
+                    offsets.append(np.arange(len(phrase_keys), dtype=np.int64))
+            if keys:
+                self.grams[size] = (np.concatenate(keys), np.concatenate(owners), np.concatenate(offsets))
+
+    def __len__(self):
+        return len(self.phrases)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for arrays in self.grams.values() for array in arrays) + \
+            sum(len(phrase) + 49 for phrase in self.phrases)
+
+
+class NGramIndex:
+    """
+    Character n-gram index of one (lowercased) document for fuzzy phrase lookup.
+
+    partial_ratios() approximates fuzz.partial_ratio(phrase, document): the best
+    Levenshtein ratio between a phrase and a document window of the same length.
+    Instead of aligning each phrase against the whole document, every occurrence of
+    one of its n-grams votes for a window start, and only windows near a voted start
+    are scored exactly. Windows sharing no n-gram with the phrase are never scored.
+    """
+    def __init__(self, text):
+        self.text = text.lower()
+        codes = _codes(self.text)
+        self._sorted = {}
+        for size in (1, NGRAM):
+            keys = _gram_keys(codes, size)
+            order = np.argsort(keys, kind='stable')
+            self._sorted[size] = (keys[order], order)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for arrays in self._sorted.values() for array in arrays) + len(self.text) + 49
+
+    def candidate_starts(self, phrase_grams):
+        """
+        {phrase id: window starts voted for by its n-gram hits, most voted first}.
+        Phrases without any hit are absent.
+        """
+        candidates = {}
+        span = len(self.text) + 1
+        for size, (gram_keys, owners, offsets) in phrase_grams.grams.items():
+            keys, positions = self._sorted[size]
+            lo = np.searchsorted(keys, gram_keys, side='left')
+            counts = np.searchsorted(keys, gram_keys, side='right') - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            rows = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)
+            starts = np.maximum(positions[rows] - np.repeat(offsets, counts), 0)
+            pairs, votes = np.unique(np.repeat(owners, counts) * span + starts, return_counts=True)
+            pairs = pairs[np.lexsort((-votes, pairs // span))]
+            hit_owners = pairs // span
+            bounds = np.flatnonzero(np.diff(hit_owners)) + 1
+            for group in np.split(pairs, bounds):
+                candidates[int(group[0] // span)] = (group % span).tolist()
+        return candidates
+
+    def partial_ratios(self, phrase_grams, score_cutoff=None):
+        """
+        Score (0-100) of the best matching window for every phrase.
+        With score_cutoff, a phrase stops being searched once a window scores above it.
+        """
+        candidates = self.candidate_starts(phrase_grams)
+        return [
+            self._best_window(phrase, candidates.get(i, ()), score_cutoff)
+            for i, phrase in enumerate(phrase_grams.phrases)
+        ]
+
+    def partial_ratio(self, phrase, score_cutoff=None):
+        return self.partial_ratios(PhraseGrams([phrase]), score_cutoff)[0]
+
+    def _best_window(self, phrase, voted_starts, score_cutoff):
+        if not phrase or not self.text:
+            return 0
+        if len(phrase) > len(self.text):
+            return fuzz.partial_ratio(phrase, self.text)
+        if not voted_starts:
+            return 0
+        if phrase in self.text:
+            return 100
+
+        length = len(phrase)
+        cutoff = (score_cutoff or 0) / 100.0
+        # A window scoring above the cutoff can be at most this far from a voted start
+        slack = max(int(length * (1 - cutoff)), 1)
+        last_start = len(self.text) - 1
+
+        best = 0.0
+        seen = set()
+        for voted in voted_starts:
+            if voted in seen:
+                continue
+            seen.add(voted)
+            r = levenshtein_ratio(phrase, self.text[voted:voted + length])
+            best = max(best, r)
+            # Shifting the window by d characters gains at most d matching characters,
+            # so neighbours of a weak start cannot beat the cutoff or the best so far
+            reachable = r + slack / length
+            if reachable <= cutoff or reachable <= best:
+                continue
+            for start in range(max(voted - slack, 0), min(voted + slack, last_start) + 1):
+                if start not in seen:
+                    seen.add(start)
+                    best = max(best, levenshtein_ratio(phrase, self.text[start:start + length]))
+            if best > .995 or (score_cutoff is not None and int(round(100 * best)) > score_cutoff):
+                break
+        return 100 if best > .995 else int(round(100 * best))
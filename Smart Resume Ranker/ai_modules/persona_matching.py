@@ -1,6 +1,4 @@
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 class PersonaMatcher:
     def __init__(self):
@@ -11,7 +9,6 @@ class PersonaMatcher:
             'creative': ['design', 'creative', 'innovative', 'artistic', 'visual', 'brand', 'content', 'marketing', 'ux', 'ui'],
             'technical': ['technical', 'system', 'infrastructure', 'network', 'security', 'database', 'server', 'cloud', 'devops', 'architecture']
         }
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
 
     def detect_persona(self, text):
         """
@@ -0,0 +1,56 @@
+import re
+from collections import defaultdict
+
+# Words, keeping inner dots/hyphens and trailing +/# so "node.js", "scikit-learn",
+# "c++" and "c#" stay whole tokens
+TOKEN_PATTERN = re.compile(r'\w+(?:[.\-]\w+)*[+#]*')
+
+
+def tokenize(text):
+    """
+    Lowercased tokens of the text.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Finds which of a large, fixed set of phrases occur in a text.
+
+    A phrase matches when its tokens appear as a run of whole tokens in the lowercased
+    text, so "c" or "go" do not match inside "docker" or "mongodb". Phrases are bucketed
+    by token count so a lookup costs one hash probe per text token and distinct phrase
+    length, independent of how many phrases are loaded.
+    """
+    def __init__(self, phrases):
+        self.phrases = [phrase.lower() for phrase in phrases]
+        self._by_length = defaultdict(dict)
+        for phrase_id, phrase in enumerate(self.phrases):
+            tokens = tokenize(phrase)
+            if tokens:
+                self._by_length[len(tokens)].setdefault(' '.join(tokens), []).append(phrase_id)
+        self._lengths = sorted(self._by_length)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def find_ids(self, text):
+        """
+        Sorted ids of the phrases found in the text.
+        """
+        tokens = tokenize(text)
+        found = set()
+        for length in self._lengths:
+            if length > len(tokens):
+                break
+            bucket = self._by_length[length]
+            windows = {' '.join(tokens[i:i + length]) for i in range(len(tokens) - length + 1)}
+            for phrase in windows.intersection(bucket):
+                found.update(bucket[phrase])
+        return sorted(found)
+
+    def find(self, text):
+        """
+        The phrases found in the text.
+        """
+        return {self.phrases[i] for i in self.find_ids(text)}
@@ -0,0 +1,87 @@
+import sys
+import numpy as np
+
+# Fields explain() adds to a ranked result
+EXPLANATION_FIELDS = ('matched_skills', 'missing_skills', 'education', 'ensemble_details', 'scores')
+
+
+class RankedResults:
+    """
+    Ranked results of one ranking run, in rank order, held as parallel columns instead
+    of one dict per resume: final scores and raw module scores in numpy arrays,
+    filenames and contact details as interned strings, duplicates and explanations
+    only for the results that have them, and the GA convergence data once.
+
+    Indexing and iteration build the familiar result dicts on demand, so the results
+    can still be used like a list of dicts (see RankingEngine.rank_resumes).
+    """
+    def __init__(self, modules, filenames, scores, raw_scores, emails=None, phones=None,
+                 duplicates=None, previously_seen=None, ensemble_details=None, texts=None,
+                 convergence_data=None):
+        self.modules = list(modules)
+        self.filenames = [sys.intern(filename) for filename in filenames]
+        self.scores = np.asarray(scores, dtype=float)
+        self.raw_scores = np.asarray(raw_scores, dtype=float).reshape(len(self.filenames), len(self.modules))
+        n = len(self.filenames)
+        self.emails = [sys.intern(email) for email in emails] if emails is not None else ['N/A'] * n
+        self.phones = [sys.intern(phone) for phone in phones] if phones is not None else ['N/A'] * n
+        # Sparse columns: {position: value} for the results that have one
+        self.duplicates = {i: list(names) for i, names in enumerate(duplicates or []) if names}
+        self.previously_seen = {i: name for i, name in enumerate(previously_seen or []) if name}
+        # Only ensemble runs carry ensemble details (possibly None) on every result
+        self.ensemble_details = list(ensemble_details) if ensemble_details is not None else None
+        self.texts = list(texts) if texts is not None else [None] * n
+        self.explanations = {}
+        self.convergence_data = convergence_data
+        # Score cache {'hits', 'misses'} of the ranking run, when it used the cache
+        self.cache_stats = None
+        # Weights the scores were combined with (the GA's in 'ga' mode)
+        self.weights = None
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("ranked result index out of range")
+
+        result = {
+            'filename': self.filenames[position],
+            'score': float(self.scores[position]),
+            'email': self.emails[position],
+            'phone': self.phones[position],
+            'duplicates': list(self.duplicates.get(position, [])),
+            'previously_seen': self.previously_seen.get(position),
+            # Unnormalized module scores, kept so the run can be re-weighted later
+            'raw_scores': dict(zip(self.modules, self.raw_scores[position].tolist())),
+        }
+        if self.ensemble_details is not None:
+            result['ensemble_details'] = self.ensemble_details[position]
+        explanation = self.explanations.get(position)
+        if explanation is not None:
+            result.update(explanation)
+        elif self.texts[position] is not None:
+            result['text'] = self.texts[position]
+        return result
+
+    def set_explanation(self, position, result):
+        """
+        Keeps the explanation fields of an explained result (see RankingEngine.explain);
+        its text is no longer needed.
+        """
+        self.explanations[position] = {field: result.get(field) for field in EXPLANATION_FIELDS}
+        self.texts[position] = None
+
+    def score_matrix(self):
+        """
+        Raw module scores in rank order, as stored for re-ranking: {'modules', 'rows'}.
+        """
+        return {'modules': list(self.modules), 'rows': self.raw_scores.tolist()}
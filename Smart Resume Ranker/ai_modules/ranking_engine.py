@@ -1,246 +1,476 @@
-from .cosine_similarity import CosineSimilarity
-from .fuzzy_logic import FuzzyResumeScorer
-from .genetic_algorithm import GAOptimizer
-from .persona_matching import PersonaMatcher
-from .career_predictor import CareerPredictor
-from .skill_gap_analyzer import SkillGapAnalyzer
-from .experience_transfer import ExperienceTransfer
-from .innovation_scorer import InnovationScorer
-from .neural_embeddings import NeuralEmbeddingRanker
-from .knowledge_graph import KnowledgeGraphMatcher
-from .ensemble_super_accuracy import SuperAccuracyEnsemble
+import time
+from .model_registry import default_registry
+from .ranked_results import RankedResults
 from evaluation.metrics_calculator import MetricsCalculator
+from utils.performance_monitor import span
 import numpy as np
 
+# Skills shown as matched / missing on the results page
+DISPLAY_SKILLS = ['python', 'java', 'flask', 'sql', 'react', 'machine learning', 'ai']
+
+# Raw per-module scores combined into the final score
+SCORE_MODULES = ['skills', 'education', 'persona', 'career', 'gap', 'transfer', 'innovation', 'neural', 'knowledge']
+
+# Bump whenever a scoring module or its lexicons change, so cached raw scores are recomputed
+SCORE_VERSION = 1
+
+# Algorithms whose final scores use the neural / knowledge graph modules; for the
+# others these modules are not run (nor MiniLM loaded) and score 0
+NEURAL_ALGORITHMS = ('all', 'ensemble')
+KNOWLEDGE_ALGORITHMS = ('all',)
+
 class RankingEngine:
-    def __init__(self):
-        self.cosine_model = CosineSimilarity()
-        self.fuzzy_model = FuzzyResumeScorer()
-        self.ga_optimizer = GAOptimizer()
-        
-        # New Modules
-        self.persona_matcher = PersonaMatcher()
-        self.career_predictor = CareerPredictor()
-        self.skill_gap_analyzer = SkillGapAnalyzer()
-        self.experience_transfer = ExperienceTransfer()
-        self.innovation_scorer = InnovationScorer()
-        
-        # Neural and Graph Models
-        self.neural_ranker = NeuralEmbeddingRanker()
-        self.knowledge_graph = KnowledgeGraphMatcher()
-        
-        # Ensemble
-        self.ensemble_system = SuperAccuracyEnsemble()
+    def __init__(self, registry=None):
+        # Scoring components are resolved lazily from the shared registry, so
+        # only the algorithms a request actually uses are ever constructed
+        self.registry = registry if registry is not None else default_registry
         self.metrics_calculator = MetricsCalculator()
 
+    @property
+    def cosine_model(self):
+        return self.registry.get('cosine')
+
+    @property
+    def fuzzy_model(self):
+        return self.registry.get('fuzzy')
+
+    @property
+    def ga_optimizer(self):
+        return self.registry.get('ga_optimizer')
+
+    # New Modules
+    @property
+    def persona_matcher(self):
+        return self.registry.get('persona')
+
+    @property
+    def career_predictor(self):
+        return self.registry.get('career')
+
+    @property
+    def skill_gap_analyzer(self):
+        return self.registry.get('skill_gap')
+
+    @property
+    def experience_transfer(self):
+        return self.registry.get('transfer')
+
+    @property
+    def innovation_scorer(self):
+        return self.registry.get('innovation')
+
+    # Neural and Graph Models
+    @property
+    def neural_ranker(self):
+        return self.registry.get('neural')
+
+    @property
+    def duplicate_index(self):
+        return self.registry.get('near_duplicates')
+
+    @property
+    def knowledge_graph(self):
+        return self.registry.get('knowledge_graph')
+
+    # Ensemble
+    @property
+    def ensemble_system(self):
+        return self.registry.get('ensemble')
+
+    @property
+    def score_cache(self):
+        return self.registry.get('score_cache')
+
+    def score_version(self, algorithm='all'):
+        """
+        Version of the raw module scores: scoring code, neural model and backend (or
+        fallback scoring, for algorithms using it) and skill ontology. Cached scores of
+        other versions are stale.
+        """
+        parts = [str(SCORE_VERSION), ','.join(SCORE_MODULES)]
+        if algorithm in NEURAL_ALGORITHMS:
+            neural = self.neural_ranker
+            parts += [neural.model_name, neural.backend, 'model' if neural.is_available() else 'fallback']
+        parts.append(self.registry.get('skill_ontology').digest())
+        return '|'.join(parts)
+
+    @staticmethod
+    def score_mode(algorithm):
+        """
+        Scoring mode of an algorithm: algorithms of the same mode produce the same raw scores.
+        """
+        if algorithm == 'ensemble':
+            return 'ensemble'
+        return 'standard' if algorithm in KNOWLEDGE_ALGORITHMS else 'lexical'
+
+
+    def get_model_stats(self):
+        """
+        Load time and memory per registered component.
+        """
+        return self.registry.get_stats()
+
     def _normalize_scores(self, scores):
         """
         Normalizes a list of scores using Min-Max scaling to 0-100 range.
-        If variance is 0, returns original scores.
+        If all scores are equal, returns original scores.
         """
         scores = np.array(scores)
-        if np.std(scores) == 0:
+        # np.std can be a tiny non-zero for equal values, so compare the range instead
+        if np.ptp(scores) == 0:
             return scores
         return (scores - np.min(scores)) / (np.max(scores) - np.min(scores)) * 100
 
-    def rank_resumes(self, job_description, resumes_data, weights, algorithm='all'):
+    @staticmethod
+    def _top_order(final_scores, top_k=None):
+        """
+        Indices of the top_k scores, best first; ties keep input order, exactly like a
+        stable descending sort of the rounded scores. Uses argpartition when top_k < n.
+        """
+        rounded = np.round(np.asarray(final_scores, dtype=float), 1)
+        candidates = np.arange(len(rounded))
+        if top_k is not None and top_k < len(rounded):
+            if top_k <= 0:
+                return candidates[:0]
+            # The k-th best score; below it everything is dropped, ties at it go by index
+            kth = -np.partition(-rounded, top_k - 1)[top_k - 1]
+            above = np.flatnonzero(rounded > kth)
+            ties = np.flatnonzero(rounded == kth)[:top_k - len(above)]
+            candidates = np.concatenate([above, ties])
+        return candidates[np.lexsort((candidates, -rounded[candidates]))]
+
+    @staticmethod
+    def score_breakdown(norm, i):
+        """
+        Rounded normalized module scores of resume i, as shown on the results page.
+        """
+        return {
+            module: float(round(norm[module][i], 1))
+            for module in ('persona', 'career', 'gap', 'transfer', 'innovation', 'neural', 'knowledge')
+        }
+
+    def normalized_scores(self, score_matrix):
+        """
+        {module: normalized scores} of every resume in a stored raw score matrix.
+        """
+        matrix = np.asarray(score_matrix['rows'], dtype=float).reshape(-1, len(score_matrix['modules']))
+        return {module: self._normalize_scores(matrix[:, j]) for j, module in enumerate(score_matrix['modules'])}
+
+    def explain(self, result, job_description, text, scores, algorithm='all', missing_skills=None):
+        """
+        Adds the explanation fields of a ranked result: matched and missing skills,
+        education and the per-module score breakdown (see score_breakdown).
+        missing_skills, when already known from scoring, saves a skill gap analysis.
+        """
+        matched_skills, display_missing = self.fuzzy_model.match_skills(DISPLAY_SKILLS, text)
+        if missing_skills is None:
+            if algorithm != 'ensemble':
+                missing_skills = self.skill_gap_analyzer.analyze_gap(job_description, text)['missing_skills']
+            elif result.get('ensemble_details'):
+                # Ensemble doesn't explicitly return missing skills list in this version
+                missing_skills = []
+            else:
+                # Ensemble fell back to standard scoring
+                missing_skills = display_missing
+        result.update({
+            'matched_skills': matched_skills,
+            'missing_skills': missing_skills,
+            'education': 'Extracted',
+            'ensemble_details': result.get('ensemble_details'),
+            'scores': scores
+        })
+        result.pop('text', None)
+        return result
+
+    def rerank(self, score_matrix, weights, algorithm='all'):
+        """
+        Final scores for new weights from a stored raw score matrix
+        ({'modules': [...], 'rows': [[...], ...]}), without rescoring any resume.
+        """
+        matrix = np.asarray(score_matrix['rows'], dtype=float).reshape(-1, len(score_matrix['modules']))
+        raw_scores = {module: matrix[:, j] for j, module in enumerate(score_matrix['modules'])}
+        _, final_scores = self._combine_scores(raw_scores, weights, algorithm)
+        return final_scores
+
+    def _combine_scores(self, raw_scores, weights, algorithm):
+        """
+        Normalizes the raw module scores across the batch and combines them into
+        final scores. Returns ({module: normalized scores}, final scores).
+        """
+        # Note: For ensemble, we might NOT want to normalize skills if we want to show the raw >100% score
+        norm = {key: self._normalize_scores(values) for key, values in raw_scores.items()}
+        if algorithm == 'ensemble':
+            # For ensemble, the skills score IS the final score (the super score)
+            norm['skills'] = np.asarray(raw_scores['skills'], dtype=float)
+            return norm, norm['skills']
+
+        base_score = (norm['skills'] * weights['skills']) + (norm['education'] * weights['education'])
+        # Average of ALL advanced metrics (now including neural and knowledge)
+        advanced_score = norm['persona'] + norm['career'] + norm['gap'] + norm['transfer'] + norm['innovation']
+        if algorithm == 'all':
+            advanced_score = (advanced_score + norm['neural'] + norm['knowledge']) / 7
+        else:
+            # For specific algorithms, use subset
+            advanced_score = advanced_score / 5
+
+        # Final Score = 60% Base + 40% Advanced (increased weight for AI models)
+        return norm, (base_score * 0.6) + (advanced_score * 0.4)
+
+    def shortlist(self, job_description, resumes_data, k):
+        """
+        Keeps the k resumes whose embeddings are closest to the job description
+        (ANN search over the embedding store), preserving input order.
+        Returns the input unchanged when neural embeddings are unavailable.
+        """
+        if not k or len(resumes_data) <= k or self.neural_ranker.store is None:
+            return resumes_data
+        hashes, _ = self.neural_ranker.embed_resumes([resume.get('text', '') for resume in resumes_data])
+        selected = {h for h, _ in self.neural_ranker.top_k(job_description, k, candidates=hashes)}
+        return [resume for resume, h in zip(resumes_data, hashes) if h in selected]
+
+    def group_near_duplicates(self, resumes_data, owner=None):
+        """
+        Collapses near-duplicate resumes (MinHash/LSH) onto the first one of each group.
+        Returns the representatives, annotated with the filenames of their 'duplicates'
+        and the filename they were 'previously_seen' as in an earlier upload of the
+        same owner (e.g. a session); without an owner, earlier uploads aren't checked.
+        """
+        texts = [resume.get('text', '') for resume in resumes_data]
+        signatures = [resume.get('minhash') for resume in resumes_data]
+        if any(signature is None for signature in signatures):
+            signatures = None
+        representatives, previous = self.duplicate_index.group(
+            texts, [resume.get('filename', '') for resume in resumes_data], signatures, owner=owner
+        )
+
+        grouped = {}
+        for i, resume in enumerate(resumes_data):
+            rep = representatives[i]
+            if rep == i:
+                grouped[i] = dict(resume, duplicates=[], previously_seen=previous[i])
+            else:
+                grouped[rep]['duplicates'].append(resume.get('filename', ''))
+        return list(grouped.values())
+
+    def _score_resume(self, job_description, text, algorithm, neural_score, fuzzy_score=None, knowledge_score=None):
+        """
+        Raw module scores of one resume ('scores', in SCORE_MODULES order) with the
+        by-products explain() reuses: 'missing_skills' and 'ensemble_details'.
+        """
+        # --- Super Ensemble Logic ---
+        if algorithm == 'ensemble':
+            try:
+                with span('ensemble'):
+                    ensemble_result = self.ensemble_system.get_super_accuracy_score(
+                        job_description, text, neural_score=neural_score
+                    )
+                # Use the super score as the base skills score
+                skills_score = ensemble_result['final_score']
+                # Ensemble doesn't explicitly return missing skills list in this version
+                missing_skills, ensemble_details = [], ensemble_result
+                print(f"✅ Ensemble Score: {skills_score:.1f}% | Neural: {ensemble_result['neural_score']:.1f} | Graph: {ensemble_result['graph_score']:.1f}")
+            except Exception as e:
+                print(f"❌ Ensemble Error: {str(e)}")
+                # Fallback to standard scoring
+                with span('cosine'):
+                    cosine_score = self.cosine_model.calculate_similarity(job_description, text)
+                with span('fuzzy'):
+                    fuzzy_score = self.fuzzy_model.calculate_fuzzy_score(job_description, text)
+                skills_score = (cosine_score + fuzzy_score) / 2
+                # Display skills' missing list, filled in by explain()
+                missing_skills, ensemble_details = None, None
+        else:
+            # Standard Logic
+            with span('cosine'):
+                cosine_score = self.cosine_model.calculate_similarity(job_description, text)
+            skills_score = (cosine_score + fuzzy_score) / 2
+            missing_skills, ensemble_details = None, None
+
+        # 2. Education Score (Placeholder)
+        edu_score = min(len(text) / 60, 100)
+
+        # --- New Modules ---
+        # 4. Persona Match
+        with span('persona'):
+            persona_score = self.persona_matcher.match_persona(job_description, text)
+
+        # 5. Career Trajectory
+        with span('career'):
+            career_score = self.career_predictor.analyze_trajectory(text)
+
+        # 6. Skill Gap
+        with span('gap'):
+            gap_result = self.skill_gap_analyzer.analyze_gap(job_description, text)
+        gap_score = gap_result['score'] if isinstance(gap_result, dict) else gap_result
+        if algorithm != 'ensemble': # Update missing skills if not ensemble (or merge)
+            missing_skills = gap_result.get('missing_skills', []) if isinstance(gap_result, dict) else []
+
+        # 7. Experience Transfer
+        with span('transfer'):
+            transfer_score = self.experience_transfer.calculate_transfer_score(job_description, text)
+
+        # 8. Innovation Potential
+        with span('innovation'):
+            innovation_score = self.innovation_scorer.calculate_innovation_score(text)
+
+        # 9. Neural Embeddings and 10. Knowledge Graph (if not ensemble)
+        if algorithm == 'ensemble':
+            # For ensemble, neural and knowledge are handled internally
+            neural_score, knowledge_score = 0, 0
+
+        return {
+            'scores': [skills_score, edu_score, persona_score, career_score, gap_score,
+                       transfer_score, innovation_score, neural_score, knowledge_score],
+            'missing_skills': missing_skills,
+            'ensemble_details': ensemble_details
+        }
+
+    def rank_resumes(self, job_description, resumes_data, weights, algorithm='all', candidate_k=None,
+                     group_duplicates=True, progress=None, preview_k=10, top_k=None, explain=None,
+                     use_cache=True, owner=None):
         """
         Orchestrates the ranking process.
+        With group_duplicates, near-duplicate resumes are scored once and listed under
+        the first copy; with an owner too, they are checked against the owner's earlier
+        uploads (see group_near_duplicates). With candidate_k, only the nearest
+        candidate_k resumes by embedding go through full scoring.
+
+        progress, when given, is called as progress(stage, done, total, top) after each
+        stage; while resumes are scored, top is a provisional [(filename, score)] list of
+        the preview_k resumes so far, normalized over the resumes scored up to that point.
+
+        Returns RankedResults, which reads like a list of result dicts; the GA convergence
+        data is its convergence_data and the weights applied (weights is left unchanged,
+        even in 'ga' mode) its weights. With top_k, only the top_k best resumes are returned.
+        Of the returned results, only the first `explain` (all when None) carry explanation
+        fields (matched/missing skills, per-module scores); the others only carry their
+        score, contact details, raw module scores and 'text', for explain() to complete
+        on demand.
+
+        With use_cache, raw module scores are looked up in (and added to) the score
+        cache; cache hits and misses of the run are in the results' cache_stats.
         """
-        # Store convergence data for metrics
-        self.convergence_data = None
+        report = progress or (lambda stage, done, total, top=None: None)
+        if group_duplicates:
+            with span('duplicates'):
+                resumes_data = self.group_near_duplicates(resumes_data, owner)
+            report('grouped', len(resumes_data), len(resumes_data))
+        if candidate_k:
+            with span('shortlist'):
+                resumes_data = self.shortlist(job_description, resumes_data, candidate_k)
+            report('shortlisted', len(resumes_data), len(resumes_data))
+        total = len(resumes_data)
+
+        # Convergence data for metrics; kept per call, as concurrent jobs share the engine
+        convergence_data = None
         
         # Optimize weights if GA is selected or run GA for convergence data
         if algorithm == 'ga' or algorithm == 'all':
-            optimized_weights, convergence_data = self.ga_optimizer.optimize()
-            self.convergence_data = convergence_data
+            with span('ga'):
+                optimized_weights, convergence_data = self.ga_optimizer.optimize()
             if algorithm == 'ga':
+                # The caller's weights stay as given
+                weights = dict(weights)
                 weights['skills'] = optimized_weights[0]
                 weights['education'] = optimized_weights[1]
 
         # Calculate raw scores for all resumes
-        raw_scores = {
-            'skills': [], 'education': [],
-            'persona': [], 'career': [], 'gap': [], 'transfer': [], 'innovation': [],
-            'neural': [], 'knowledge': []
-        }
+        raw_scores = {module: [] for module in SCORE_MODULES}
         
         # Store intermediate results to avoid re-calculation
         intermediate_results = []
 
-        for resume in resumes_data:
-            text = resume.get('text', '')
-            
-            # --- Super Ensemble Logic ---
-            if algorithm == 'ensemble':
-                try:
-                    ensemble_result = self.ensemble_system.get_super_accuracy_score(job_description, text)
-                    # Use the super score as the base skills score
-                    skills_score = ensemble_result['final_score']
-                    # We can store the detailed ensemble breakdown in intermediate results
-                    intermediate_results.append({
-                        'missing_skills': [], # Ensemble doesn't explicitly return missing skills list in this version
-                        'ensemble_details': ensemble_result
-                    })
-                    print(f"✅ Ensemble Score: {skills_score:.1f}% | Neural: {ensemble_result['neural_score']:.1f} | Graph: {ensemble_result['graph_score']:.1f}")
-                except Exception as e:
-                    print(f"❌ Ensemble Error: {str(e)}")
-                    # Fallback to standard scoring
-                    cosine_score = self.cosine_model.calculate_similarity(job_description, text)
-                    fuzzy_score = self.fuzzy_model.calculate_fuzzy_score(job_description, text)
-                    skills_score = (cosine_score + fuzzy_score) / 2
-                    _, missing_skills = self.fuzzy_model.match_skills(
-                        ['python', 'java', 'flask', 'sql', 'react', 'machine learning', 'ai'], 
-                        text
-                    )
-                    intermediate_results.append({
-                        'missing_skills': missing_skills,
-                        'ensemble_details': None
-                    })
-            else:
-                # Standard Logic
-                cosine_score = self.cosine_model.calculate_similarity(job_description, text)
-                fuzzy_score = self.fuzzy_model.calculate_fuzzy_score(job_description, text)
-                skills_score = (cosine_score + fuzzy_score) / 2
-                
-                # Extract skills for display (Standard)
-                _, missing_skills = self.fuzzy_model.match_skills(
-                    ['python', 'java', 'flask', 'sql', 'react', 'machine learning', 'ai'], 
-                    text
-                )
-                intermediate_results.append({
-                    'missing_skills': missing_skills,
-                    'ensemble_details': None
-                })
-
-            raw_scores['skills'].append(skills_score)
-            
-            # 2. Education Score (Placeholder)
-            edu_score = min(len(text) / 60, 100)
-            raw_scores['education'].append(edu_score)
-            
-            # --- New Modules ---
-            # 4. Persona Match
-            persona_score = self.persona_matcher.match_persona(job_description, text)
-            raw_scores['persona'].append(persona_score)
-            
-            # 5. Career Trajectory
-            career_score = self.career_predictor.analyze_trajectory(text)
-            raw_scores['career'].append(career_score)
-            
-            # 6. Skill Gap
-            gap_result = self.skill_gap_analyzer.analyze_gap(job_description, text)
-            gap_score = gap_result['score'] if isinstance(gap_result, dict) else gap_result
-            missing_skills_gap = gap_result.get('missing_skills', []) if isinstance(gap_result, dict) else []
-            raw_scores['gap'].append(gap_score)
-            if algorithm != 'ensemble': # Update missing skills if not ensemble (or merge)
-                 intermediate_results[-1]['missing_skills'] = missing_skills_gap
-            
-            # 7. Experience Transfer
-            transfer_score = self.experience_transfer.calculate_transfer_score(job_description, text)
-            raw_scores['transfer'].append(transfer_score)
-            
-            # 8. Innovation Potential
-            innovation_score = self.innovation_scorer.calculate_innovation_score(text)
-            raw_scores['innovation'].append(innovation_score)
-            
-            # 9. Neural Embeddings (if not ensemble)
-            if algorithm != 'ensemble':
-                neural_score = self.neural_ranker.get_semantic_score(job_description, text)
-                raw_scores['neural'].append(neural_score)
-                
-                # 10. Knowledge Graph
-                knowledge_score = self.knowledge_graph.graph_similarity(job_description, text)
-                raw_scores['knowledge'].append(knowledge_score)
-            else:
-                # For ensemble, neural and knowledge are handled internally
-                raw_scores['neural'].append(0)
-                raw_scores['knowledge'].append(0)
+        # Resumes already scored against this job description come from the score cache
+        cache = self.score_cache if use_cache else None
+        keys, cached = [None] * total, {}
+        if cache is not None:
+            version = self.score_version(algorithm)
+            mode = self.score_mode(algorithm)
+            with span('cache'):
+                keys = [cache.key(job_description, resume.get('text', ''), mode, version) for resume in resumes_data]
+                cached = cache.get_many(keys, version)
+        pending = [i for i in range(total) if keys[i] not in cached]
+        pending_texts = [resumes_data[i].get('text', '') for i in pending]
+        scoring_started = time.perf_counter()
 
-        # Normalize scores across the batch
-        # Note: For ensemble, we might NOT want to normalize skills if we want to show the raw >100% score
-        if algorithm == 'ensemble':
-            norm_skills = raw_scores['skills'] # Keep raw super scores
-        else:
-            norm_skills = self._normalize_scores(raw_scores['skills'])
-            
-        norm_edu = self._normalize_scores(raw_scores['education'])
-        # Normalize new metrics too (optional, but good for consistency)
-        norm_persona = self._normalize_scores(raw_scores['persona'])
-        norm_career = self._normalize_scores(raw_scores['career'])
-        norm_gap = self._normalize_scores(raw_scores['gap'])
-        norm_transfer = self._normalize_scores(raw_scores['transfer'])
-        norm_innovation = self._normalize_scores(raw_scores['innovation'])
-        norm_neural = self._normalize_scores(raw_scores['neural'])
-        norm_knowledge = self._normalize_scores(raw_scores['knowledge'])
-
-        ranked_results = []
+        # Neural embeddings: encode every resume in one batched call
+        neural_scores = {}
+        if algorithm in NEURAL_ALGORITHMS:
+            with span('neural'):
+                neural_scores = dict(zip(pending, self.neural_ranker.get_batch_semantic_scores(job_description, pending_texts)))
+            report('neural', total, total)
+
+        # Fuzzy token set ratio and knowledge graph scores are computed for the whole batch
+        fuzzy_scores = {}
+        knowledge_scores = {}
+        if algorithm != 'ensemble':
+            with span('fuzzy'):
+                fuzzy_scores = dict(zip(pending, self.fuzzy_model.calculate_batch_fuzzy_scores(job_description, pending_texts)))
+            report('fuzzy', total, total)
+            if algorithm in KNOWLEDGE_ALGORITHMS:
+                with span('knowledge'):
+                    knowledge_scores = dict(zip(pending, self.knowledge_graph.batch_graph_similarity(job_description, pending_texts)))
+                report('knowledge', total, total)
+
+        fresh = {}
+        report_every = max(total // 20, 1)
         for i, resume in enumerate(resumes_data):
-            # Calculate final weighted score
-            
-            if algorithm == 'ensemble':
-                # For ensemble, the skills score IS the final score (mostly)
-                # But we can still add the other factors as minor adjustments or just display them
-                final_score = norm_skills[i] # The super score
-            else:
-                base_score = (
-                    (norm_skills[i] * weights['skills']) + 
-                    (norm_edu[i] * weights['education'])
-                )
-                
-                # Average of ALL advanced metrics (now including neural and knowledge)
-                if algorithm == 'all':
-                    advanced_score = (
-                        norm_persona[i] + norm_career[i] + norm_gap[i] + 
-                        norm_transfer[i] + norm_innovation[i] + norm_neural[i] + norm_knowledge[i]
-                    ) / 7  # Now 7 metrics
-                else:
-                    # For specific algorithms, use subset
-                    advanced_score = (
-                        norm_persona[i] + norm_career[i] + norm_gap[i] + 
-                        norm_transfer[i] + norm_innovation[i]
-                    ) / 5
-                
-                # Final Score = 60% Base + 40% Advanced (increased weight for AI models)
-                final_score = (base_score * 0.6) + (advanced_score * 0.4)
-            
-            # Extract skills for display
-            matched_skills, _ = self.fuzzy_model.match_skills(
-                ['python', 'java', 'flask', 'sql', 'react', 'machine learning', 'ai'], 
-                resume.get('text', '')
-            )
-
-            ranked_results.append({
-                'filename': resume['filename'],
-                'score': float(round(final_score, 1)),
-                'matched_skills': matched_skills,
-                'missing_skills': intermediate_results[i]['missing_skills'],
-                'email': resume.get('email', 'N/A'),
-                'phone': resume.get('phone', 'N/A'),
-                'education': 'Extracted',
-                'ensemble_details': intermediate_results[i]['ensemble_details'],
-                # Add detailed scores for UI
-                'scores': {
-                    'persona': float(round(norm_persona[i], 1)),
-                    'career': float(round(norm_career[i], 1)),
-                    'gap': float(round(norm_gap[i], 1)),
-                    'transfer': float(round(norm_transfer[i], 1)),
-                    'innovation': float(round(norm_innovation[i], 1)),
-                    'neural': float(round(norm_neural[i], 1)),
-                    'knowledge': float(round(norm_knowledge[i], 1))
-                }
+            entry = cached.get(keys[i])
+            if entry is None:
+                entry = self._score_resume(job_description, resume.get('text', ''), algorithm, neural_scores.get(i, 0),
+                                           fuzzy_scores.get(i), knowledge_scores.get(i, 0))
+                # An ensemble that fell back to standard scoring may have failed transiently
+                if cache is not None and (algorithm != 'ensemble' or entry['ensemble_details'] is not None):
+                    fresh[keys[i]] = entry
+            for module, score in zip(SCORE_MODULES, entry['scores']):
+                raw_scores[module].append(score)
+            intermediate_results.append({
+                'missing_skills': entry['missing_skills'],
+                'ensemble_details': entry['ensemble_details']
             })
 
-        # Sort by score descending
-        ranked_results.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Attach convergence data if available
-        if self.convergence_data:
-            for result in ranked_results:
-                result['convergence_data'] = self.convergence_data
-        
+            if progress and ((i + 1) % report_every == 0 or i + 1 == total):
+                with span('preview'):
+                    _, provisional = self._combine_scores(raw_scores, weights, algorithm)
+                    top = np.argsort(-provisional, kind='stable')[:preview_k]
+                report('scoring', i + 1, total,
+                       [(resumes_data[j]['filename'], float(round(provisional[j], 1))) for j in top])
+        if cache is not None and pending:
+            # Average scoring time per resume: how costly a cached entry is to recompute
+            with span('cache'):
+                cache.put_many(fresh, version, cost=(time.perf_counter() - scoring_started) / len(pending))
+
+        with span('normalize'):
+            norm, final_scores = self._combine_scores(raw_scores, weights, algorithm)
+            order = self._top_order(final_scores, top_k)
+        report('normalized', total, total)
+
+        # Only the returned resumes are kept, in score order, as columns rather than dicts
+        ranked = [resumes_data[i] for i in order]
+        ranked_results = RankedResults(
+            SCORE_MODULES,
+            [resume['filename'] for resume in ranked],
+            np.round(final_scores[order], 1),
+            np.column_stack([np.asarray(raw_scores[module], dtype=float) for module in SCORE_MODULES])[order],
+            emails=[resume.get('email', 'N/A') for resume in ranked],
+            phones=[resume.get('phone', 'N/A') for resume in ranked],
+            duplicates=[resume.get('duplicates') for resume in ranked],
+            previously_seen=[resume.get('previously_seen') for resume in ranked],
+            # A by-product of ensemble scoring that would be costly to recompute
+            ensemble_details=[intermediate_results[i]['ensemble_details'] for i in order] if algorithm == 'ensemble' else None,
+            texts=[resume.get('text', '') for resume in ranked],
+            convergence_data=convergence_data
+        )
+        ranked_results.cache_stats = {'hits': total - len(pending), 'misses': len(pending)}
+        ranked_results.weights = dict(weights)
+        for position, i in enumerate(order[:len(order) if explain is None else explain]):
+            with span('explanation'):
+                result = self.explain(ranked_results[position], job_description, resumes_data[i].get('text', ''),
+                                      self.score_breakdown(norm, i), algorithm,
+                                      missing_skills=intermediate_results[i]['missing_skills'])
+            ranked_results.set_explanation(position, result)
         return ranked_results
-    
+
     def calculate_final_accuracy(self, job_description, resumes_data, ranked_results):
         """
         Calculate the unified accuracy score using the MetricsCalculator.
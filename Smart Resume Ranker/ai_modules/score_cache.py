@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from utils.result_store import to_json
+from utils.memory_budget import BudgetedCache
+
+
+class ScoreCache:
+    """
+    Raw module scores of (job description, resume, scoring mode) triples, so a job
+    description re-run against the same resumes skips their scoring. Normalization and
+    weighting are applied on top by the ranking engine.
+
+    Two tiers: an in-process LRU bounded by memory_bytes (and the process-wide memory
+    budget), in front of an optional SQLite file bounded by disk_bytes, both evicting
+    least recently used entries by their serialized size. Keys include a version string (scoring code, models and
+    lexicons), and entries of other versions are deleted once a new version is used.
+    """
+    def __init__(self, path=None, memory_bytes=32 * 1024 * 1024, disk_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = BudgetedCache('score_cache', max_bytes=memory_bytes)
+        self._versions = set()
+        # Seconds it took to score one entry, from the latest put_many
+        self._cost = 0.0
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_evictions': 0}
+        if path:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS scores (
+                        key TEXT PRIMARY KEY,
+                        version TEXT NOT NULL,
+                        data TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        used_at REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS scores_used_at ON scores (used_at);
+                """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(job_description, text, mode, version):
+        """
+        Cache key of a resume text scored against a job description in a scoring mode.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (version, mode, job_description, text):
+            part = part.encode('utf-8')
+            # Length-prefixed so no two different tuples hash the same bytes
+            digest.update(len(part).to_bytes(8, 'little') + part)
+        return digest.hexdigest()
+
+    def get_many(self, keys, version):
+        """
+        {key: entry} for the keys found in memory or on disk; disk hits are promoted.
+        """
+        self._use_version(version)
+        found, missing = {}, []
+        for key in keys:
+            data = self._memory.get(key)
+            if data is not None:
+                # Entries are kept serialized, so callers never share mutable scores
+                found[key] = json.loads(data)
+            else:
+                missing.append(key)
+
+        from_disk = {}
+        if missing and self.path:
+            try:
+                with self._connect() as conn:
+                    for start in range(0, len(missing), 500):
+                        batch = missing[start:start + 500]
+                        rows = conn.execute(
+                            f"SELECT key, data FROM scores WHERE version = ? AND key IN ({','.join('?' * len(batch))})",
+                            [version] + batch
+                        ).fetchall()
+                        from_disk.update(rows)
+                    if from_disk:
+                        now = time.time()
+                        conn.executemany("UPDATE scores SET used_at = ? WHERE key = ?", [(now, key) for key in from_disk])
+            except sqlite3.Error as e:
+                print(f"Score cache read failed: {str(e)}")
+
+        for key, data in from_disk.items():
+            found[key] = json.loads(data)
+            self._memory.put(key, data, cost=self._cost, size=len(data))
+        with self._lock:
+            self._counts['memory_hits'] += len(found) - len(from_disk)
+            self._counts['disk_hits'] += len(from_disk)
+            self._counts['hits'] = self._counts['memory_hits'] + self._counts['disk_hits']
+            self._counts['misses'] += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries, version, cost=None):
+        """
+        Stores {key: entry}; entries must be JSON-serializable. cost is the time (seconds)
+        it took to compute one entry, which keeps costly scores in memory longer.
+        """
+        if not entries:
+            return
+        self._use_version(version)
+        if cost is not None:
+            self._cost = cost
+        serialized = {key: to_json(entry) for key, entry in entries.items()}
+        for key, data in serialized.items():
+            self._memory.put(key, data, cost=self._cost, size=len(data))
+
+        if self.path:
+            now = time.time()
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                        [(key, version, data, len(data), now) for key, data in serialized.items()]
+                    )
+                    self._evict_disk(conn)
+            except sqlite3.Error as e:
+                print(f"Score cache write failed: {str(e)}")
+
+    def _evict_disk(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM scores").fetchone()[0]
+        if total <= self.disk_bytes:
+            return
+        # Evict down to 90% of the budget so eviction doesn't run on every write
+        excess = total - int(self.disk_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM scores ORDER BY used_at"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM scores WHERE key = ?", stale)
+        with self._lock:
+            self._counts['disk_evictions'] += len(stale)
+
+    def _use_version(self, version):
+        """
+        Drops entries of other versions the first time a version is used.
+        """
+        with self._lock:
+            if version in self._versions:
+                return
+            self._versions.add(version)
+            # In memory, stale entries can't be hit again and simply age out of the LRU
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM scores WHERE version != ?", (version,))
+            except sqlite3.Error as e:
+                print(f"Score cache cleanup failed: {str(e)}")
+
+    def clear(self):
+        self._memory.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM scores")
+
+    def get_counts(self):
+        """
+        Hit/miss counters since start-up, without touching the disk tier.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def get_stats(self):
+        """
+        Hit/miss counters since start-up and the size of both tiers.
+        """
+        stats = self.get_counts()
+        memory = self._memory.get_stats()
+        stats['memory_entries'] = memory['entries']
+        stats['memory_mb'] = memory['mb']
+        stats['memory_evictions'] = memory['evictions']
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups * 100, 1) if lookups else 0.0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scores").fetchone()
+                stats['disk_entries'] = entries
+                stats['disk_mb'] = round(size / (1024 * 1024), 2)
+            except sqlite3.Error as e:
+                print(f"Score cache stats failed: {str(e)}")
+        return stats
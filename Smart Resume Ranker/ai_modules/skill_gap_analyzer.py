@@ -3,8 +3,9 @@ import re
 from collections import defaultdict
 
 class SkillGapAnalyzer:
-    def __init__(self):
-        self.fuzzy_scorer = FuzzyResumeScorer()
+    def __init__(self, registry=None):
+        self.registry = registry
+        self._fuzzy_scorer = None
         self.skill_hierarchy = {
             'critical': ['python', 'java', 'sql', 'aws', 'machine learning', 'leadership', 'communication'],
             'important': ['react', 'node.js', 'docker', 'kubernetes', 'git', 'problem solving', 'teamwork'],
@@ -17,6 +18,15 @@ class SkillGapAnalyzer:
             'communication': ['communication', 'interpersonal', 'verbal', 'written']
         }
 
+    @property
+    def fuzzy_scorer(self):
+        """Fuzzy scorer, taken from the shared registry when one is attached"""
+        if self.registry is not None:
+            return self.registry.get('fuzzy')
+        if self._fuzzy_scorer is None:
+            self._fuzzy_scorer = FuzzyResumeScorer()
+        return self._fuzzy_scorer
+
     def _normalize_skill(self, skill):
         """Normalize skill variations to standard form"""
         skill_lower = skill.lower()
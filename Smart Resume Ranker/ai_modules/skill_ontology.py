@@ -0,0 +1,194 @@
+import os
+import csv
+import hashlib
+import numpy as np
+from .phrase_matcher import PhraseMatcher
+from utils.config import Config
+
+# Built-in fallback used when no ontology file is configured
+BUILTIN_RELATIONS = {
+    'python': ['django', 'flask', 'pandas', 'numpy', 'scikit-learn'],
+    'javascript': ['react', 'node', 'vue', 'angular', 'typescript'],
+    'data': ['sql', 'analysis', 'visualization', 'tableau', 'powerbi']
+}
+
+# Bumped whenever the .npz layout changes so stale caches are rebuilt
+CACHE_VERSION = 1
+
+
+class SkillOntology:
+    """
+    Undirected skill graph in CSR form.
+
+    Skill i is self.skill_names[i]; its neighbours are
+    self.indices[self.indptr[i]:self.indptr[i + 1]].
+    """
+    def __init__(self, skill_names, indptr, indices):
+        self.skill_names = list(skill_names)
+        self.skill_ids = {skill: i for i, skill in enumerate(self.skill_names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._matcher = None
+        self._digest = None
+
+    def __len__(self):
+        return len(self.skill_names)
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    @property
+    def matcher(self):
+        """Phrase matcher over the skill names, built on first use"""
+        if self._matcher is None:
+            self._matcher = PhraseMatcher(self.skill_names)
+        return self._matcher
+
+    @property
+    def nbytes(self):
+        """Memory held by the CSR arrays"""
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def digest(self):
+        """Short fingerprint of the skills and relations, e.g. to version cached scores"""
+        if self._digest is None:
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update('\n'.join(self.skill_names).encode('utf-8'))
+            digest.update(self.indptr.tobytes())
+            digest.update(self.indices.tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Builds the CSR adjacency from (skill, related_skill) pairs.
+        Names are lowercased; self-loops and duplicate edges are dropped.
+        """
+        skill_ids = {}
+        sources, targets = [], []
+        for a, b in edges:
+            a, b = a.strip().lower(), b.strip().lower()
+            if not a or not b:
+                continue
+            sources.append(skill_ids.setdefault(a, len(skill_ids)))
+            targets.append(skill_ids.setdefault(b, len(skill_ids)))
+
+        n = len(skill_ids)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        keep = sources != targets
+        pairs = np.unique(np.concatenate([
+            sources[keep] * n + targets[keep],
+            targets[keep] * n + sources[keep]
+        ]))
+        rows, cols = pairs // max(n, 1), pairs % max(n, 1)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(list(skill_ids), indptr, cols.astype(np.int32))
+
+    @classmethod
+    def from_relations(cls, relations):
+        """
+        Builds the ontology from a {skill: [related skills]} mapping.
+        """
+        return cls.from_edges((skill, related) for skill, group in relations.items() for related in group)
+
+    @classmethod
+    def load(cls, path, cache_path=None):
+        """
+        Loads an edge list file with one `skill,related_skill` pair per line
+        (tab-separated for .tsv files; lines starting with # are ignored).
+
+        The compiled CSR form is cached as an .npz next to the other caches and reused
+        while the source file is unchanged.
+        """
+        stat = os.stat(path)
+        signature = np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+        if cache_path is None:
+            cache_name = os.path.splitext(os.path.basename(path))[0] + '.npz'
+            cache_path = os.path.join(Config.CACHE_FOLDER, 'ontology', cache_name)
+
+        if os.path.exists(cache_path):
+            try:
+                with np.load(cache_path) as cached:
+                    if np.array_equal(cached['signature'], signature):
+                        names = bytes(cached['names']).decode('utf-8').split('\n') if len(cached['names']) else []
+                        return cls(names, cached['indptr'], cached['indices'])
+            except Exception as e:
+                print(f"Ignoring unreadable ontology cache {cache_path}: {str(e)}")
+
+        ontology = cls.from_edges(cls._read_edges(path))
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            names = np.frombuffer('\n'.join(ontology.skill_names).encode('utf-8'), dtype=np.uint8)
+            tmp_path = cache_path + '.tmp.npz'
+            np.savez(tmp_path, signature=signature, names=names,
+                     indptr=ontology.indptr, indices=ontology.indices)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache skill ontology: {str(e)}")
+        return ontology
+
+    @staticmethod
+    def _read_edges(path):
+        delimiter = '\t' if path.endswith('.tsv') else ','
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f, delimiter=delimiter):
+                if len(row) >= 2 and not row[0].lstrip().startswith('#'):
+                    yield row[0], row[1]
+
+    def neighbors(self, skill_id):
+        return self.indices[self.indptr[skill_id]:self.indptr[skill_id + 1]]
+
+    def _expand(self, frontier):
+        # Concatenated neighbour lists of every frontier node, without a Python loop
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(0, dtype=np.int32)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        return self.indices[offsets]
+
+    def bfs_distances(self, source_id, max_depth=None):
+        """
+        Hop distances from source_id to every skill within max_depth hops
+        (unbounded when None). Returns (ids, distances), source included at distance 0.
+        """
+        visited = np.zeros(len(self.skill_names), dtype=bool)
+        visited[source_id] = True
+        frontier = np.array([source_id], dtype=np.int64)
+        ids, distances = [frontier], [np.zeros(1, dtype=np.int32)]
+
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            reached = np.unique(self._expand(frontier))
+            frontier = reached[~visited[reached]].astype(np.int64)
+            visited[frontier] = True
+            ids.append(frontier)
+            distances.append(np.full(len(frontier), depth, dtype=np.int32))
+
+        return np.concatenate(ids), np.concatenate(distances)
+
+    def lookup(self, text):
+        """
+        Ids of the skills mentioned in the text (whole-token match on the lowercased text).
+        """
+        return np.asarray(self.matcher.find_ids(text), dtype=np.int64)
+
+
+def load_skill_ontology(path=None):
+    """
+    The configured ontology file, or the built-in relations when none is available.
+    """
+    path = path or Config.SKILL_ONTOLOGY_PATH
+    if path and os.path.exists(path):
+        try:
+            return SkillOntology.load(path)
+        except Exception as e:
+            print(f"Error loading skill ontology from {path}: {str(e)}")
+    return SkillOntology.from_relations(BUILTIN_RELATIONS)
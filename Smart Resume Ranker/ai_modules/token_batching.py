@@ -0,0 +1,83 @@
+import numpy as np
+
+POOLING_MODES = ('mean', 'max')
+
+
+def split_windows(token_ids, window, stride=None):
+    """
+    Splits a token id sequence into windows of at most `window` tokens.
+    stride defaults to the window size (no overlap); a smaller stride overlaps windows.
+    """
+    if window <= 0:
+        raise ValueError("window must be positive")
+    stride = stride or window
+    if not token_ids:
+        return []
+
+    windows = []
+    start = 0
+    while True:
+        windows.append(list(token_ids[start:start + window]))
+        if start + window >= len(token_ids):
+            break
+        start += stride
+    return windows
+
+
+def plan_batches(lengths, token_budget, max_batch_size=None):
+    """
+    Groups items into batches of similar length.
+
+    Items are sorted by length and packed greedily so that each batch, once padded to
+    its longest item, stays within token_budget tokens (batch size x longest length).
+    An item longer than the budget still gets a batch of its own.
+    Returns a list of index lists.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        # Sorted ascending, so the incoming item is the longest of the batch
+        padded = (len(current) + 1) * max(lengths[i], 1)
+        full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (padded > token_budget or full):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def padding_ratio(lengths, batches):
+    """
+    Fraction of padded token slots that are padding, for a batch plan.
+    """
+    total = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+    if total == 0:
+        return 0.0
+    return 1 - sum(lengths) / total
+
+
+def pool_chunks(chunk_vectors, owners, n_docs, mode='mean'):
+    """
+    Pools chunk embeddings back into one unit-length vector per document.
+    owners[i] is the document index of chunk i. Documents without chunks get a zero vector.
+    """
+    if mode not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling mode '{mode}'. Choose from {', '.join(POOLING_MODES)}")
+
+    chunk_vectors = np.asarray(chunk_vectors, dtype=np.float32)
+    owners = np.asarray(owners, dtype=np.int64)
+    dim = chunk_vectors.shape[1] if chunk_vectors.ndim == 2 else 0
+
+    if mode == 'mean':
+        pooled = np.zeros((n_docs, dim), dtype=np.float32)
+        np.add.at(pooled, owners, chunk_vectors)
+    else:
+        pooled = np.full((n_docs, dim), -np.inf, dtype=np.float32)
+        np.maximum.at(pooled, owners, chunk_vectors)
+        pooled[np.isinf(pooled)] = 0.0
+
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return np.divide(pooled, norms, out=np.zeros_like(pooled), where=norms > 0)
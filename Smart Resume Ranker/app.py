@@ -1,7 +1,11 @@
 import os
+import gzip
+import time
 import secrets
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, g
+from werkzeug.serving import WSGIRequestHandler
 from werkzeug.utils import secure_filename
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
@@ -14,7 +18,14 @@ from ai_modules.ranking_engine import RankingEngine
 from utils.file_parser import FileParser
 from utils.text_processor import TextProcessor
 from evaluation.visualization import Visualization
-from utils.performance_monitor import PerformanceMonitor
+from utils.performance_monitor import PerformanceMonitor, span
+from utils.result_store import ResultStore, to_json
+from utils.ranking_jobs import RankingJobs
+from utils.memory_budget import default_budget
+from utils.telemetry import default_telemetry
+from utils.profiling import RequestProfiler, profiling_allowed
+from utils.performance_history import PerformanceHistory
+from utils.config import Config
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = secrets.token_hex(16)
@@ -26,6 +37,7 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB per file
 MAX_FILES = 50  # Maximum number of files
 MIN_JD_LENGTH = 50  # Minimum job description length
 MAX_JD_LENGTH = 50000  # Maximum job description length
+GZIP_MIN_BYTES = 1024  # Smaller API responses are sent uncompressed
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max limit
@@ -35,8 +47,113 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Initialize Engines
 ranking_engine = RankingEngine()
+# Load the local embedding model in the background so startup isn't blocked
+ranking_engine.neural_ranker.warm_up()
 file_parser = FileParser()
 text_processor = TextProcessor()
+result_store = ResultStore(Config.RESULTS_DB, retention_days=Config.RESULT_RETENTION_DAYS)
+ranking_jobs = RankingJobs()
+performance_history = PerformanceHistory(
+    Config.PERFORMANCE_HISTORY_DB, capacity=Config.PERFORMANCE_HISTORY_SIZE,
+    regression_factor=Config.PERFORMANCE_REGRESSION_FACTOR, baseline_runs=Config.PERFORMANCE_BASELINE_RUNS
+)
+
+# Process-wide metrics, scraped from /metrics/prometheus
+HTTP_REQUESTS = default_telemetry.counter('srr_http_requests_total', 'HTTP requests by endpoint, method and status')
+HTTP_SECONDS = default_telemetry.histogram('srr_http_request_duration_seconds', 'HTTP request latency by endpoint')
+RANKINGS = default_telemetry.counter('srr_rankings_total', 'Completed ranking runs by source and algorithm')
+RANKING_SECONDS = default_telemetry.histogram('srr_ranking_duration_seconds', 'Duration of a ranking run (parsing included) by source')
+RANKING_ACCURACY = default_telemetry.histogram('srr_ranking_accuracy_percent', 'Estimated accuracy of ranking runs',
+                                               buckets=(75, 80, 85, 90, 95, 99))
+RESUMES_PROCESSED = default_telemetry.counter('srr_resumes_processed_total', 'Resumes ranked by source')
+PARSE_FAILURES = default_telemetry.counter('srr_parse_failures_total', 'Resumes without usable text by file type')
+
+def collect_ranking_jobs():
+    return {(('status', status),): count for status, count in ranking_jobs.counts().items()}
+
+def collect_cache_lookups():
+    lookups = {}
+    for name, stats in default_budget.get_stats()['caches'].items():
+        lookups[(('cache', name), ('result', 'hit'))] = stats['hits']
+        lookups[(('cache', name), ('result', 'miss'))] = stats['misses']
+    if ranking_engine.registry.is_loaded('score_cache'):
+        # The memory tier is the 'score_cache' budgeted cache; disk hits are counted separately
+        counts = ranking_engine.score_cache.get_counts()
+        lookups[(('cache', 'score_cache_disk'), ('result', 'hit'))] = counts['disk_hits']
+    return lookups
+
+def collect_cache_hit_ratio():
+    ratios = {}
+    lookups = collect_cache_lookups()
+    for (cache, result), hits in lookups.items():
+        misses = lookups.get((cache, ('result', 'miss')))
+        if result[1] == 'hit' and misses is not None and hits + misses:
+            ratios[(cache,)] = round(hits / (hits + misses), 4)
+    return ratios
+
+default_telemetry.collect('srr_ranking_jobs', 'Ranking jobs held by status (queued = queue depth)', collect_ranking_jobs)
+default_telemetry.collect('srr_cache_lookups_total', 'Cache lookups by cache and result', collect_cache_lookups, kind='counter')
+default_telemetry.collect('srr_cache_hit_ratio', 'Share of cache lookups that hit, since start-up', collect_cache_hit_ratio)
+default_telemetry.collect('srr_memory_budget_used_bytes', 'Bytes held by the in-memory caches',
+                          lambda: default_budget.used_bytes)
+
+# Algorithm names used as metric labels; anything else a client sends is counted as 'other'
+KNOWN_ALGORITHMS = ('all', 'ensemble', 'ga', 'cosine', 'fuzzy')
+
+def record_ranking(source, algorithm, resumes_count, seconds, accuracy=None):
+    RANKINGS.inc(source=source, algorithm=algorithm if algorithm in KNOWN_ALGORITHMS else 'other')
+    RESUMES_PROCESSED.inc(resumes_count, source=source)
+    RANKING_SECONDS.observe(seconds, source=source)
+    if accuracy is not None:
+        RANKING_ACCURACY.observe(accuracy)
+
+def profile_requested():
+    """
+    Whether the request carries the admin profiling token (X-Profile-Token header or a
+    profile_token form field); never true while no token is configured.
+    """
+    return profiling_allowed(request.headers.get('X-Profile-Token') or request.form.get('profile_token'))
+
+def file_type(filename):
+    return os.path.splitext(filename)[1].lower().lstrip('.') or 'none'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unknown'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+def explain_results(run, results, score_matrix=None):
+    """
+    Adds the explanation fields to stored results that were ranked without them and
+    saves them back, so each result is only explained once.
+    """
+    pending = [result for result in results if result.get('matched_skills') is None]
+    if pending:
+        norm = ranking_engine.normalized_scores(score_matrix or result_store.get_score_matrix(run['id']))
+        for result in pending:
+            ranking_engine.explain(result, run['job_description'] or '', result.get('text', ''),
+                                   ranking_engine.score_breakdown(norm, result['rank'] - 1), run['algorithm'])
+        result_store.update_results(run['id'], pending)
+    for result in results:
+        result.pop('text', None)
+    return results
+
+def load_run():
+    """
+    The current session's ranking run from the result store, or None.
+    """
+    run = result_store.get_run(session.get('result_id'))
+    if run and run['metrics'] is not None and run['convergence_data']:
+        run['metrics']['convergence_data'] = run['convergence_data']
+    return run
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -122,6 +239,54 @@ def validate_weights(weights):
     except Exception as e:
         return None, f"Error validating weights: {str(e)}"
 
+def save_upload(file):
+    """
+    Saves an uploaded file under a unique secure name in the upload folder.
+    Returns: (filename, filepath), or (None, None) for an unusable filename
+    """
+    filename = secure_filename(file.filename)
+    if not filename:
+        return None, None
+    
+    # Ensure unique filename
+    base, ext = os.path.splitext(filename)
+    counter = 1
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    while os.path.exists(filepath):
+        filename = f"{base}_{counter}{ext}"
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        counter += 1
+    
+    file.save(filepath)
+    return filename, filepath
+
+def prepare_resume(filename, raw_text):
+    """
+    Cleans resume text and extracts its metadata for the ranking engine
+    Returns: (resume_data, error_message)
+    """
+    if not raw_text or len(raw_text.strip()) < 10:
+        return None, "No readable content found"
+    
+    with span('clean'):
+        clean_text = text_processor.clean_text(raw_text)
+    if not clean_text or len(clean_text.strip()) < 10:
+        return None, "No meaningful content after processing"
+    
+    with span('clean'):
+        email, phone = text_processor.extract_email(raw_text), text_processor.extract_phone(raw_text)
+    with span('minhash'):
+        # MinHash signature for near-duplicate grouping
+        minhash = ranking_engine.duplicate_index.signature(clean_text)
+    return {
+        'filename': filename,
+        'text': clean_text,
+        'email': email,
+        'phone': phone,
+        'education': 'Not Extracted',
+        'minhash': minhash
+    }, ""
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -169,7 +334,6 @@ def upload_files():
             return redirect(url_for('index'))
         
         saved_files = []
-        resumes_data = []
         validation_errors = []
         
         # Process Job Description
@@ -182,7 +346,7 @@ def upload_files():
             flash(f'Error processing job description: {str(e)}', 'error')
             return redirect(url_for('index'))
         
-        # Validate and process each file
+        # Validate and save each file; parsing and ranking run in a background job
         for idx, file in enumerate(files, 1):
             # Validate file
             is_valid, error_msg = validate_file(file)
@@ -191,207 +355,399 @@ def upload_files():
                 continue
             
             try:
-                # Save file securely
-                filename = secure_filename(file.filename)
+                filename, filepath = save_upload(file)
                 if not filename:
                     validation_errors.append(f"File {idx}: Invalid filename")
                     continue
-                
-                # Ensure unique filename
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                while os.path.exists(filepath):
-                    filename = f"{base}_{counter}{ext}"
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    counter += 1
-                
-                file.save(filepath)
-                saved_files.append(filepath)
-                
-                # Extract and Process Text
-                raw_text = file_parser.extract_text(filepath)
-                if not raw_text or len(raw_text.strip()) < 10:
-                    validation_errors.append(f"File '{filename}': No readable content found")
-                    os.remove(filepath)  # Clean up
-                    continue
-                
-                clean_text = text_processor.clean_text(raw_text)
-                if not clean_text or len(clean_text.strip()) < 10:
-                    validation_errors.append(f"File '{filename}': No meaningful content after processing")
-                    os.remove(filepath)  # Clean up
-                    continue
-                
-                # Extract Metadata
-                email = text_processor.extract_email(raw_text)
-                phone = text_processor.extract_phone(raw_text)
-                
-                resumes_data.append({
-                    'filename': filename,
-                    'text': clean_text,
-                    'raw_text': raw_text,
-                    'email': email,
-                    'phone': phone,
-                    'education': 'Not Extracted'
-                })
-            
+                saved_files.append((filename, filepath))
             except Exception as e:
-                error_msg = f"File '{file.filename}': Error processing - {str(e)}"
-                validation_errors.append(error_msg)
-                # Clean up saved file if exists
-                if filepath and os.path.exists(filepath):
-                    try:
-                        os.remove(filepath)
-                    except:
-                        pass
-        
-        # Check if we have any valid resumes
-        if len(resumes_data) == 0:
-            error_summary = "No valid resumes could be processed."
-            if validation_errors:
-                error_summary += " Errors:\n" + "\n".join(validation_errors[:5])  # Show first 5 errors
-                if len(validation_errors) > 5:
-                    error_summary += f"\n... and {len(validation_errors) - 5} more errors"
-            flash(error_summary, 'error')
-            return redirect(url_for('index'))
+                validation_errors.append(f"File '{file.filename}': Error saving - {str(e)}")
         
-        # Show warnings for failed files
-        if validation_errors:
-            warning_msg = f"Processed {len(resumes_data)} resumes successfully. "
-            warning_msg += f"{len(validation_errors)} files failed validation."
-            flash(warning_msg, 'warning')
+        if not saved_files:
+            flash(summarize_errors("No valid resumes could be processed.", validation_errors), 'error')
+            return redirect(url_for('index'))
         
-        # Run Ranking Engine with Performance Monitoring
+        profile = profile_requested()
+        # Resumes are only recognised as seen before within the uploading session
+        owner = session.setdefault('owner_id', secrets.token_hex(8))
+        job_id = ranking_jobs.submit(
+            lambda report: run_ranking_job(clean_jd, saved_files, normalized_weights, algorithm, validation_errors, report,
+                                           profile=profile, owner=owner)
+        )
+        return redirect(url_for('progress', job_id=job_id))
+    
+    except Exception as e:
+        flash(f'Unexpected error: {str(e)}', 'error')
+        return redirect(url_for('index'))
+
+def summarize_errors(summary, errors):
+    if errors:
+        summary += " Errors:\n" + "\n".join(errors[:5])  # Show first 5 errors
+        if len(errors) > 5:
+            summary += f"\n... and {len(errors) - 5} more errors"
+    return summary
+
+def run_ranking_job(clean_jd, saved_files, weights, algorithm, validation_errors, report, profile=False, owner=None):
+    """
+    Background part of an upload: parses the saved files, ranks them and stores the run,
+    reporting progress events along the way. Returns what /progress/<id>/finish needs.
+    With profile, parsing and ranking are profiled and the profile is stored under the run id.
+    owner scopes the check against earlier uploads (see RankingEngine.group_near_duplicates).
+    """
+    resumes_data = []
+    validation_errors = list(validation_errors)
+    profiler = RequestProfiler().start() if profile else None
+    
+    # Parsing is measured too, so the stage breakdown covers the whole job
+    monitor = PerformanceMonitor()
+    monitor.start_monitoring()
+    monitor.set_algorithm(algorithm)
+    
+    for idx, (filename, filepath) in enumerate(saved_files, 1):
         try:
-            monitor = PerformanceMonitor()
-            monitor.start_monitoring()
-            monitor.set_algorithm(algorithm)
-            monitor.set_resumes_count(len(resumes_data))
-            
-            ranked_results = ranking_engine.rank_resumes(clean_jd, resumes_data, normalized_weights, algorithm)
-            
-            monitor.stop_monitoring()
-            accuracy = monitor.calculate_accuracy(ranked_results)
-            metrics_report = monitor.get_metrics_report()
-            
-            # Extract convergence data from ranked results if available
-            convergence_data = None
-            if ranked_results and len(ranked_results) > 0:
-                convergence_data = ranked_results[0].get('convergence_data', None)
-            
-            # Add convergence data to metrics report
-            if convergence_data:
-                metrics_report['convergence_data'] = convergence_data
-            
-            # Calculate average algorithm scores from ranked results
-            algorithm_scores = {
-                'genetic': 92,  # GA optimization score
-                'cosine': 0,
-                'fuzzy': 0,
-                'neural': 0,
-                'career': 0,
-                'transfer': 0,
-                'skill_gap': 0,
-                'persona': 0,
-                'innovation': 0,
-                'knowledge': 0,
-                'ensemble': 0
-            }
-            
-            # Calculate average scores from individual resume scores
-            if ranked_results:
-                for resume in ranked_results:
-                    if 'scores' in resume:
-                        algorithm_scores['persona'] += resume['scores'].get('persona', 0)
-                        algorithm_scores['career'] += resume['scores'].get('career', 0)
-                        algorithm_scores['skill_gap'] += resume['scores'].get('gap', 0)
-                        algorithm_scores['transfer'] += resume['scores'].get('transfer', 0)
-                        algorithm_scores['innovation'] += resume['scores'].get('innovation', 0)
-                        algorithm_scores['neural'] += resume['scores'].get('neural', 0)
-                        algorithm_scores['knowledge'] += resume['scores'].get('knowledge', 0)
-                
-                # Average the scores
-                num_resumes = len(ranked_results)
-                for key in ['persona', 'career', 'skill_gap', 'transfer', 'innovation', 'neural', 'knowledge']:
-                    if algorithm_scores[key] > 0:
-                        algorithm_scores[key] = round(algorithm_scores[key] / num_resumes, 1)
-                
-                # Estimate cosine and fuzzy from final scores (approximation)
-                avg_score = sum(r['score'] for r in ranked_results) / num_resumes
-                algorithm_scores['cosine'] = round(min(avg_score * 1.1, 100), 1)
-                algorithm_scores['fuzzy'] = round(min(avg_score * 1.05, 100), 1)
-                algorithm_scores['ensemble'] = round(min(accuracy, 100), 1)
-            
-            # Store in session
-            session['results'] = ranked_results
-            session['algorithm'] = algorithm
-            session['metrics'] = metrics_report
-            session['unified_accuracy'] = accuracy
-            session['resumes_count'] = len(ranked_results)
-            session['execution_time'] = metrics_report['performance']['execution_time_sec']
-            session['algorithm_scores'] = algorithm_scores
-            
-            # Update cumulative statistics
-            session['total_resumes_processed'] = session.get('total_resumes_processed', 0) + len(ranked_results)
-            session['total_executions'] = session.get('total_executions', 0) + 1
-            session['cumulative_time'] = session.get('cumulative_time', 0) + metrics_report['performance']['execution_time_sec']
-            session['avg_accuracy'] = ((session.get('avg_accuracy', 0) * (session['total_executions'] - 1)) + accuracy) / session['total_executions']
-            
-            flash(f'Successfully ranked {len(ranked_results)} resumes using {algorithm} algorithm', 'success')
-            return redirect(url_for('results'))
-        
+            # Extract and Process Text
+            with span('parse'):
+                raw_text = file_parser.extract_text(filepath)
+            resume, error_msg = prepare_resume(filename, raw_text)
+            if resume:
+                resumes_data.append(resume)
+            else:
+                PARSE_FAILURES.inc(file_type=file_type(filename))
+                validation_errors.append(f"File '{filename}': {error_msg}")
+                os.remove(filepath)  # Clean up
         except Exception as e:
-            flash(f'Error during ranking: {str(e)}', 'error')
-            # Clean up uploaded files
-            for filepath in saved_files:
+            PARSE_FAILURES.inc(file_type=file_type(filename))
+            validation_errors.append(f"File '{filename}': Error processing - {str(e)}")
+            if os.path.exists(filepath):
                 try:
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
+                    os.remove(filepath)
                 except:
                     pass
-            return redirect(url_for('index'))
+        report({'stage': 'parsed', 'done': idx, 'total': len(saved_files)})
+    
+    # Check if we have any valid resumes
+    if not resumes_data:
+        monitor.stop_monitoring()
+        if profiler is not None:
+            profiler.stop()
+        raise ValueError(summarize_errors("No valid resumes could be processed.", validation_errors))
     
+    def on_progress(stage, done, total, top=None):
+        event = {'stage': stage, 'done': done, 'total': total}
+        if top is not None:
+            event['top'] = [{'filename': filename, 'score': score} for filename, score in top]
+        report(event)
+    
+    # Run Ranking Engine with Performance Monitoring
+    try:
+        monitor.set_resumes_count(len(resumes_data))
+        
+        # Explanations (matched/missing skills, score breakdowns) are computed when viewed
+        ranked_results = ranking_engine.rank_resumes(clean_jd, resumes_data, weights, algorithm,
+                                                     progress=on_progress, explain=0, owner=owner)
+        
+        monitor.stop_monitoring()
+        profile_data = profiler.stop() if profiler is not None else None
+        accuracy = monitor.calculate_accuracy(ranked_results)
+        metrics_report = monitor.get_metrics_report()
+        # The metrics page links the profile stored under the run id
+        metrics_report['profiled'] = profile_data is not None
+        
+        # Per-component load cost from the shared model registry
+        metrics_report['models'] = ranking_engine.get_model_stats()
+        # Score cache hits/misses of this run, next to the cache's totals since start-up
+        metrics_report['score_cache'] = dict(
+            ranking_engine.score_cache.get_stats(),
+            run_hits=ranked_results.cache_stats['hits'], run_misses=ranked_results.cache_stats['misses']
+        )
+        # Bytes held by every in-memory cache against the process-wide budget
+        metrics_report['memory_budget'] = default_budget.get_stats()
+        
+        # Persist the run server-side; the session only keeps its id
+        algorithm_scores = average_algorithm_scores(
+            ranked_results.scores.tolist(), ranking_engine.normalized_scores(ranked_results.score_matrix()), accuracy
+        )
+        run_id = result_store.save_run(
+            ranked_results, algorithm, metrics=metrics_report,
+            accuracy=accuracy, algorithm_scores=algorithm_scores,
+            convergence_data=ranked_results.convergence_data,
+            weights=ranked_results.weights, job_description=clean_jd
+        )
+        if profile_data is not None:
+            result_store.save_profile(run_id, *profile_data)
+        try:
+            performance_history.record(run_id, metrics_report)
+        except Exception as e:
+            print(f"Could not record performance history: {str(e)}")
+        record_ranking('upload', algorithm, len(resumes_data), metrics_report['performance']['execution_time_sec'], accuracy)
     except Exception as e:
-        flash(f'Unexpected error: {str(e)}', 'error')
+        monitor.stop_monitoring()
+        if profiler is not None:
+            profiler.stop()
+        # Clean up uploaded files
+        for _, filepath in saved_files:
+            try:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+            except:
+                pass
+        raise ValueError(f'Error during ranking: {str(e)}')
+    
+    return {
+        'run_id': run_id,
+        'algorithm': algorithm,
+        'resumes_count': len(ranked_results),
+        'execution_time': metrics_report['performance']['execution_time_sec'],
+        'accuracy': accuracy,
+        'validation_errors': validation_errors
+    }
+
+def average_algorithm_scores(final_scores, norm, accuracy):
+    """
+    Average per-algorithm scores of a run for the analytics pages, from its final
+    scores and normalized module scores (RankingEngine.normalized_scores).
+    """
+    # Calculate average algorithm scores from ranked results
+    algorithm_scores = {
+        'genetic': 92,  # GA optimization score
+        'cosine': 0,
+        'fuzzy': 0,
+        'neural': 0,
+        'career': 0,
+        'transfer': 0,
+        'skill_gap': 0,
+        'persona': 0,
+        'innovation': 0,
+        'knowledge': 0,
+        'ensemble': 0
+    }
+    
+    if final_scores:
+        # Average the rounded per-resume module scores shown on the results page
+        num_resumes = len(final_scores)
+        for key, module in [('persona', 'persona'), ('career', 'career'), ('skill_gap', 'gap'),
+                            ('transfer', 'transfer'), ('innovation', 'innovation'),
+                            ('neural', 'neural'), ('knowledge', 'knowledge')]:
+            total = float(np.round(norm[module], 1).sum())
+            if total > 0:
+                algorithm_scores[key] = round(total / num_resumes, 1)
+        
+        # Estimate cosine and fuzzy from final scores (approximation)
+        avg_score = sum(final_scores) / num_resumes
+        algorithm_scores['cosine'] = round(min(avg_score * 1.1, 100), 1)
+        algorithm_scores['fuzzy'] = round(min(avg_score * 1.05, 100), 1)
+        algorithm_scores['ensemble'] = round(min(accuracy, 100), 1)
+    
+    return algorithm_scores
+
+@app.route('/progress/<job_id>')
+def progress(job_id):
+    if ranking_jobs.get(job_id) is None:
+        flash('Ranking job not found or expired. Please upload resumes again.', 'warning')
         return redirect(url_for('index'))
+    return render_template('progress.html', job_id=job_id)
+
+@app.route('/progress/<job_id>/events')
+def progress_events(job_id):
+    """
+    Server-Sent Events stream of a ranking job's progress; resumes after Last-Event-ID.
+    """
+    try:
+        after = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        after = 0
+    
+    def stream():
+        last = after
+        while True:
+            events, finished = ranking_jobs.events(job_id, after=last)
+            if events is None:
+                yield "event: error\ndata: {\"message\": \"Unknown job\"}\n\n"
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+            for event in events:
+                last = event['id']
+                yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {to_json(event)}\n\n"
+            if finished and not events:
+                return
+    
+    return app.response_class(stream(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/progress/<job_id>/finish')
+def progress_finish(job_id):
+    """
+    Attaches a finished job's run to the session and shows its results.
+    """
+    job = ranking_jobs.get(job_id)
+    if job is None:
+        flash('Ranking job not found or expired. Please upload resumes again.', 'warning')
+        return redirect(url_for('index'))
+    if job['status'] == 'error':
+        flash(job['error'], 'error')
+        return redirect(url_for('index'))
+    if job['status'] != 'done':
+        return redirect(url_for('progress', job_id=job_id))
+    
+    result = job['result']
+    if session.get('result_id') == result['run_id']:
+        return redirect(url_for('results'))
+    session['result_id'] = result['run_id']
+    
+    # Show warnings for failed files
+    if result['validation_errors']:
+        warning_msg = f"Processed {result['resumes_count']} resumes successfully. "
+        warning_msg += f"{len(result['validation_errors'])} files failed validation."
+        flash(warning_msg, 'warning')
+    
+    # Update cumulative statistics
+    session['total_resumes_processed'] = session.get('total_resumes_processed', 0) + result['resumes_count']
+    session['total_executions'] = session.get('total_executions', 0) + 1
+    session['cumulative_time'] = session.get('cumulative_time', 0) + result['execution_time']
+    session['avg_accuracy'] = ((session.get('avg_accuracy', 0) * (session['total_executions'] - 1)) + result['accuracy']) / session['total_executions']
+    
+    flash(f"Successfully ranked {result['resumes_count']} resumes using {result['algorithm']} algorithm", 'success')
+    return redirect(url_for('results'))
 
 # Update the ranking results to preprocess styles before rendering
 @app.route('/results')
 def results():
     try:
-        results_data = session.get('results', [])
-        algorithm = session.get('algorithm', 'all')
-        metrics = session.get('metrics', None)
-        unified_accuracy = session.get('unified_accuracy', 95.0)
-        
-        if not results_data:
+        run = load_run()
+        if not run or not run['resumes_count']:
             flash('No results available. Please upload resumes first.', 'warning')
             return redirect(url_for('index'))
+
+        # Only the requested page of results is loaded from the store
+        per_page = Config.RESULTS_PER_PAGE
+        total = run['resumes_count']
+        pages = (total + per_page - 1) // per_page
+        page = min(max(request.args.get('page', 1, type=int), 1), pages)
+        offset = (page - 1) * per_page
+        results_data = result_store.get_results(run['id'], offset, per_page)
+        top_score = results_data[0]['score'] if page == 1 else result_store.get_results(run['id'], 0, 1)[0]['score']
+        
+        # The row summary needs the module scores; other explanations load with the row details
+        norm = None
+        for result in results_data:
+            if 'scores' not in result:
+                norm = norm or ranking_engine.normalized_scores(result_store.get_score_matrix(run['id']))
+                result['scores'] = ranking_engine.score_breakdown(norm, result['rank'] - 1)
         
         # Preprocess scores and styles
         for result in results_data:
             result['score'] = min(result.get('score', 0), 100)
             result['style'] = f"width: {result['score']}%;"
         
-        return render_template('results.html', results=results_data, algorithm=algorithm, metrics=metrics, unified_accuracy=unified_accuracy)
+        unified_accuracy = run['accuracy'] if run['accuracy'] is not None else 95.0
+        return render_template('results.html', results=results_data, algorithm=run['algorithm'],
+                               metrics=run['metrics'], unified_accuracy=unified_accuracy,
+                               page=page, pages=pages, offset=offset, total=total,
+                               top_score=min(top_score, 100))
     
     except Exception as e:
         flash(f'Error displaying results: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/results/matrix')
+def results_matrix():
+    """
+    Raw per-module scores of the current run, for re-weighting in the browser.
+    """
+    run = load_run()
+    score_matrix = result_store.get_score_matrix(run['id']) if run else None
+    if score_matrix is None:
+        return api_error('No re-rankable results available', status=404)
+    return json_response(dict(score_matrix, algorithm=run['algorithm']))
+
+@app.route('/rerank', methods=['POST'])
+def rerank():
+    """
+    Re-ranks the current run with new weights from its stored raw module scores,
+    without re-parsing or rescoring any resume.
+    """
+    try:
+        run = result_store.get_run(session.get('result_id'))
+        score_matrix = result_store.get_score_matrix(run['id']) if run else None
+        if score_matrix is None:
+            flash('No re-rankable results available. Please upload resumes again.', 'warning')
+            return redirect(url_for('index'))
+        
+        try:
+            weights = {
+                'skills': float(request.form.get('weight_skills', 0.7)),
+                'education': float(request.form.get('weight_edu', 0.3))
+            }
+        except ValueError:
+            flash('Invalid weight values. Please enter valid numbers', 'error')
+            return redirect(url_for('results'))
+        
+        normalized_weights, weight_error = validate_weights(weights)
+        if not normalized_weights:
+            flash(weight_error, 'error')
+            return redirect(url_for('results'))
+        
+        started = time.perf_counter()
+        final_scores = ranking_engine.rerank(score_matrix, normalized_weights, run['algorithm'])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        # Results come back in the old rank order, which is also the matrix row order
+        reranked = []
+        for result, score, row in zip(result_store.iter_results(run['id'], with_text=True), final_scores, score_matrix['rows']):
+            result['score'] = float(round(score, 1))
+            result['raw_scores'] = dict(zip(score_matrix['modules'], row))
+            reranked.append(result)
+        reranked.sort(key=lambda x: x['score'], reverse=True)
+        
+        accuracy = PerformanceMonitor().calculate_accuracy(reranked)
+        # A profile stays stored under (and downloadable for) the run it was taken of
+        metrics = {key: value for key, value in run['metrics'].items() if key != 'profiled'} if run['metrics'] else run['metrics']
+        session['result_id'] = result_store.save_run(
+            reranked, run['algorithm'], metrics=metrics, accuracy=accuracy,
+            algorithm_scores=average_algorithm_scores(
+                [result['score'] for result in reranked], ranking_engine.normalized_scores(score_matrix), accuracy
+            ),
+            convergence_data=run['convergence_data'], weights=normalized_weights,
+            job_description=run['job_description']
+        )
+        flash(f"Re-ranked {len(reranked)} resumes with skills {normalized_weights['skills']:.0%} / "
+              f"education {normalized_weights['education']:.0%} in {elapsed_ms:.2f} ms", 'success')
+        return redirect(url_for('results'))
+    
+    except Exception as e:
+        flash(f'Error re-ranking results: {str(e)}', 'error')
+        return redirect(url_for('results'))
+
+@app.route('/results/<int:rank>/details')
+def result_details(rank):
+    """
+    Explanation of one ranked candidate (computed on first request, then stored):
+    an HTML fragment for the results page, or JSON with ?format=json.
+    """
+    run = load_run()
+    found = result_store.get_results(run['id'], rank - 1, 1, with_text=True) if run and rank > 0 else []
+    if not found:
+        if request.args.get('format') == 'json':
+            return api_error('Result not found', status=404)
+        return 'Result not found', 404
+    result = explain_results(run, found)[0]
+    if request.args.get('format') == 'json':
+        return json_response(result)
+    return render_template('result_details.html', resume=result)
+
 @app.route('/visualize')
 def visualize():
     try:
-        results_data = session.get('results', [])
-        metrics = session.get('metrics', None)
-        algorithm = session.get('algorithm', 'all')
-        
-        if not results_data:
+        run = load_run()
+        if not run or not run['resumes_count']:
             flash('No results available for visualization. Please upload resumes first.', 'warning')
             return redirect(url_for('index'))
+        metrics = run['metrics']
+        algorithm = run['algorithm']
 
         # Generate Plots using REAL data
-        scores = [r['score'] for r in results_data]
+        scores = result_store.get_scores(run['id'])
         
         if not scores or all(s == 0 for s in scores):
             flash('No valid scores to visualize', 'warning')
@@ -400,7 +756,7 @@ def visualize():
         # 1. Score Distribution (REAL DATA)
         dist_plot = Visualization.plot_score_distribution(scores)
         
-        # 2. GA Convergence - Use REAL convergence data from session
+        # 2. GA Convergence - Use REAL convergence data from the stored run
         ga_convergence_history = []
         if metrics and 'convergence_data' in metrics:
             convergence_data = metrics['convergence_data']
@@ -425,37 +781,63 @@ def visualize():
 @app.route('/download')
 def download():
     try:
-        results_data = session.get('results', [])
-        if not results_data:
+        run = load_run()
+        if not run or not run['resumes_count']:
             flash('No results available to download. Please upload resumes first.', 'warning')
             return redirect(url_for('index'))
         
         # Clean data for CSV
         export_data = []
-        for r in results_data:
-            export_data.append({
-                'Filename': r.get('filename', 'Unknown'),
-                'Score': r.get('score', 0),
-                'Email': r.get('email', 'N/A'),
-                'Phone': r.get('phone', 'N/A'),
-                'Matched Skills': ", ".join(r.get('matched_skills', []))
-            })
+        # Pages through the stored results, explaining those not explained yet
+        score_matrix = result_store.get_score_matrix(run['id'])
+        for page in result_store.iter_pages(run['id'], with_text=True):
+            for r in explain_results(run, page, score_matrix):
+                export_data.append({
+                    'Filename': r.get('filename', 'Unknown'),
+                    'Score': r.get('score', 0),
+                    'Email': r.get('email', 'N/A'),
+                    'Phone': r.get('phone', 'N/A'),
+                    'Matched Skills': ", ".join(r.get('matched_skills', []))
+                })
         
         df = pd.DataFrame(export_data)
-        csv_path = os.path.join(app.config['UPLOAD_FOLDER'], 'results.csv')
-        df.to_csv(csv_path, index=False)
+        csv_buffer = io.BytesIO(df.to_csv(index=False).encode('utf-8'))
         
-        return send_file(csv_path, as_attachment=True, download_name='resume_rankings.csv')
+        return send_file(csv_buffer, mimetype='text/csv', as_attachment=True, download_name='resume_rankings.csv')
     
     except Exception as e:
         flash(f'Error generating CSV download: {str(e)}', 'error')
         return redirect(url_for('results'))
 
+@app.route('/metrics/prometheus')
+def metrics_prometheus():
+    """Process-wide counters and latency histograms in the Prometheus text format"""
+    return app.response_class(default_telemetry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/metrics/profile/<profile_id>/<kind>')
+def download_profile(profile_id, kind):
+    """
+    Collapsed stacks ('collapsed') or pstats data ('pstats') of a profiled request, for
+    the session that ran it or a request carrying the admin profiling token.
+    """
+    token = request.headers.get('X-Profile-Token') or request.args.get('token')
+    if kind not in ('collapsed', 'pstats') or (session.get('result_id') != profile_id and not profiling_allowed(token)):
+        return 'Profile not found', 404
+    data = result_store.get_profile(profile_id, kind)
+    if data is None:
+        return 'Profile not found', 404
+    if kind == 'collapsed':
+        return send_file(io.BytesIO(data), mimetype='text/plain', as_attachment=True,
+                         download_name=f'profile-{profile_id}.collapsed.txt')
+    return send_file(io.BytesIO(data), mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'profile-{profile_id}.pstats')
+
 @app.route('/metrics')
 def metrics_dashboard():
     """Comprehensive evaluation metrics dashboard"""
-    metrics = session.get('metrics', None)
-    unified_accuracy = session.get('unified_accuracy', None)
+    run = load_run()
+    metrics = run['metrics'] if run else None
+    unified_accuracy = run['accuracy'] if run else None
     
     # Calculate convergence rate from GA data if available
     convergence_rate = None
@@ -465,11 +847,200 @@ def metrics_dashboard():
     
     return render_template('metrics.html', 
                          metrics=metrics,
+                         history=performance_history.summary(),
+                         run_record=performance_history.get(run['id']) if run else None,
+                         profile_id=run['id'] if metrics and metrics.get('profiled') else None,
                          unified_accuracy=unified_accuracy,
                          convergence_rate=convergence_rate)
 
 
+def json_response(payload, status=200):
+    """
+    JSON response for API clients, gzip-compressed when the client accepts it.
+    """
+    body = to_json(payload).encode('utf-8')
+    response = app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def api_error(message, status=400, **extra):
+    return json_response({'error': message, **extra}, status=status)
+
+def parse_flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+@app.route('/api/rank', methods=['POST'])
+def api_rank():
+    """
+    Ranks resumes without the HTML flow.
+
+    Accepts a JSON body {"job_description", "resumes": [{"id", "text"}, ...], "weights":
+    {"skills", "education"}, "algorithm", "compact", "candidate_k", "top_k"} with
+    pre-extracted texts, or a multipart form with the same fields as /upload (plus
+    "compact", "candidate_k" and "top_k"). top_k limits the response to the best top_k
+    resumes; candidate_k (at least 1) limits full scoring to the resumes nearest to the
+    job description by embedding. Compact responses only carry ids and scores.
+
+    With the admin profiling token (see profile_requested), the request is profiled and
+    the response's X-Profile-Id header names the stored profile.
+    """
+    if not profile_requested():
+        return rank_api_request()
+    profiler = RequestProfiler().start()
+    try:
+        response = rank_api_request()
+    finally:
+        profile_data = profiler.stop()
+    profile_id = secrets.token_urlsafe(16)
+    result_store.save_profile(profile_id, *profile_data)
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+def rank_api_request():
+    """Parses, ranks and answers an /api/rank request; uploaded files are not kept"""
+    started = time.perf_counter()
+    saved_paths = []
+    try:
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                return api_error('Request body must be a JSON object')
+            job_description = str(payload.get('job_description', '')).strip()
+            algorithm = payload.get('algorithm', 'all')
+            weights = payload.get('weights') or {}
+            compact = parse_flag(payload.get('compact', False))
+            candidate_k = payload.get('candidate_k')
+            top_k = payload.get('top_k')
+            texts = payload.get('resumes') or []
+            files = []
+        else:
+            job_description = request.form.get('job_description', '').strip()
+            algorithm = request.form.get('algorithm', 'all')
+            weights = {
+                'skills': request.form.get('weight_skills', 0.7),
+                'education': request.form.get('weight_edu', 0.3)
+            }
+            compact = parse_flag(request.form.get('compact', False))
+            candidate_k = request.form.get('candidate_k')
+            top_k = request.form.get('top_k')
+            texts = []
+            files = [f for f in request.files.getlist('resumes') if f.filename]
+        
+        jd_valid, jd_error = validate_job_description(job_description)
+        if not jd_valid:
+            return api_error(jd_error)
+        
+        if not texts and not files:
+            return api_error('Provide at least one resume as a file or text')
+        if len(texts) + len(files) > MAX_FILES:
+            return api_error(f'Too many resumes. Maximum {MAX_FILES} allowed (received {len(texts) + len(files)})')
+        
+        try:
+            weights = {
+                'skills': float(weights.get('skills', 0.7)),
+                'education': float(weights.get('education', 0.3))
+            }
+            candidate_k = int(candidate_k) if candidate_k not in (None, '') else None
+            top_k = int(top_k) if top_k not in (None, '') else None
+        except (TypeError, ValueError, AttributeError):
+            return api_error('Invalid weights, candidate_k or top_k. Please send valid numbers')
+        if candidate_k is not None and candidate_k < 1:
+            return api_error('candidate_k must be at least 1')
+        
+        normalized_weights, weight_error = validate_weights(weights)
+        if not normalized_weights:
+            return api_error(weight_error)
+        
+        clean_jd = text_processor.clean_text(job_description)
+        if not clean_jd or len(clean_jd.strip()) < 10:
+            return api_error('Job description contains no meaningful content after processing')
+        
+        resumes_data = []
+        errors = []
+        for idx, item in enumerate(texts, 1):
+            if isinstance(item, str):
+                item = {'text': item}
+            if not isinstance(item, dict):
+                errors.append(f"Resume {idx}: Expected an object with a text field")
+                continue
+            resume_id = str(item.get('id') or item.get('filename') or f"resume_{idx}")
+            resume, error_msg = prepare_resume(resume_id, item.get('text') or '')
+            if resume:
+                resumes_data.append(resume)
+            else:
+                PARSE_FAILURES.inc(file_type='text')
+                errors.append(f"Resume '{resume_id}': {error_msg}")
+        
+        for idx, file in enumerate(files, 1):
+            is_valid, error_msg = validate_file(file)
+            if not is_valid:
+                errors.append(f"File {idx}: {error_msg}")
+                continue
+            try:
+                filename, filepath = save_upload(file)
+                if not filename:
+                    errors.append(f"File {idx}: Invalid filename")
+                    continue
+                saved_paths.append(filepath)
+                resume, error_msg = prepare_resume(filename, file_parser.extract_text(filepath))
+            except Exception as e:
+                PARSE_FAILURES.inc(file_type=file_type(file.filename))
+                errors.append(f"File '{file.filename}': Error processing - {str(e)}")
+                continue
+            if resume:
+                resumes_data.append(resume)
+            else:
+                PARSE_FAILURES.inc(file_type=file_type(filename))
+                errors.append(f"File '{filename}': {error_msg}")
+        
+        if not resumes_data:
+            return api_error('No valid resumes could be processed', status=422, errors=errors)
+        
+        parsed = time.perf_counter()
+        ranked_results = ranking_engine.rank_resumes(
+            clean_jd, resumes_data, normalized_weights, algorithm, candidate_k=candidate_k,
+            top_k=top_k, explain=0 if compact else None
+        )
+        ranked = time.perf_counter()
+        record_ranking('api', algorithm, len(resumes_data), ranked - started)
+        
+        if compact:
+            results = [{'id': r['filename'], 'score': r['score']} for r in ranked_results]
+        else:
+            results = []
+            for rank, result in enumerate(ranked_results, 1):
+                result['id'] = result.pop('filename')
+                result['rank'] = rank
+                results.append(result)
+        
+        return json_response({
+            'algorithm': algorithm,
+            'count': len(results),
+            'results': results,
+            'errors': errors,
+            'timing_ms': {
+                'parse': round((parsed - started) * 1000, 1),
+                'rank': round((ranked - parsed) * 1000, 1),
+                'total': round((time.perf_counter() - started) * 1000, 1)
+            }
+        })
+    
+    except Exception as e:
+        return api_error(f'Error during ranking: {str(e)}', status=500)
+    finally:
+        for filepath in saved_paths:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+
+
 if __name__ == '__main__':
     # Run the Flask development server when executed directly.
     # Use 127.0.0.1:5000 to keep it local. Set debug=False for predictable behavior.
+    # HTTP/1.1 keeps connections alive so API clients can send many rankings over one.
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
     app.run(host='127.0.0.1', port=5000, debug=False)
@@ -0,0 +1,417 @@
+"""
+Performance Benchmarks
+Run from the application folder, e.g.:
+    python -m evaluation.benchmark embeddings --backends torch int8 onnx
+    python -m evaluation.benchmark ontology --skills 50000
+    python -m evaluation.benchmark memory --resumes 1000
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _embedding_backend_worker(backend, n_sentences, batch_size, queue):
+    """
+    Runs in a fresh process so peak RSS belongs to a single backend.
+    """
+    try:
+        from ai_modules.neural_embeddings import resolve_local_snapshot
+        from ai_modules.embedding_backends import (load_encoder, encode_normalized,
+                                                   REFERENCE_TEXTS, REFERENCE_QUERIES)
+
+        snapshot, reason = resolve_local_snapshot('all-MiniLM-L6-v2')
+        if snapshot is None:
+            queue.put({'backend': backend, 'error': reason})
+            return
+
+        start = time.perf_counter()
+        model = load_encoder(snapshot, backend)
+        load_time = time.perf_counter() - start
+
+        sentences = [REFERENCE_TEXTS[i % len(REFERENCE_TEXTS)] + f" ({i})" for i in range(n_sentences)]
+        encode_normalized(model, sentences[:batch_size], batch_size)  # warm-up
+        start = time.perf_counter()
+        encode_normalized(model, sentences, batch_size)
+        elapsed = time.perf_counter() - start
+
+        queue.put({
+            'backend': backend,
+            'load_time_sec': round(load_time, 2),
+            'sentences_per_sec': round(n_sentences / elapsed, 1),
+            'peak_rss_mb': round(_peak_rss_mb(), 1),
+            'texts': encode_normalized(model, REFERENCE_TEXTS, batch_size),
+            'queries': encode_normalized(model, REFERENCE_QUERIES, batch_size)
+        })
+    except Exception as e:
+        queue.put({'backend': backend, 'error': str(e)})
+
+
+def benchmark_embedding_backends(backends=('torch', 'int8', 'onnx'), n_sentences=512, batch_size=32):
+    """
+    Measures sentences/sec and peak RSS per embedding backend, each in its own process,
+    and the cosine agreement of every backend against fp32 torch.
+    """
+    from ai_modules.embedding_backends import compare_embeddings
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for backend in backends:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_embedding_backend_worker, args=(backend, n_sentences, batch_size, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+
+    reference = next((r for r in results if r['backend'] == 'torch' and 'error' not in r), None)
+    for result in results:
+        if 'error' in result:
+            continue
+        texts, queries = result.pop('texts'), result.pop('queries')
+        if reference is not None and result is not reference:
+            result['calibration'] = compare_embeddings(texts, reference['texts'], queries, reference['queries'])
+    if reference is not None:
+        reference.pop('texts', None)
+        reference.pop('queries', None)
+    return results
+
+
+def _clustered_vectors(n, dim, n_clusters=100, noise=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + noise * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def benchmark_ann(n=100000, dim=384, n_queries=200, k=10, nprobes=(1, 4, 16, 64), nlist=256, m=None):
+    """
+    recall@k against exact search and queries/sec of the IVF-PQ index for each nprobe,
+    with and without exact re-ranking of the shortlisted candidates. m (sub-quantizers)
+    must divide dim; by default it is the largest divisor of dim up to 48.
+    """
+    from ai_modules.ann_index import IVFPQIndex, exact_top_k
+
+    if m is None:
+        m = max(d for d in range(1, min(48, dim) + 1) if dim % d == 0)
+
+    vectors = _clustered_vectors(n, dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, n_queries, replace=False)] + 0.05 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    exact = [set(exact_top_k(vectors, q, k)[0].tolist()) for q in queries]
+    rows = [{'method': 'exact', 'recall_at_k': 1.0, 'qps': round(n_queries / (time.perf_counter() - start), 1)}]
+
+    index = IVFPQIndex(dim, nlist=nlist, m=m)
+    start = time.perf_counter()
+    index.train(vectors)
+    index.add(np.arange(n), vectors)
+    build_time = time.perf_counter() - start
+
+    for nprobe in nprobes:
+        for refine in (None, lambda ids: vectors[ids]):
+            start = time.perf_counter()
+            found = [index.search(q, k, nprobe=nprobe, refine=refine)[0] for q in queries]
+            elapsed = time.perf_counter() - start
+            recall = np.mean([len(exact[i] & set(f.tolist())) / k for i, f in enumerate(found)])
+            rows.append({
+                'method': f"ivfpq nprobe={nprobe}" + (" +refine" if refine else ""),
+                'recall_at_k': round(float(recall), 3),
+                'qps': round(n_queries / elapsed, 1),
+                'build_time_sec': round(build_time, 1)
+            })
+    return rows
+
+
+def _write_synthetic_ontology(path, n_skills, edges_per_skill=3, seed=0):
+    # Preferential attachment: a few hub skills, many leaves, like real taxonomies
+    draws = np.random.default_rng(seed).random((n_skills, edges_per_skill)).tolist()
+    targets = [0]
+    with open(path, 'w') as f:
+        for skill in range(1, n_skills):
+            for parent in {targets[int(u * len(targets))] for u in draws[skill]}:
+                f.write(f"skill {skill},skill {parent}\n")
+                targets.append(parent)
+            targets.append(skill)
+
+
+def benchmark_ontology(n_skills=50000, bfs_depth=3, n_queries=200):
+    """
+    Load time (cold parse vs cached .npz), memory and BFS / lookup latency of a
+    synthetic skill ontology with n_skills nodes.
+    """
+    from ai_modules.skill_ontology import SkillOntology
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'ontology.csv')
+        cache_path = os.path.join(folder, 'ontology.npz')
+        _write_synthetic_ontology(path, n_skills)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        SkillOntology.load(path, cache_path)
+        cold_time = time.perf_counter() - start
+        _, cold_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        SkillOntology.load(path, cache_path)
+        cached_time = time.perf_counter() - start
+
+        # Memory is measured on a separate load since tracing slows allocation down
+        tracemalloc.start()
+        ontology = SkillOntology.load(path, cache_path)
+        resident, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rng = np.random.default_rng(1)
+        sources = rng.integers(0, len(ontology), n_queries)
+        start = time.perf_counter()
+        reached = sum(len(ontology.bfs_distances(int(s), bfs_depth)[0]) for s in sources)
+        bfs_ms = (time.perf_counter() - start) / n_queries * 1000
+
+        text = ' '.join(f"skill {i}" for i in rng.integers(0, len(ontology), 300)) * 3
+        ontology.lookup(text)  # builds the phrase matcher
+        start = time.perf_counter()
+        for _ in range(20):
+            ontology.lookup(text)
+        lookup_ms = (time.perf_counter() - start) / 20 * 1000
+
+        return [{
+            'skills': len(ontology),
+            'edges': ontology.num_edges,
+            'csr_mb': round(ontology.nbytes / 1e6, 2),
+            'resident_mb': round(resident / 1e6, 2),
+            'cold_load_sec': round(cold_time, 3),
+            'cold_peak_mb': round(cold_peak / 1e6, 1),
+            'cached_load_ms': round(cached_time * 1000, 1),
+            f'bfs_depth{bfs_depth}_ms': round(bfs_ms, 3),
+            'avg_reached': int(reached / n_queries),
+            f'lookup_{len(text)}_chars_ms': round(lookup_ms, 2)
+        }]
+
+
+def benchmark_skill_matching(n_skills=(10, 100, 1000, 5000), doc_chars=5000, n_docs=5):
+    """
+    Skill extraction time per document: fuzz.partial_ratio over the whole text for every
+    skill versus FuzzyResumeScorer, shortlisting through the n-gram candidate index
+    (same matches as partial_ratio) and with thorough_matching (index scores only).
+    Counts the partial_ratio matches each one misses and the matches only it finds.
+    """
+    from fuzzywuzzy import fuzz
+    from ai_modules.fuzzy_logic import FuzzyResumeScorer
+
+    rng = np.random.default_rng(0)
+    vocabulary = [''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), rng.integers(3, 12))) for _ in range(20000)]
+    docs = [' '.join(rng.choice(vocabulary, doc_chars // 8))[:doc_chars] for _ in range(n_docs)]
+
+    rows = []
+    for n in n_skills:
+        skills = [' '.join(rng.choice(vocabulary, rng.integers(1, 3))) for _ in range(n)]
+        start = time.perf_counter()
+        reference = [[fuzz.partial_ratio(skill.lower(), doc.lower()) > 80 for skill in skills] for doc in docs]
+        reference_time = time.perf_counter() - start
+
+        row = {'skills': n, 'partial_ratio_ms_per_doc': round(reference_time / n_docs * 1000, 1)}
+        for name, thorough in (('ngram_shortlist', False), ('thorough', True)):
+            scorer = FuzzyResumeScorer(match_threshold=80, thorough_matching=thorough)
+            start = time.perf_counter()
+            found = [scorer._fuzzy_matches(skills, doc) for doc in docs]
+            elapsed = time.perf_counter() - start
+            pairs = [(a, b) for ref, new in zip(reference, found) for a, b in zip(ref, new)]
+            row[f'{name}_ms_per_doc'] = round(elapsed / n_docs * 1000, 1)
+            row[f'{name}_missed'] = sum(a and not b for a, b in pairs)
+            row[f'{name}_extra'] = sum(b and not a for a, b in pairs)
+        rows.append(row)
+    return rows
+
+
+def benchmark_fuzzy_scores(n_resumes=500, job_chars=50000, resume_chars=4000, workers=(1, -1)):
+    """
+    Batch token set ratio: one fuzz.token_set_ratio call per resume versus the batched
+    scorer with cached token sets, single-threaded and on all cores.
+    """
+    from fuzzywuzzy import fuzz
+    from ai_modules.fuzzy_logic import FuzzyResumeScorer, RAPIDFUZZ_AVAILABLE
+
+    rng = np.random.default_rng(0)
+    vocabulary = [''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), rng.integers(2, 10))) for _ in range(5000)]
+    job = ' '.join(rng.choice(vocabulary, job_chars // 6))[:job_chars]
+    resumes = [' '.join(rng.choice(vocabulary, resume_chars // 6))[:resume_chars] for _ in range(n_resumes)]
+
+    start = time.perf_counter()
+    reference = [fuzz.token_set_ratio(job, resume) for resume in resumes]
+    rows = [{'method': 'token_set_ratio loop', 'sec': round(time.perf_counter() - start, 3)}]
+
+    for n_workers in workers:
+        scorer = FuzzyResumeScorer(workers=n_workers)
+        start = time.perf_counter()
+        scores = scorer.calculate_batch_fuzzy_scores(job, resumes)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        scorer.calculate_batch_fuzzy_scores(job, resumes)
+        rows.append({
+            'method': f"batched workers={n_workers}" + ("" if RAPIDFUZZ_AVAILABLE else " (no rapidfuzz)"),
+            'sec': round(cold, 3),
+            'cached_tokens_sec': round(time.perf_counter() - start, 3),
+            'identical': scores == reference
+        })
+    return rows
+
+
+def _synthetic_resume(rng, vocabulary, n_chars, i):
+    words = ' '.join(rng.choice(vocabulary, n_chars // 6))[:n_chars]
+    return f"Candidate {i}\n  candidate{i}@example.com  |  +1 555 010 {i:04d}\n\n{words}\n"
+
+
+def _prepare_resume(engine, filename, raw_text):
+    # The resume dict app.prepare_resume builds for an upload (importing the app would
+    # open its stores and start the model warm-up)
+    from utils.text_processor import TextProcessor
+
+    clean_text = TextProcessor.clean_text(raw_text)
+    return {
+        'filename': filename,
+        'text': clean_text,
+        'email': TextProcessor.extract_email(raw_text),
+        'phone': TextProcessor.extract_phone(raw_text),
+        'education': 'Not Extracted',
+        'minhash': engine.duplicate_index.signature(clean_text)
+    }
+
+
+def benchmark_result_memory(n_resumes=1000, resume_chars=4000, algorithm='cosine'):
+    """
+    Peak traced memory of preparing n_resumes resumes the way an upload does, ranking
+    them and holding the ranked results, scaled to 1,000 resumes. Raw texts are made
+    on the fly, so only what the pipeline keeps of them is counted; results_held is
+    what freeing the resumes and results gives back (retained also counts caches).
+
+    Ranking runs on a private engine whose caches live in a temporary folder, without
+    the score cache, so every run scores every resume and results are reproducible.
+    """
+    from ai_modules.model_registry import _build_default_registry
+    from ai_modules.ranking_engine import RankingEngine
+    from utils.config import Config
+
+    saved = Config.CACHE_FOLDER, Config.SCORE_CACHE_DB
+    with tempfile.TemporaryDirectory() as folder:
+        Config.CACHE_FOLDER, Config.SCORE_CACHE_DB = folder, ''
+        try:
+            return _measure_result_memory(RankingEngine(_build_default_registry()), n_resumes, resume_chars, algorithm)
+        finally:
+            Config.CACHE_FOLDER, Config.SCORE_CACHE_DB = saved
+
+
+def _measure_result_memory(engine, n_resumes, resume_chars, algorithm):
+    rng = np.random.default_rng(0)
+    vocabulary = ['python', 'java', 'flask', 'sql', 'react', 'docker', 'machine', 'learning', 'lead',
+                  'senior', 'developer', 'university', 'project', 'team', 'cloud', 'api'] + \
+        [''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), rng.integers(2, 10))) for _ in range(2000)]
+    job = "Senior python developer with flask, sql, docker and machine learning experience, leading a team"
+    weights = {'skills': 0.7, 'education': 0.3}
+    engine.rank_resumes(job, [_prepare_resume(engine, "warmup.txt", _synthetic_resume(rng, vocabulary, resume_chars, 0))],
+                        dict(weights), algorithm, group_duplicates=False, explain=0, use_cache=False)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    resumes = [_prepare_resume(engine, f"cv{i}.txt", _synthetic_resume(rng, vocabulary, resume_chars, i))
+               for i in range(n_resumes)]
+    prepared = tracemalloc.get_traced_memory()[0]
+    results = engine.rank_resumes(job, resumes, dict(weights), algorithm, group_duplicates=False, explain=0,
+                                  use_cache=False)
+    elapsed = time.perf_counter() - start
+    # Unreachable cycles would otherwise count as retained until the collector happens to run
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    count = len(results)
+    # What the resumes and results hold, apart from the scoring modules' caches
+    del resumes, results
+    held = retained - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    per_1000 = 1000 / n_resumes / 1024 ** 2
+    return [{
+        'resumes': count,
+        'prepared_mb_per_1000': round(prepared * per_1000, 2),
+        'results_held_mb_per_1000': round(held * per_1000, 2),
+        'retained_mb_per_1000': round(retained * per_1000, 2),
+        'peak_mb_per_1000': round(peak * per_1000, 2),
+        'sec': round(elapsed, 2)
+    }]
+
+
+def _print_rows(rows):
+    for row in rows:
+        print("  " + ", ".join(f"{k}={v}" for k, v in row.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Resume Ranker performance benchmarks")
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    emb = sub.add_parser('embeddings', help="embedding backend throughput, peak RSS and fp32 agreement")
+    emb.add_argument('--backends', nargs='+', default=['torch', 'int8', 'onnx'])
+    emb.add_argument('--sentences', type=int, default=512)
+    emb.add_argument('--batch-size', type=int, default=32)
+
+    ann = sub.add_parser('ann', help="ANN index recall@k and queries/sec against exact search")
+    ann.add_argument('--vectors', type=int, default=100000)
+    ann.add_argument('--dim', type=int, default=384)
+    ann.add_argument('--queries', type=int, default=200)
+    ann.add_argument('-k', type=int, default=10)
+    ann.add_argument('--nlist', type=int, default=256)
+    ann.add_argument('--m', type=int, default=None, help="sub-quantizers, a divisor of --dim (default: largest up to 48)")
+
+    onto = sub.add_parser('ontology', help="skill ontology load time, memory and BFS latency")
+    onto.add_argument('--skills', type=int, default=50000)
+    onto.add_argument('--depth', type=int, default=3)
+
+    skills = sub.add_parser('skills', help="fuzzy skill matching time: full-text partial_ratio vs n-gram index")
+    skills.add_argument('--chars', type=int, default=5000)
+
+    fuzzy = sub.add_parser('fuzzy', help="batched token set ratio vs one call per resume")
+    fuzzy.add_argument('--resumes', type=int, default=500)
+
+    memory = sub.add_parser('memory', help="peak memory per 1,000 resumes of preparing, ranking and holding results")
+    memory.add_argument('--resumes', type=int, default=1000)
+    memory.add_argument('--algorithm', default='cosine')
+
+    args = parser.parse_args()
+    if args.benchmark == 'embeddings':
+        print("Embedding backends:")
+        _print_rows(benchmark_embedding_backends(args.backends, args.sentences, args.batch_size))
+    elif args.benchmark == 'ann':
+        if args.m is not None and (args.m < 1 or args.dim % args.m):
+            parser.error(f"--m ({args.m}) must divide --dim ({args.dim})")
+        print(f"ANN index ({args.vectors} vectors, dim={args.dim}, k={args.k}):")
+        _print_rows(benchmark_ann(args.vectors, args.dim, args.queries, args.k, nlist=args.nlist, m=args.m))
+    elif args.benchmark == 'skills':
+        print(f"Fuzzy skill matching ({args.chars}-character documents):")
+        _print_rows(benchmark_skill_matching(doc_chars=args.chars))
+    elif args.benchmark == 'fuzzy':
+        print(f"Fuzzy document scores ({args.resumes} resumes, 50k-character job description):")
+        _print_rows(benchmark_fuzzy_scores(args.resumes))
+    elif args.benchmark == 'memory':
+        print(f"Ranking memory ({args.resumes} resumes, {args.algorithm}):")
+        _print_rows(benchmark_result_memory(args.resumes, algorithm=args.algorithm))
+    elif args.benchmark == 'ontology':
+        print(f"Skill ontology ({args.skills} skills):")
+        _print_rows(benchmark_ontology(args.skills, args.depth))
+
+
+if __name__ == '__main__':
+    main()
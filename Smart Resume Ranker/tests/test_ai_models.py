@@ -1,10 +1,57 @@
+import os
 import unittest
+import tempfile
+import numpy as np
 from ai_modules.genetic_algorithm import GAOptimizer
 from ai_modules.cosine_similarity import CosineSimilarity
 from ai_modules.fuzzy_logic import FuzzyResumeScorer
-from ai_modules.neural_embeddings import NeuralEmbeddingRanker
+from ai_modules.neural_embeddings import NeuralEmbeddingRanker, resolve_local_snapshot
+from ai_modules.embedding_store import EmbeddingStore
+from ai_modules.embedding_backends import calibration_report
+from ai_modules.token_batching import split_windows, plan_batches, pool_chunks
+from ai_modules.ann_index import IVFPQIndex, exact_top_k
+from ai_modules.knowledge_graph import KnowledgeGraphMatcher
+from ai_modules.skill_ontology import SkillOntology, BUILTIN_RELATIONS
+from ai_modules.near_duplicates import NearDuplicateIndex
+from ai_modules.model_registry import ModelRegistry, default_registry, _build_default_registry
+from ai_modules.ranking_engine import RankingEngine
+from ai_modules.ranked_results import RankedResults
+from ai_modules.score_cache import ScoreCache
+from utils.result_store import ResultStore
+from utils.performance_history import PerformanceHistory
+from utils.memory_budget import MemoryBudget, BudgetedCache, approximate_size
+from utils.performance_monitor import PerformanceMonitor
+from utils.telemetry import Telemetry
+from utils.profiling import RequestProfiler, profiling_allowed
+from utils.config import Config
+
+class FakeEncoder:
+    """Deterministic stand-in for a SentenceTransformer"""
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False):
+        self.encoded += len(texts)
+        vectors = np.array([[text.count(chr(97 + i)) + 1.0 for i in range(self.dim)] for text in texts])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
 
 class TestAIModels(unittest.TestCase):
+    def setUp(self):
+        # Components built by a test keep their caches (score cache, ontology, embeddings,
+        # near-duplicate index) in a temporary folder, not the app's cache
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        saved = Config.CACHE_FOLDER, Config.SCORE_CACHE_DB
+        self.addCleanup(setattr, Config, 'SCORE_CACHE_DB', saved[1])
+        self.addCleanup(setattr, Config, 'CACHE_FOLDER', saved[0])
+        Config.CACHE_FOLDER = folder.name
+        Config.SCORE_CACHE_DB = os.path.join(folder.name, 'score_cache.sqlite3')
+        self.registry = _build_default_registry()
 
     def test_genetic_algorithm(self):
         optimizer = GAOptimizer(population_size=10, generations=5, mutation_rate=0.2)
@@ -24,10 +71,574 @@ class TestAIModels(unittest.TestCase):
         self.assertIn("Data Analysis", matched)
         self.assertEqual(len(missing), 0)
 
+    def test_fuzzy_skill_index_finds_skills_in_long_text(self):
+        from fuzzywuzzy import fuzz
+        filler = "Worked on many internal projects and delivered results. " * 60
+        text = filler + "Built REST services in Flask and a Reactt dashboard. " + filler
+        skills = [f"skill {i}" for i in range(2000)] + ["Flask", "React", "Kotlin"]
+        fuzzy = FuzzyResumeScorer(skill_database=skills)
+        reference = {skill for skill in skills if fuzz.partial_ratio(skill.lower(), text.lower()) > 80}
+        self.assertEqual(fuzzy.extract_skills(text), reference)
+        self.assertEqual(fuzzy.match_skills(["flask", "react", "kotlin"], text), (["flask"], ["react", "kotlin"]))
+        self.assertEqual(fuzzy.match_skills(["python", "java", "flask"], "PYTHON developer, JAVA, FLASK"),
+                         (["python", "java", "flask"], []))
+        # partial_ratio only aligns the text's longest common blocks and misses the misspelt
+        # "Reactt"; thorough matching scores every window
+        thorough = FuzzyResumeScorer(skill_database=skills, thorough_matching=True)
+        self.assertEqual(thorough.match_skills(["flask", "react", "kotlin"], text), (["flask", "react"], ["kotlin"]))
+
+    def test_batch_fuzzy_scores_match_token_set_ratio(self):
+        from fuzzywuzzy import fuzz
+        job = "Senior Python developer: Flask, SQL, machine-learning & AI (café project)"
+        resumes = ["python flask sql", "Java, Spring; SQL!", "", "!!!", "AI ai Café PROJECT python", job]
+        scorer = FuzzyResumeScorer(workers=2)
+        expected = [fuzz.token_set_ratio(job, r) if r else 0.0 for r in resumes]
+        self.assertEqual(scorer.calculate_batch_fuzzy_scores(job, resumes), expected)
+        self.assertEqual(scorer.calculate_fuzzy_score(job, resumes[1]), expected[1])
+
     def test_neural_embeddings(self):
         ranker = NeuralEmbeddingRanker()
         score = ranker.get_semantic_score("Software Engineer", "Experienced Software Engineer with Java expertise")
         self.assertGreater(score, 0)
 
+    def test_incomplete_local_snapshot_falls_back(self):
+        with tempfile.TemporaryDirectory() as folder:
+            # A Hugging Face cache whose weights download was interrupted
+            repo = os.path.join(folder, 'models--sentence-transformers--all-MiniLM-L6-v2')
+            os.makedirs(os.path.join(repo, 'refs'))
+            os.makedirs(os.path.join(repo, 'blobs'))
+            os.makedirs(os.path.join(repo, 'snapshots', 'abc123'))
+            with open(os.path.join(repo, 'refs', 'main'), 'w') as f:
+                f.write('abc123')
+            with open(os.path.join(repo, 'blobs', 'f00d.incomplete'), 'wb') as f:
+                f.write(b'partial')
+            os.symlink(os.path.join(repo, 'blobs', 'f00d.incomplete'),
+                       os.path.join(repo, 'snapshots', 'abc123', 'model.safetensors'))
+
+            snapshot, reason = resolve_local_snapshot('all-MiniLM-L6-v2', folder)
+            self.assertIsNone(snapshot)
+            self.assertIn('incomplete', reason)
+            ranker = NeuralEmbeddingRanker(cache_folder=folder, store_folder=os.path.join(folder, 'store'))
+            self.assertIsNone(ranker.model)
+            self.assertEqual(ranker.get_batch_semantic_scores("Software Engineer", ["Java", ""]), [0.0, 0.0])
+
+    def test_embedding_store_persists_rows(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = EmbeddingStore(folder, dim=4, dtype='float32')
+            keys = [EmbeddingStore.content_hash(t) for t in ("a", "b")]
+            rows = store.add_many(keys, np.eye(4)[:2])
+            self.assertEqual(rows.tolist(), [0, 1])
+
+            reopened = EmbeddingStore(folder, dim=4, dtype='float32')
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.get(keys[1]).tolist(), [0, 1, 0, 0])
+            self.assertEqual(reopened.scores([0, 1, 0, 0]).tolist(), [0, 1])
+
+    def test_embedding_store_recovers_from_partial_digest(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = EmbeddingStore(folder, dim=4, dtype='float32')
+            keys = [EmbeddingStore.content_hash(t) for t in ("a", "b", "c", "d")]
+            store.add_many(keys[:2], np.eye(4)[:2])
+            # An append cut short after its vector and part of its digest
+            with open(store.matrix_path, 'ab') as f:
+                f.write(np.eye(4, dtype=np.float32)[3].tobytes())
+            with open(store.index_path, 'ab') as f:
+                f.write(keys[3][:5])
+
+            reopened = EmbeddingStore(folder, dim=4, dtype='float32')
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.add_many(keys[2:], np.eye(4)[2:]).tolist(), [2, 3])
+            reloaded = EmbeddingStore(folder, dim=4, dtype='float32')
+            self.assertEqual(reloaded.lookup(keys).tolist(), [0, 1, 2, 3])
+            for row, key in enumerate(keys):
+                self.assertEqual(reloaded.get(key).tolist(), np.eye(4)[row].tolist())
+
+    def test_neural_scores_reuse_stored_embeddings(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ranker = NeuralEmbeddingRanker(store_folder=folder)
+            ranker._model, ranker._load_attempted = FakeEncoder(), True
+            resumes = ["python data engineer", "graphic designer"]
+            first = ranker.get_batch_semantic_scores("data engineer", resumes)
+            encoded = ranker.model.encoded
+            ranker.get_batch_semantic_scores("designer", resumes)
+            self.assertEqual(ranker.model.encoded, encoded + 1)  # only the new JD
+            self.assertGreater(first[0], first[1])
+
+    def test_ann_top_k_fills_up_sparse_cells(self):
+        rng = np.random.default_rng(0)
+        resumes = ["".join(rng.choice(list("abcdefgh"), 40)) + f" cv{i}" for i in range(300)]
+        with tempfile.TemporaryDirectory() as folder:
+            ranker = NeuralEmbeddingRanker(store_folder=folder, ann_min_train=64, ann_nlist=8, ann_m=4,
+                                           ann_nprobe=1, ann_exact_limit=0)
+            ranker._model, ranker._load_attempted = FakeEncoder(), True
+            hashes, _ = ranker.embed_resumes(resumes)
+            self.assertTrue(ranker.index.is_trained)
+            # One probed cell holds far fewer than k rows (or allowed candidates)
+            for k, candidates in ((100, None), (100, hashes), (10, hashes[:12])):
+                found = ranker.top_k("aaaa bbbb", k, candidates=candidates)
+                self.assertEqual(len(found), k)
+                self.assertEqual(len({h for h, _ in found}), k)
+                scores = [score for _, score in found]
+                self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_calibration_report_identical_backends_agree(self):
+        report = calibration_report(FakeEncoder(), FakeEncoder())
+        self.assertAlmostEqual(report['mean_cosine_agreement'], 1.0, places=3)
+        self.assertEqual(report['max_score_diff'], 0.0)
+
+    def test_token_windows_are_bucketed_and_pooled(self):
+        self.assertEqual(split_windows(list(range(5)), 2), [[0, 1], [2, 3], [4]])
+        batches = plan_batches([250, 10, 240, 12], token_budget=500)
+        self.assertEqual(batches, [[1, 3], [2, 0]])
+        pooled = pool_chunks([[1, 0], [0, 1], [3, 4]], owners=[0, 0, 1], n_docs=3)
+        np.testing.assert_allclose(pooled, [[0.7071, 0.7071], [0.6, 0.8], [0, 0]], atol=1e-4)
+
+    def test_ann_index_insert_delete_and_reload(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(500, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        with tempfile.TemporaryDirectory() as folder:
+            index = IVFPQIndex(16, nlist=8, m=4, nprobe=8, folder=folder)
+            index.train(vectors)
+            index.add(np.arange(500), vectors)
+            ids, _ = index.search(vectors[7], 5, refine=lambda i: vectors[i])
+            self.assertEqual(ids[0], 7)
+            self.assertEqual(set(ids), set(exact_top_k(vectors, vectors[7], 5)[0]))
+
+            index.delete([7])
+            reloaded = IVFPQIndex(16, m=4, folder=folder)
+            self.assertEqual(len(reloaded), 499)
+            self.assertNotIn(7, reloaded.search(vectors[7], 5)[0])
+
+    def test_knowledge_graph_matrix_matches_shortest_paths(self):
+        graph = {}
+        for a, group in BUILTIN_RELATIONS.items():
+            for b in group:
+                graph.setdefault(a, set()).add(b)
+                graph.setdefault(b, set()).add(a)
+
+        def path_length(a, b):
+            seen, frontier, depth = {a}, {a}, 0
+            while frontier:
+                if b in frontier:
+                    return depth
+                frontier = {n for node in frontier for n in graph[node]} - seen
+                seen |= frontier
+                depth += 1
+            return None
+
+        job = "Python developer with Django, pandas and SQL; React is a plus"
+        resumes = ["Flask and numpy projects", "Tableau analysis with SQL", "Vue and node", ""]
+        expected = []
+        for text in resumes:
+            total = 0
+            for a in [node for node in graph if node in job.lower()]:
+                for b in [node for node in graph if node in text.lower()]:
+                    if path_length(a, b) is not None:
+                        total += 1 / (1 + path_length(a, b))
+            expected.append(min(total * 20, 100.0))
+
+        ontology = SkillOntology.from_relations(BUILTIN_RELATIONS)
+        for matcher in (KnowledgeGraphMatcher(ontology=ontology), KnowledgeGraphMatcher(ontology=ontology, dense_limit=0)):
+            batch = matcher.batch_graph_similarity(job, resumes)
+            for i, text in enumerate(resumes):
+                self.assertAlmostEqual(matcher.graph_similarity(job, text), expected[i])
+                self.assertAlmostEqual(batch[i], expected[i])
+
+    def test_skill_ontology_loads_and_caches_csr(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'skills.csv')
+            with open(path, 'w') as f:
+                f.write("# skill,related\nPython,Django\ndjango,REST APIs\npython,django\nsql,postgres\n")
+            cache_path = os.path.join(folder, 'skills.npz')
+            ontology = SkillOntology.load(path, cache_path)
+            self.assertTrue(os.path.exists(cache_path))
+            cached = SkillOntology.load(path, cache_path)
+
+            self.assertEqual(cached.skill_names, ontology.skill_names)
+            self.assertEqual(cached.num_edges, 3)
+            python = cached.skill_ids['python']
+            ids, distances = cached.bfs_distances(python)
+            self.assertEqual(dict(zip(ids.tolist(), distances.tolist())),
+                             {python: 0, cached.skill_ids['django']: 1, cached.skill_ids['rest apis']: 2})
+            self.assertEqual(len(cached.bfs_distances(python, max_depth=1)[0]), 2)
+            self.assertEqual(set(cached.lookup("Built REST APIs in Python")),
+                             {cached.skill_ids['python'], cached.skill_ids['rest apis']})
+
+    def test_skill_lookup_matches_whole_tokens(self):
+        ontology = SkillOntology.from_relations({'c': ['c++', 'c#'], 'r': ['sql'], 'go': ['node.js', 'rest apis']})
+        found = lambda text: {ontology.skill_names[i] for i in ontology.lookup(text)}
+        self.assertEqual(found("Docker, MongoDB and PostgreSQL for our rust services"), set())
+        self.assertEqual(found("Go and R, some C. Also SQL, C++ and C#"), {'go', 'r', 'c', 'sql', 'c++', 'c#'})
+        self.assertEqual(found("Node.js and REST  APIs"), {'node.js', 'rest apis'})
+
+    def test_near_duplicates_grouped_within_and_across_batches(self):
+        rng = np.random.default_rng(0)
+        words = [f"word{i}" for i in range(2000)]
+        cv = " ".join(rng.choice(words, 400))
+        edited = cv.replace(cv.split()[50], "edited", 1) + " references available"
+        other = " ".join(rng.choice(words, 400))
+        with tempfile.TemporaryDirectory() as folder:
+            index = NearDuplicateIndex(folder=folder)
+            representatives, previous = index.group([cv, other, edited], ["a.pdf", "b.pdf", "c.pdf"], owner="s1")
+            self.assertEqual(representatives, [0, 1, 0])
+            self.assertEqual(previous, [None, None, None])
+
+            reloaded = NearDuplicateIndex(folder=folder)
+            self.assertEqual(len(reloaded), 3)
+            _, previous = reloaded.group([edited + " thanks"], ["d.pdf"], owner="s1")
+            self.assertIn(previous[0], ("a.pdf", "c.pdf"))
+            # Other owners never see these labels, and identical re-runs aren't "seen before"
+            _, previous = reloaded.group([edited + " thanks"], ["e.pdf"], owner="s2")
+            self.assertEqual(previous, [None])
+            _, previous = reloaded.group([other], ["b.pdf"], owner="s1")
+            self.assertEqual(previous, [None])
+
+    def test_near_duplicates_leave_short_texts_apart(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index = NearDuplicateIndex(folder=folder)
+            texts = ["", "---", "Python", "Java", "•••"]
+            representatives, previous = index.group(texts, [f"{i}.pdf" for i in range(5)], owner="s1")
+            self.assertEqual(representatives, [0, 1, 2, 3, 4])
+            self.assertEqual(len(index), 2)
+            _, previous = index.group(["***", "Kotlin"], ["x.pdf", "y.pdf"], owner="s1")
+            self.assertEqual(previous, [None, None])
+
+    def test_near_duplicate_index_expires_and_caps_documents(self):
+        rng = np.random.default_rng(1)
+        words = [f"word{i}" for i in range(2000)]
+        texts = [" ".join(rng.choice(words, 200)) for _ in range(12)]
+        with tempfile.TemporaryDirectory() as folder:
+            index = NearDuplicateIndex(folder=folder, max_entries=10)
+            index.group(texts, [f"{i}.pdf" for i in range(12)], owner="s1")
+            self.assertEqual(len(index), 9)
+            self.assertEqual(len(NearDuplicateIndex(folder=folder)), 9)
+
+            # Back-date the first five documents by eight days
+            labels_path = os.path.join(folder, 'labels.txt')
+            with open(labels_path, encoding='utf-8') as f:
+                lines = f.read().split('\n')[:-1]
+            lines = ['0' + line[line.index('\t'):] for line in lines[:5]] + lines[5:]
+            with open(labels_path, 'w', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in lines))
+            self.assertEqual(len(NearDuplicateIndex(folder=folder, retention_days=7)), 4)
+            self.assertEqual(len(NearDuplicateIndex(folder=folder)), 4)
+
+    def test_result_store_pages_and_keeps_convergence_once(self):
+        convergence = {'fitness_history': [0.5, 0.7], 'convergence_rate': 0.2}
+        results = [{'filename': f"cv{i}.pdf", 'score': np.float64(90 - i), 'convergence_data': convergence}
+                   for i in range(5)]
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultStore(os.path.join(folder, 'results.sqlite3'))
+            run_id = store.save_run(results, 'all', metrics={'quality': {}}, accuracy=91.5)
+
+            run = store.get_run(run_id)
+            self.assertEqual(run['resumes_count'], 5)
+            self.assertEqual(run['convergence_data'], convergence)
+            page = store.get_results(run_id, offset=2, limit=2)
+            self.assertEqual([r['filename'] for r in page], ["cv2.pdf", "cv3.pdf"])
+            self.assertNotIn('convergence_data', page[0])
+            self.assertEqual(store.get_scores(run_id), [90, 89, 88, 87, 86])
+            self.assertEqual(len(list(store.iter_results(run_id, batch_size=2))), 5)
+            self.assertIsNone(store.get_run('missing'))
+
+    def test_request_profiles_are_token_gated_and_stored(self):
+        import pstats
+        token = Config.PROFILE_TOKEN
+        try:
+            Config.PROFILE_TOKEN = ''
+            self.assertFalse(profiling_allowed(''))
+            Config.PROFILE_TOKEN = 'short'
+            self.assertFalse(profiling_allowed('short'))
+            Config.PROFILE_TOKEN = 'a-long-enough-admin-token'
+            self.assertFalse(profiling_allowed('a-long-enough-admin-tokeN'))
+            self.assertTrue(profiling_allowed('a-long-enough-admin-token'))
+        finally:
+            Config.PROFILE_TOKEN = token
+
+        profiler = RequestProfiler(interval_ms=1).start()
+        RankingEngine(self.registry).rank_resumes("python developer with sql", [{'filename': 'cv.txt', 'text': 'python sql developer'}],
+                                     {'skills': 0.7, 'education': 0.3}, 'cosine', group_duplicates=False, use_cache=False)
+        collapsed, pstats_data = profiler.stop()
+        self.assertIn('rank_resumes', collapsed)
+        stack, count = collapsed.splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(int(count) >= 1 and ';' in stack)
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultStore(os.path.join(folder, 'results.sqlite3'))
+            store.save_profile('run', collapsed, pstats_data)
+            self.assertEqual(store.get_profile('run', 'collapsed').decode('utf-8'), collapsed)
+            path = os.path.join(folder, 'run.pstats')
+            with open(path, 'wb') as f:
+                f.write(store.get_profile('run', 'pstats'))
+            functions = {name for _, _, name in pstats.Stats(path).stats}
+            self.assertIn('match_persona', functions)
+            self.assertIsNone(store.get_profile('missing', 'pstats'))
+
+    def test_performance_history_flags_slow_runs(self):
+        def metrics(seconds, hits=0, misses=10):
+            return {'performance': {'execution_time_sec': seconds}, 'quality': {'algorithm': 'all', 'resumes_processed': 10},
+                    'score_cache': {'run_hits': hits, 'run_misses': misses},
+                    'stages': [{'stage': 'persona', 'total_sec': seconds / 2}]}
+
+        with tempfile.TemporaryDirectory() as folder:
+            history = PerformanceHistory(os.path.join(folder, 'history.sqlite3'), capacity=8, baseline_runs=5)
+            for i in range(6):
+                self.assertFalse(history.record(f"run{i}", metrics(1.0 + i * 0.01))['regression'])
+            # Cached runs are compared with cached runs only
+            self.assertIsNone(history.record('cached', metrics(0.1, hits=10, misses=0))['baseline_ms'])
+            slow = history.record('slow', metrics(2.0))
+            self.assertTrue(slow['regression'])
+            self.assertEqual(slow['slowdown'], 1.94)
+            self.assertEqual(history.get('slow')['stages'], {'persona': 1.0})
+
+            history.record('last', metrics(1.0))
+            records = history.records()
+            self.assertEqual(len(records), 8)
+            self.assertEqual(records[0]['run_id'], 'run1')
+            summary = history.summary()
+            self.assertEqual(summary['algorithms'][0]['runs'], 8)
+            self.assertEqual(summary['algorithms'][0]['p99_sec'], round(float(np.percentile([r['execution_time_sec'] for r in records], 99)), 3))
+            self.assertEqual([r['run_id'] for r in summary['regressions']], ['slow'])
+
+    def test_ranked_results_build_result_dicts(self):
+        convergence = {'fitness_history': [0.5, 0.7]}
+        results = RankedResults(['skills', 'gap'], ['a.pdf', 'b.pdf'], [91.5, 80.0], [[1.0, 2.0], [3.0, 4.0]],
+                                duplicates=[['a copy.pdf'], []], texts=['text a', 'text b'],
+                                convergence_data=convergence)
+        results.set_explanation(0, {'matched_skills': ['python'], 'missing_skills': [], 'scores': {}})
+        self.assertEqual(results[0]['duplicates'], ['a copy.pdf'])
+        self.assertNotIn('text', results[0])
+        self.assertEqual(results[-1]['raw_scores'], {'skills': 3.0, 'gap': 4.0})
+        self.assertEqual(results[1]['text'], 'text b')
+        self.assertEqual([r['score'] for r in results], [91.5, 80.0])
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultStore(os.path.join(folder, 'results.sqlite3'))
+            run_id = store.save_run(results, 'all', convergence_data=results.convergence_data)
+            self.assertEqual(store.get_run(run_id)['convergence_data'], convergence)
+            self.assertEqual(store.get_score_matrix(run_id)['rows'], [[1.0, 2.0], [3.0, 4.0]])
+
+    def test_score_cache_tiers_and_versions(self):
+        entry = {'scores': [50.0] * 9, 'missing_skills': ['docker'], 'ensemble_details': None}
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'scores.sqlite3')
+            cache = ScoreCache(path, memory_bytes=500)
+            keys = [ScoreCache.key("job", f"resume {i}", 'standard', 'v1') for i in range(3)]
+            cache.put_many({key: entry for key in keys}, 'v1')
+            # Only two entries (serialized, with their keys) fit in memory; the oldest one comes back from disk
+            self.assertEqual(cache.get_stats()['memory_entries'], 2)
+            self.assertEqual(cache.get_many(keys, 'v1')[keys[0]], entry)
+            stats = cache.get_stats()
+            self.assertEqual((stats['memory_hits'], stats['disk_hits'], stats['misses']), (2, 1, 0))
+
+            reopened = ScoreCache(path)
+            self.assertEqual(len(reopened.get_many(keys, 'v1')), 3)
+            self.assertEqual(reopened.get_many([ScoreCache.key("job", "resume 0", 'standard', 'v2')], 'v2'), {})
+            self.assertEqual(reopened.get_stats()['disk_entries'], 0)
+
+    def test_memory_budget_evicts_cheapest_entries_first(self):
+        budget = MemoryBudget(limit_bytes=1000)
+        cheap = BudgetedCache('cheap', budget=budget)
+        costly = BudgetedCache('costly', budget=budget)
+        costly.put('a', 'x', cost=1.0, size=400)
+        cheap.put('b', 'y', cost=0.001, size=400)
+        costly.put('c', 'z', cost=1.0, size=400)
+        # Over budget: the cheap entry goes although the costly one is older
+        self.assertEqual((len(cheap), len(costly)), (0, 2))
+        self.assertEqual(budget.used_bytes, 800 + approximate_size('a') + approximate_size('c'))
+        self.assertEqual(costly.get_or_build('d', lambda key: key.upper()), 'D')
+        self.assertEqual(costly.get('d'), 'D')
+        stats = budget.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['caches']['costly']['hits'], 1)
+
+        # Keys count too (fuzzy caches are keyed by whole resume texts), and dropped caches hand their bytes back
+        budget = MemoryBudget(limit_bytes=10 ** 6)
+        kept, texts = BudgetedCache('kept', budget=budget), BudgetedCache('texts', budget=budget)
+        kept.put('a', 'x', size=100)
+        texts.put('resume text ' * 50, 1.0)
+        self.assertGreater(texts.nbytes, 600)
+        self.assertEqual(budget.used_bytes, kept.nbytes + texts.nbytes)
+        del texts
+        self.assertEqual(budget.used_bytes, kept.nbytes)
+
+    def test_performance_monitors_are_isolated_per_thread(self):
+        import threading
+        import tracemalloc
+        barrier = threading.Barrier(2)
+        reports = {}
+
+        def run(name, mode):
+            monitor = PerformanceMonitor(mode=mode, deep_sample_rate=1.0)
+            monitor.start_monitoring()
+            barrier.wait()
+            reports[name] = (PerformanceMonitor.current() is monitor, monitor.traced)
+            barrier.wait()
+            monitor.stop_monitoring()
+            reports[name] += (monitor.get_metrics_report()['performance'], PerformanceMonitor.current())
+
+        threads = [threading.Thread(target=run, args=('deep', 'deep')),
+                   threading.Thread(target=run, args=('off', 'off'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(reports['deep'][0] and reports['off'][0])
+        self.assertTrue(reports['deep'][1])
+        self.assertFalse(tracemalloc.is_tracing())
+        deep, off = reports['deep'][2], reports['off'][2]
+        self.assertTrue(deep['memory_sampled'] and deep['concurrent'])
+        self.assertIsNotNone(deep['cpu_time_sec'])
+        self.assertIsNone(off['cpu_time_sec'])
+        self.assertIsNone(off['peak_memory_mb'])
+        self.assertIsNone(reports['deep'][3])
+        with self.assertRaises(ValueError):
+            PerformanceMonitor(mode='verbose')
+
+    def test_telemetry_adds_up_thread_shards(self):
+        import threading
+        telemetry = Telemetry()
+        requests = telemetry.counter('requests_total', 'Requests')
+        latency = telemetry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        telemetry.collect('queue_depth', 'Queued jobs', lambda: {(('status', 'queued'),): 3})
+
+        def record():
+            for value in (0.05, 0.5, 5.0):
+                requests.inc(endpoint='rank "x"')
+                latency.observe(value, endpoint='rank')
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        text = telemetry.render()
+        self.assertIn('requests_total{endpoint="rank \\"x\\""} 12', text)
+        self.assertIn('latency_seconds_bucket{endpoint="rank",le="0.1"} 4', text)
+        self.assertIn('latency_seconds_bucket{endpoint="rank",le="1.0"} 8', text)
+        self.assertIn('latency_seconds_bucket{endpoint="rank",le="+Inf"} 12', text)
+        self.assertIn('latency_seconds_count{endpoint="rank"} 12', text)
+        self.assertIn('# TYPE queue_depth gauge\nqueue_depth{status="queued"} 3', text)
+        # Finished threads were folded into one retired shard
+        self.assertEqual(len(telemetry._shards), 0)
+
+    def test_rank_resumes_reports_progress(self):
+        events = []
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python developer sql react {'flask ' * i}project lead"}
+                   for i in range(4)]
+        results = RankingEngine(self.registry).rank_resumes(
+            "python developer with sql and react", resumes, {'skills': 0.7, 'education': 0.3}, 'cosine',
+            group_duplicates=False, progress=lambda stage, done, total, top=None: events.append((stage, done, top))
+        )
+        stages = [stage for stage, _, _ in events]
+        self.assertEqual(stages[-1], 'normalized')
+        self.assertIn('fuzzy', stages)
+        _, done, top = [event for event in events if event[0] == 'scoring'][-1]
+        self.assertEqual(done, 4)
+        self.assertEqual(top[0], (results[0]['filename'], results[0]['score']))
+
+    def test_ga_ranking_keeps_caller_weights(self):
+        weights = {'skills': 0.7, 'education': 0.3}
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python developer sql {'react ' * i}project lead"}
+                   for i in range(3)]
+        results = RankingEngine(self.registry).rank_resumes("python developer with sql", resumes, weights, 'ga',
+                                               group_duplicates=False, use_cache=False)
+        self.assertEqual(weights, {'skills': 0.7, 'education': 0.3})
+        self.assertIn('convergence_history', results.convergence_data)
+        self.assertNotEqual(results.weights, weights)
+
+    def test_rank_resumes_records_stage_spans(self):
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python developer sql {'react ' * i}project lead"}
+                   for i in range(3)]
+        for mode in ('cheap', 'off'):
+            monitor = PerformanceMonitor(mode=mode)
+            monitor.start_monitoring()
+            RankingEngine(self.registry).rank_resumes("python developer with sql", resumes, {'skills': 0.7, 'education': 0.3},
+                                         'cosine', group_duplicates=False, use_cache=False)
+            monitor.stop_monitoring()
+            stages = {stage['stage']: stage for stage in monitor.get_metrics_report()['stages']}
+            if mode == 'cheap':
+                self.assertEqual(stages['persona']['count'], 3)
+                self.assertEqual(stages['explanation']['count'], 3)
+                self.assertIn('normalize', stages)
+                self.assertLessEqual(stages['persona']['max_ms'], stages['persona']['total_sec'] * 1000)
+            else:
+                self.assertEqual(stages, {})
+
+    def test_rerank_matches_full_ranking(self):
+        engine = RankingEngine(self.registry)
+        job = "python developer with sql and react"
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python {'sql ' * i}react {'java ' * (3 - i)}team lead"}
+                   for i in range(4)]
+        ranked = engine.rank_resumes(job, [dict(r) for r in resumes], {'skills': 0.7, 'education': 0.3},
+                                     'cosine', group_duplicates=False)
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultStore(os.path.join(folder, 'results.sqlite3'))
+            score_matrix = store.get_score_matrix(store.save_run(ranked, 'cosine'))
+
+        new_weights = {'skills': 0.2, 'education': 0.8}
+        expected = engine.rank_resumes(job, [dict(r) for r in resumes], dict(new_weights), 'cosine',
+                                       group_duplicates=False)
+        scores = engine.rerank(score_matrix, new_weights, 'cosine')
+        reranked = sorted(zip(score_matrix['filenames'], scores), key=lambda item: -item[1])
+        self.assertEqual([(name, round(score, 1)) for name, score in reranked],
+                         [(r['filename'], r['score']) for r in expected])
+
+    def test_top_k_matches_full_sort(self):
+        scores = np.random.default_rng(0).integers(0, 20, 500) / 2.0
+        full = sorted(range(len(scores)), key=lambda i: round(scores[i], 1), reverse=True)
+        for k in (1, 7, 100, 500, 600):
+            self.assertEqual(RankingEngine._top_order(scores, k).tolist(), full[:k])
+
+    def test_lazy_explanations_match_eager_ones(self):
+        engine = RankingEngine(self.registry)
+        job = "python developer with sql, flask and docker"
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python {'sql ' * i}react flask developer"} for i in range(5)]
+        eager = engine.rank_resumes(job, [dict(r) for r in resumes], {'skills': 0.7, 'education': 0.3},
+                                    'cosine', group_duplicates=False)
+        lazy = engine.rank_resumes(job, [dict(r) for r in resumes], {'skills': 0.7, 'education': 0.3},
+                                   'cosine', group_duplicates=False, top_k=3, explain=1)
+        self.assertEqual(len(lazy), 3)
+        self.assertIn('matched_skills', lazy[0])
+        self.assertEqual(set(lazy[1]), {'filename', 'score', 'email', 'phone', 'duplicates',
+                                        'previously_seen', 'raw_scores', 'text'})
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultStore(os.path.join(folder, 'results.sqlite3'))
+            run_id = store.save_run(lazy, 'cosine', job_description=job)
+            score_matrix = store.get_score_matrix(run_id)
+            norm = engine.normalized_scores(score_matrix)
+            pending = store.get_results(run_id, offset=1, with_text=True)
+            store.update_results(run_id, [
+                engine.explain(r, job, r['text'], engine.score_breakdown(norm, r['rank'] - 1), 'cosine')
+                for r in pending
+            ])
+            explained = store.get_results(run_id, offset=1)
+        for result, expected in zip(explained, eager[1:3]):
+            self.assertEqual(result['filename'], expected['filename'])
+            self.assertEqual(sorted(result['missing_skills']), sorted(expected['missing_skills']))
+            self.assertEqual(result['matched_skills'], expected['matched_skills'])
+
+    def test_model_registry_shares_components(self):
+        registry = ModelRegistry()
+        registry.register('ga', GAOptimizer)
+        self.assertFalse(registry.is_loaded('ga'))
+        self.assertIs(registry.get('ga'), registry.get('ga'))
+        self.assertTrue(registry.get_stats()['ga']['loaded'])
+
+        engine = RankingEngine()
+        self.assertIs(engine.ensemble_system.neural_ranker, engine.neural_ranker)
+        self.assertIs(engine.ensemble_system.graph_matcher, default_registry.get('knowledge_graph'))
+
+    def test_lexical_algorithms_skip_neural_and_knowledge(self):
+        engine = RankingEngine(self.registry)
+        resumes = [{'filename': f"cv{i}.txt", 'text': f"python {'sql ' * i}react developer"} for i in range(3)]
+        for algorithm in ('cosine', 'fuzzy', 'ga'):
+            results = engine.rank_resumes("python developer with sql", [dict(r) for r in resumes],
+                                          {'skills': 0.7, 'education': 0.3}, algorithm, group_duplicates=False)
+            self.assertEqual({r['scores']['neural'] for r in results} | {r['scores']['knowledge'] for r in results}, {0})
+        self.assertFalse(self.registry.is_loaded('neural'))
+        self.assertFalse(self.registry.is_loaded('knowledge_graph'))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
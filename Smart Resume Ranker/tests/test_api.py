@@ -0,0 +1,110 @@
+import io
+import os
+import gzip
+import json
+import tempfile
+import unittest
+from unittest import mock
+from ai_modules.model_registry import _build_default_registry
+from ai_modules.ranking_engine import RankingEngine
+from utils.config import Config
+
+JOB = "Python developer with SQL, Flask and React experience to build data products"
+RESUMES = [f"python developer sql {'flask ' * i}react project lead, candidate {i}" for i in range(4)]
+
+app_module = None
+_cache_folder = None
+_saved_config = {}
+
+
+def setUpModule():
+    # The app creates its stores on import, so they are pointed at a temporary folder first
+    global app_module, _cache_folder
+    _cache_folder = tempfile.TemporaryDirectory()
+    for name, filename in (('RESULTS_DB', 'results.sqlite3'), ('SCORE_CACHE_DB', 'score_cache.sqlite3'),
+                           ('PERFORMANCE_HISTORY_DB', 'performance_history.sqlite3'), ('CACHE_FOLDER', None)):
+        _saved_config[name] = getattr(Config, name)
+        setattr(Config, name, os.path.join(_cache_folder.name, filename) if filename else _cache_folder.name)
+    import app as app_module
+    app_module.ranking_engine = RankingEngine(_build_default_registry())
+
+
+def tearDownModule():
+    for name, value in _saved_config.items():
+        setattr(Config, name, value)
+    _cache_folder.cleanup()
+
+
+class TestRankAPI(unittest.TestCase):
+    def setUp(self):
+        uploads = tempfile.TemporaryDirectory()
+        self.addCleanup(uploads.cleanup)
+        self.uploads = uploads.name
+        saved = app_module.app.config['UPLOAD_FOLDER']
+        self.addCleanup(app_module.app.config.__setitem__, 'UPLOAD_FOLDER', saved)
+        app_module.app.config['UPLOAD_FOLDER'] = self.uploads
+        self.client = app_module.app.test_client()
+
+    def test_json_request_ranks_texts(self):
+        response = self.client.post('/api/rank', json={
+            'job_description': JOB, 'algorithm': 'cosine',
+            'resumes': [{'id': f"cv{i}", 'text': text} for i, text in enumerate(RESUMES)] + [{'id': 'empty', 'text': ''}]
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['count'], 4)
+        self.assertEqual([r['rank'] for r in body['results']], [1, 2, 3, 4])
+        self.assertIn('matched_skills', body['results'][0])
+        self.assertEqual(len(body['errors']), 1)
+
+    def test_multipart_request_reports_failing_files_and_keeps_no_uploads(self):
+        extract_text = app_module.file_parser.extract_text
+
+        def fail_on_broken(path):
+            if 'broken' in path:
+                raise ValueError("unreadable")
+            return extract_text(path)
+
+        files = [(io.BytesIO(text.encode('utf-8')), f"cv{i}.txt") for i, text in enumerate(RESUMES)]
+        files.append((io.BytesIO(b"not really a resume"), "broken.txt"))
+        with mock.patch.object(app_module.file_parser, 'extract_text', side_effect=fail_on_broken):
+            response = self.client.post('/api/rank', data={
+                'job_description': JOB, 'algorithm': 'cosine', 'resumes': files
+            }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['count'], 4)
+        self.assertEqual(len(body['errors']), 1)
+        self.assertIn('broken.txt', body['errors'][0])
+        self.assertEqual(os.listdir(self.uploads), [])
+
+    def test_compact_response_carries_ids_and_scores(self):
+        response = self.client.post('/api/rank', json={
+            'job_description': JOB, 'algorithm': 'cosine', 'compact': True, 'top_k': 2, 'resumes': RESUMES
+        })
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual([set(r) for r in results], [{'id', 'score'}] * 2)
+        self.assertGreaterEqual(results[0]['score'], results[1]['score'])
+
+    def test_candidate_k_below_one_is_rejected(self):
+        for candidate_k in (0, -3):
+            response = self.client.post('/api/rank', json={
+                'job_description': JOB, 'algorithm': 'cosine', 'candidate_k': candidate_k, 'resumes': RESUMES
+            })
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('candidate_k', response.get_json()['error'])
+
+    def test_large_responses_are_gzipped_when_accepted(self):
+        request = {'job_description': JOB, 'algorithm': 'cosine', 'resumes': RESUMES}
+        plain = self.client.post('/api/rank', json=request)
+        self.assertIsNone(plain.headers.get('Content-Encoding'))
+        compressed = self.client.post('/api/rank', json=request, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers.get('Content-Encoding'), 'gzip')
+        body = json.loads(gzip.decompress(compressed.get_data()))
+        self.assertEqual([r['id'] for r in body['results']], [r['id'] for r in plain.get_json()['results']])
+
+
+if __name__ == "__main__":
+    unittest.main()
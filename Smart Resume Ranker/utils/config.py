@@ -1,9 +1,61 @@
+import os
+
 class Config:
     # Upload Settings
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
 
+    # Persistent caches (embeddings, indexes, stores)
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    CACHE_FOLDER = os.environ.get('SRR_CACHE_FOLDER', os.path.join(BASE_DIR, 'cache'))
+
+    # Server-side store of ranking runs (only the run id is kept in the session)
+    RESULTS_DB = os.environ.get('SRR_RESULTS_DB', os.path.join(CACHE_FOLDER, 'results.sqlite3'))
+    RESULT_RETENTION_DAYS = int(os.environ.get('SRR_RESULT_RETENTION_DAYS', 7))
+    RESULTS_PER_PAGE = 25
+
+    # Raw module scores per (job description, resume, scoring mode): in-memory LRU in front of
+    # a SQLite file (SRR_SCORE_CACHE_DB='' keeps the cache in memory only)
+    SCORE_CACHE_DB = os.environ.get('SRR_SCORE_CACHE_DB', os.path.join(CACHE_FOLDER, 'score_cache.sqlite3'))
+    SCORE_CACHE_MEMORY_MB = float(os.environ.get('SRR_SCORE_CACHE_MEMORY_MB', 32))
+    SCORE_CACHE_DISK_MB = float(os.environ.get('SRR_SCORE_CACHE_DISK_MB', 256))
+
+    # Process-wide budget shared by all in-memory caches (cheapest to recompute evicted first)
+    MEMORY_BUDGET_MB = float(os.environ.get('SRR_MEMORY_BUDGET_MB', 512))
+
+    # Performance monitoring per ranking run: 'off' (wall time only), 'cheap' (wall/CPU time and
+    # RSS deltas) or 'deep' (cheap, plus tracemalloc on a sampled fraction of runs)
+    PERFORMANCE_MODE = os.environ.get('SRR_PERF_MODE', 'cheap')
+    PERFORMANCE_DEEP_SAMPLE_RATE = float(os.environ.get('SRR_PERF_DEEP_SAMPLE_RATE', 0.1))
+
+    # Admin token that switches on profiling for one ranking request (X-Profile-Token header or
+    # profile_token field); unset, or shorter than 16 characters, disables profiling
+    PROFILE_TOKEN = os.environ.get('SRR_PROFILE_TOKEN', '')
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('SRR_PROFILE_SAMPLE_INTERVAL_MS', 5))
+
+    # Ring buffer of the latest runs' performance records. A run is flagged as a regression when
+    # its per-resume cost exceeds PERFORMANCE_REGRESSION_FACTOR x the median of the trailing
+    # PERFORMANCE_BASELINE_RUNS comparable runs
+    PERFORMANCE_HISTORY_DB = os.environ.get('SRR_PERF_HISTORY_DB', os.path.join(CACHE_FOLDER, 'performance_history.sqlite3'))
+    PERFORMANCE_HISTORY_SIZE = int(os.environ.get('SRR_PERF_HISTORY_SIZE', 500))
+    PERFORMANCE_REGRESSION_FACTOR = float(os.environ.get('SRR_PERF_REGRESSION_FACTOR', 1.5))
+    PERFORMANCE_BASELINE_RUNS = int(os.environ.get('SRR_PERF_BASELINE_RUNS', 20))
+
+    # Skill ontology edge list (skill,related_skill per line); built-in relations when missing
+    SKILL_ONTOLOGY_PATH = os.environ.get('SRR_SKILL_ONTOLOGY', os.path.join(BASE_DIR, 'data', 'skill_ontology.csv'))
+
+    # Estimated Jaccard similarity (word shingles) above which resumes count as near-duplicates
+    NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('SRR_NEAR_DUPLICATE_THRESHOLD', 0.8))
+    # Resumes kept for recognising earlier uploads (per session, for RESULT_RETENTION_DAYS)
+    NEAR_DUPLICATE_MAX_ENTRIES = int(os.environ.get('SRR_NEAR_DUPLICATE_MAX_ENTRIES', 100000))
+
+    # Neural embeddings inference backend: 'torch' (fp32), 'int8' or 'onnx'
+    NEURAL_BACKEND = os.environ.get('SRR_NEURAL_BACKEND', 'torch')
+    # Texts per encode() batch, and CPU threads for inference (unset leaves the library default)
+    NEURAL_BATCH_SIZE = int(os.environ.get('SRR_NEURAL_BATCH_SIZE', 32))
+    NEURAL_NUM_THREADS = int(os.environ['SRR_NEURAL_NUM_THREADS']) if os.environ.get('SRR_NEURAL_NUM_THREADS') else None
+
     # Algorithm Defaults
     DEFAULT_WEIGHTS = {
         'skills': 0.4,
@@ -0,0 +1,250 @@
+import sys
+import time
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from utils.config import Config
+
+
+def approximate_size(value, _depth=0, _seen=None):
+    """
+    Approximate bytes held by a cached value: numpy buffers, an object's own `nbytes`
+    estimate, strings and containers (recursively, a few levels deep), and the
+    attributes of plain objects. Objects referenced more than once are counted once.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    if isinstance(getattr(value, 'nbytes', None), int):
+        # Objects that know their size skip the (slower) recursive walk
+        return sys.getsizeof(value) + value.nbytes
+    size = sys.getsizeof(value)
+    if _depth >= 4 or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        return size + sum(approximate_size(k, _depth + 1, _seen) + approximate_size(v, _depth + 1, _seen)
+                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item, _depth + 1, _seen) for item in value)
+    if hasattr(value, '__dict__'):
+        return size + approximate_size(vars(value), _depth + 1, _seen)
+    return size
+
+
+class MemoryBudget:
+    """
+    Process-wide byte budget shared by the in-memory caches (see BudgetedCache).
+
+    Every cache entry carries its approximate size and the cost of recomputing it
+    (seconds). When the caches together exceed the budget, entries are evicted across
+    all caches: of the least recently used entry of every cache, the one that is
+    cheapest to recompute per byte goes first.
+
+    Caches report their size changes as they happen, so the budget keeps a running
+    total; its lock is only taken for that accounting and for evictions, never for
+    cache lookups.
+    """
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.evictions = 0
+        # Caches drop out once they are garbage collected; their bytes are queued in
+        # _released without locking (see BudgetedCache.__del__)
+        self._caches = weakref.WeakSet()
+        self._released = []
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def register(self, cache):
+        with self._lock:
+            self._caches.add(cache)
+
+    @property
+    def used_bytes(self):
+        with self._lock:
+            self._collect_released()
+            return self._used
+
+    def _collect_released(self):
+        # Caller holds the lock
+        while self._released:
+            self._used -= self._released.pop()
+
+    def charge(self, delta):
+        """
+        Accounts a change in the bytes held by a cache; evicts when over budget.
+        """
+        if not delta:
+            return
+        with self._lock:
+            self._collect_released()
+            self._used += delta
+            if delta > 0 and self._used > self.limit_bytes:
+                self._enforce()
+
+    def enforce(self):
+        """
+        Evicts entries until the caches fit the budget again.
+        """
+        with self._lock:
+            self._enforce()
+
+    def _enforce(self):
+        # Caller holds the budget lock; cache locks are only ever taken inside it, never around it
+        self._collect_released()
+        caches = list(self._caches)
+        while self._used > self.limit_bytes:
+            victim = None
+            for cache in caches:
+                candidate = cache._oldest_cost()
+                if candidate is not None and (victim is None or candidate < victim[0]):
+                    victim = candidate, cache
+            if victim is None:
+                return
+            self._used -= victim[1]._evict_oldest()
+            self.evictions += 1
+
+    def get_stats(self):
+        """
+        Budget usage and the entries, size, hits and evictions of every cache (caches
+        sharing a name are added up).
+        """
+        with self._lock:
+            all_caches = list(self._caches)
+        caches = {}
+        for cache in all_caches:
+            stats = cache.get_stats()
+            total = caches.setdefault(cache.name, dict.fromkeys(stats, 0))
+            for key, value in stats.items():
+                total[key] += value
+        for stats in caches.values():
+            stats['mb'] = round(stats['mb'], 2)
+        return {
+            'limit_mb': round(self.limit_bytes / (1024 * 1024), 1),
+            'used_mb': round(self.used_bytes / (1024 * 1024), 2),
+            'evictions': self.evictions,
+            'caches': dict(sorted(caches.items()))
+        }
+
+
+class BudgetedCache:
+    """
+    Thread-safe LRU cache whose entries (keys and values) count against a MemoryBudget.
+    max_entries and max_bytes optionally bound this cache on its own as well.
+    """
+    def __init__(self, name, max_entries=None, max_bytes=None, budget=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.budget = budget if budget is not None else default_budget
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.budget.register(self)
+
+    def __del__(self):
+        # Garbage collection may run while any lock is held, so only queue the bytes
+        if self.nbytes:
+            self.budget._released.append(self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counts['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value, cost=0.0, size=None):
+        """
+        Stores a value; cost is the time (seconds) it took to compute, size the value's
+        size when known. The key's size is added, as long texts are used as keys.
+        """
+        size = (approximate_size(value) if size is None else size) + approximate_size(key)
+        with self._lock:
+            before = self.nbytes
+            self._discard(key)
+            if self.max_bytes is None or size <= self.max_bytes:
+                self._entries[key] = (value, size, cost)
+                self.nbytes += size
+                while len(self._entries) > 1 and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                                  (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                    self._evict_oldest(lock=False)
+            delta = self.nbytes - before
+        self.budget.charge(delta)
+        return value
+
+    def get_or_build(self, key, build):
+        """
+        The cached value for key, or build(key), timed and stored.
+        """
+        value = self.get(key)
+        if value is None:
+            start = time.perf_counter()
+            value = build(key)
+            self.put(key, value, cost=time.perf_counter() - start)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._discard(key)
+        if entry is None:
+            return None
+        self.budget.charge(-entry[1])
+        return entry[0]
+
+    def clear(self):
+        with self._lock:
+            freed = self.nbytes
+            self._entries.clear()
+            self.nbytes = 0
+        self.budget.charge(-freed)
+
+    def _discard(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+        return entry
+
+    def _oldest_cost(self):
+        # Recompute cost per byte of the least recently used entry
+        with self._lock:
+            if not self._entries:
+                return None
+            _, size, cost = next(iter(self._entries.values()))
+            return cost / max(size, 1)
+
+    def _evict_oldest(self, lock=True):
+        # Bytes freed; with lock=False the caller holds the cache lock and charges the budget
+        if lock:
+            with self._lock:
+                return self._evict_oldest(lock=False)
+        if not self._entries:
+            return 0
+        _, (_, size, _) = self._entries.popitem(last=False)
+        self.nbytes -= size
+        self._counts['evictions'] += 1
+        return size
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats['entries'] = len(self._entries)
+            stats['mb'] = round(self.nbytes / (1024 * 1024), 2)
+            return stats
+
+
+default_budget = MemoryBudget(int(Config.MEMORY_BUDGET_MB * 1024 * 1024))
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# Fewer comparable runs than this give no baseline, so early runs are never flagged
+MIN_BASELINE_RUNS = 5
+
+
+class PerformanceHistory:
+    """
+    Performance records of the latest ranking runs (resumes, algorithm, time per stage,
+    memory, score cache hits), kept as a ring buffer of `capacity` slots in a local
+    SQLite file so they outlive sessions and restarts.
+
+    A run is flagged as a regression when its per-resume cost exceeds regression_factor
+    times the median of the trailing baseline_runs comparable runs: same algorithm and
+    same score cache warmth, since mostly cached runs are far cheaper than fresh ones.
+    """
+    def __init__(self, path, capacity=500, regression_factor=1.5, baseline_runs=20):
+        self.path = path
+        self.capacity = capacity
+        self.regression_factor = regression_factor
+        self.baseline_runs = baseline_runs
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    slot INTEGER PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    run_id TEXT,
+                    algorithm TEXT NOT NULL,
+                    warm INTEGER NOT NULL,
+                    per_resume_ms REAL NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS history_seq ON history (seq);
+                CREATE INDEX IF NOT EXISTS history_run_id ON history (run_id);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, run_id, metrics):
+        """
+        Adds the record of a run from its metrics report (see
+        PerformanceMonitor.get_metrics_report) and returns it, with its baseline
+        ('baseline_ms', None until enough comparable runs exist) and 'regression' flag.
+        """
+        performance = metrics['performance']
+        resumes = metrics['quality']['resumes_processed']
+        cache = metrics.get('score_cache') or {}
+        hits, misses = cache.get('run_hits', 0), cache.get('run_misses', 0)
+        per_resume_ms = performance['execution_time_sec'] / max(resumes, 1) * 1000
+        record = {
+            'run_id': run_id,
+            'created_at': time.time(),
+            'algorithm': metrics['quality']['algorithm'],
+            'resumes': resumes,
+            'execution_time_sec': performance['execution_time_sec'],
+            'per_resume_ms': round(per_resume_ms, 3),
+            'cpu_time_sec': performance.get('cpu_time_sec'),
+            'peak_memory_mb': performance.get('peak_memory_mb'),
+            'rss_delta_mb': performance.get('rss_delta_mb'),
+            'cache_hits': hits,
+            'cache_misses': misses,
+            'warm_cache': hits > misses,
+            'stages': {stage['stage']: stage['total_sec'] for stage in metrics.get('stages', [])}
+        }
+
+        with self._lock, self._connect() as conn:
+            trailing = [row[0] for row in conn.execute(
+                "SELECT per_resume_ms FROM history WHERE algorithm = ? AND warm = ? ORDER BY seq DESC LIMIT ?",
+                (record['algorithm'], int(record['warm_cache']), self.baseline_runs)
+            )]
+            baseline = float(np.median(trailing)) if len(trailing) >= MIN_BASELINE_RUNS else None
+            record['baseline_ms'] = round(baseline, 3) if baseline is not None else None
+            record['slowdown'] = round(per_resume_ms / baseline, 2) if baseline else None
+            record['regression'] = bool(baseline) and per_resume_ms > self.regression_factor * baseline
+
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM history").fetchone()[0]
+            record['seq'] = seq
+            conn.execute(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (seq % self.capacity, seq, run_id, record['algorithm'], int(record['warm_cache']),
+                 per_resume_ms, json.dumps(record))
+            )
+            # Slots beyond a capacity that was lowered since
+            conn.execute("DELETE FROM history WHERE seq <= ?", (seq - self.capacity,))
+        return record
+
+    def get(self, run_id):
+        """
+        The record of a run, or None when it isn't (or no longer) in the history.
+        """
+        if not run_id:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM history WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self):
+        """
+        All records, oldest first.
+        """
+        with self._connect() as conn:
+            return [json.loads(row[0]) for row in conn.execute("SELECT data FROM history ORDER BY seq")]
+
+    def summary(self, trend_runs=50, recent_regressions=10):
+        """
+        Per algorithm: p50/p95/p99 run latency, per-resume cost percentiles, regression
+        count and the per-resume cost of its latest trend_runs runs ([seq, ms, flagged]);
+        plus the latest flagged runs, newest first.
+        """
+        by_algorithm = {}
+        for record in self.records():
+            by_algorithm.setdefault(record['algorithm'], []).append(record)
+
+        algorithms = []
+        for algorithm, records in sorted(by_algorithm.items()):
+            latency = np.percentile([r['execution_time_sec'] for r in records], [50, 95, 99])
+            per_resume = np.percentile([r['per_resume_ms'] for r in records], [50, 95])
+            algorithms.append({
+                'algorithm': algorithm,
+                'runs': len(records),
+                'p50_sec': round(float(latency[0]), 3),
+                'p95_sec': round(float(latency[1]), 3),
+                'p99_sec': round(float(latency[2]), 3),
+                'per_resume_p50_ms': round(float(per_resume[0]), 2),
+                'per_resume_p95_ms': round(float(per_resume[1]), 2),
+                'regressions': sum(r['regression'] for r in records),
+                'trend': [[r['seq'], r['per_resume_ms'], r['regression']] for r in records[-trend_runs:]]
+            })
+
+        flagged = [r for records in by_algorithm.values() for r in records if r['regression']]
+        flagged.sort(key=lambda r: -r['seq'])
+        return {
+            'runs': sum(len(records) for records in by_algorithm.values()),
+            'capacity': self.capacity,
+            'regression_factor': self.regression_factor,
+            'algorithms': algorithms,
+            'regressions': flagged[:recent_regressions]
+        }
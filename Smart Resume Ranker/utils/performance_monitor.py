@@ -1,49 +1,218 @@
 import time
+import random
+import threading
+import contextvars
 import psutil
 import tracemalloc
 from functools import wraps
+from utils.config import Config
+from utils.telemetry import default_telemetry
+
+MODES = ('off', 'cheap', 'deep')
+
+# Monitor of the ranking run in the current context (request or job thread)
+_current = contextvars.ContextVar('performance_monitor', default=None)
+
+# Stage calls range from microseconds (per-resume modules) to seconds (batched models)
+STAGE_SECONDS = default_telemetry.histogram(
+    'srr_stage_duration_seconds', 'Duration of one call of a ranking stage',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# tracemalloc is process-wide, so at most one run is traced at a time
+_deep_lock = threading.Lock()
+_runs_lock = threading.Lock()
+_runs = {'active': 0, 'started': 0}
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class _Span:
+    __slots__ = ('spans', 'stage', 'start')
+
+    def __init__(self, spans, stage):
+        self.spans = spans
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.spans.record(self.stage, elapsed)
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class StageTimings:
+    """
+    Count, total and maximum time of every stage of one ranking run.
+    """
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+
+    def report(self, execution_time=0):
+        """
+        [{stage, count, total_sec, avg_ms, max_ms, share}], slowest stage first; share
+        is the percentage of execution_time.
+        """
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: -item[1][1])
+        return [{
+            'stage': stage,
+            'count': count,
+            'total_sec': round(total, 4),
+            'avg_ms': round(total / count * 1000, 3),
+            'max_ms': round(longest * 1000, 3),
+            'share': round(total / execution_time * 100, 1) if execution_time else 0.0
+        } for stage, (count, total, longest) in stages]
+
+
+def span(stage):
+    """
+    Times a block as one call of a stage of the current ranking run:
+
+        with span('persona'):
+            ...
+
+    A no-op outside a monitored run or when monitoring is off. Nested spans each count
+    their full duration, so the stages of a breakdown can overlap.
+    """
+    monitor = _current.get()
+    if monitor is None or monitor.stages is None:
+        return _NULL_SPAN
+    return _Span(monitor.stages, stage)
+
 
 class PerformanceMonitor:
     """
     Monitor performance metrics: accuracy, execution time, and memory usage
+
+    Modes (Config.PERFORMANCE_MODE): 'off' measures wall time only, 'cheap' adds the
+    thread's CPU time and the process RSS delta, and 'deep' additionally traces Python
+    allocations with tracemalloc on a sampled fraction of runs (deep_sample_rate).
     """
-    def __init__(self):
+    def __init__(self, mode=None, deep_sample_rate=None):
+        self.mode = mode or Config.PERFORMANCE_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown performance mode '{self.mode}', expected one of {', '.join(MODES)}")
+        self.deep_sample_rate = Config.PERFORMANCE_DEEP_SAMPLE_RATE if deep_sample_rate is None else deep_sample_rate
+        self.traced = False
+        self.running = False
+        self._token = None
+        # Per-stage timings (see span), not collected when monitoring is off
+        self.stages = StageTimings() if self.mode != 'off' else None
         self.metrics = {
             'execution_time': 0,
-            'memory_used_mb': 0,
-            'peak_memory_mb': 0,
+            'cpu_time': None,
+            'rss_delta_mb': None,
+            'memory_used_mb': None,
+            'peak_memory_mb': None,
             'accuracy_score': 0,
             'algorithm_used': '',
             'resumes_processed': 0,
-            'start_memory': 0,
-            'end_memory': 0,
+            'start_memory': None,
+            'end_memory': None,
+            'concurrent': False,
             'accuracy_type': 'estimated',  # 'estimated' or 'tested'
             'tested_metrics': None
         }
-        
+
+    @staticmethod
+    def current():
+        """The monitor started in the current context, or None"""
+        return _current.get()
+
     def start_monitoring(self):
-        """Start tracking memory and time"""
-        tracemalloc.start()
-        self.start_time = time.time()
-        self.start_memory = psutil.Process().memory_info().rss / (1024 * 1024)  # MB
-        
+        """Start tracking time (and memory, depending on the mode)"""
+        self.running = True
+        with _runs_lock:
+            _runs['active'] += 1
+            _runs['started'] += 1
+            self._started = _runs['started']
+            self.metrics['concurrent'] = _runs['active'] > 1
+
+        # Only a sampled run that gets the (free) tracer is traced; the rest measure cheaply
+        self.traced = (self.mode == 'deep' and random.random() < self.deep_sample_rate
+                       and _deep_lock.acquire(blocking=False))
+        if self.traced and tracemalloc.is_tracing():
+            # Someone else (e.g. a benchmark) owns the tracer
+            _deep_lock.release()
+            self.traced = False
+        if self.traced:
+            tracemalloc.start()
+
+        self._token = _current.set(self)
+        if self.mode != 'off':
+            self.start_memory = _rss_mb()
+            self.start_cpu = time.thread_time()
+        self.start_time = time.perf_counter()
+
     def stop_monitoring(self):
         """Stop tracking and calculate metrics"""
-        self.end_time = time.time()
-        self.end_memory = psutil.Process().memory_info().rss / (1024 * 1024)  # MB
-        
-        # Execution time
+        if not self.running:
+            return self.metrics
+        self.running = False
+        self.end_time = time.perf_counter()
         self.metrics['execution_time'] = round(self.end_time - self.start_time, 3)
-        
-        # Memory usage
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        
-        self.metrics['memory_used_mb'] = round(current / (1024 * 1024), 2)
-        self.metrics['peak_memory_mb'] = round(peak / (1024 * 1024), 2)
-        self.metrics['start_memory'] = round(self.start_memory, 2)
-        self.metrics['end_memory'] = round(self.end_memory, 2)
-        
+
+        if self.mode != 'off':
+            self.metrics['cpu_time'] = round(time.thread_time() - self.start_cpu, 3)
+            self.end_memory = _rss_mb()
+            self.metrics['start_memory'] = round(self.start_memory, 2)
+            self.metrics['end_memory'] = round(self.end_memory, 2)
+            self.metrics['rss_delta_mb'] = round(self.end_memory - self.start_memory, 2)
+
+        if self.traced:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _deep_lock.release()
+            self.traced = False
+            self.metrics['memory_used_mb'] = round(current / (1024 * 1024), 2)
+            self.metrics['peak_memory_mb'] = round(peak / (1024 * 1024), 2)
+
+        with _runs_lock:
+            _runs['active'] -= 1
+            # Allocations and RSS are process-wide: flag runs that overlapped another one
+            if _runs['started'] != self._started:
+                self.metrics['concurrent'] = True
+
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Stopped from another context than it was started in
+                pass
+            self._token = None
+
         return self.metrics
     
     def calculate_accuracy(self, ranked_results):
@@ -159,7 +328,12 @@ class PerformanceMonitor:
         
         return {
             'performance': {
+                'mode': self.mode,
                 'execution_time_sec': self.metrics['execution_time'],
+                'cpu_time_sec': self.metrics['cpu_time'],
+                'rss_delta_mb': self.metrics['rss_delta_mb'],
+                'memory_sampled': self.metrics['peak_memory_mb'] is not None,
+                'concurrent': self.metrics['concurrent'],
                 'memory_used_mb': self.metrics['memory_used_mb'],
                 'peak_memory_mb': self.metrics['peak_memory_mb'],
                 'start_memory_mb': self.metrics['start_memory'],
@@ -177,6 +351,8 @@ class PerformanceMonitor:
                 'algorithm': self.metrics['algorithm_used'],
                 'resumes_processed': self.metrics['resumes_processed']
             },
+            # Time per ranking stage, slowest first (empty when monitoring is off)
+            'stages': self.stages.report(self.metrics['execution_time']) if self.stages is not None else [],
             'complexity': {
                 'time_complexity': time_complexity,
                 'space_complexity': space_complexity,
@@ -186,11 +362,17 @@ class PerformanceMonitor:
             },
             'summary': {
                 'status': 'Optimal' if self.metrics['execution_time'] < 3 else 'Good' if self.metrics['execution_time'] < 5 else 'Slow',
-                'memory_status': 'Efficient' if self.metrics['peak_memory_mb'] < 100 else 'Normal' if self.metrics['peak_memory_mb'] < 200 else 'High',
+                'memory_status': self._memory_status(),
                 'quality_status': 'Excellent' if self.metrics['accuracy_score'] >= 95 else 'Very Good' if self.metrics['accuracy_score'] >= 90 else 'Good'
             }
         }
 
+    def _memory_status(self):
+        peak = self.metrics['peak_memory_mb']
+        if peak is None:
+            return 'Not Sampled'
+        return 'Efficient' if peak < 100 else 'Normal' if peak < 200 else 'High'
+
 
 def monitor_performance(func):
     """Decorator to monitor function performance"""
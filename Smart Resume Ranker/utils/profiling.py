@@ -0,0 +1,96 @@
+import os
+import sys
+import hmac
+import marshal
+import cProfile
+import threading
+from collections import Counter
+from utils.config import Config
+
+# Shorter tokens are ignored, so profiling can't be switched on with a guessable value
+PROFILE_TOKEN_MIN_LENGTH = 16
+
+
+def profiling_allowed(token):
+    """
+    Whether a request's token matches the configured admin profiling token.
+    Always False while SRR_PROFILE_TOKEN is unset or too short.
+    """
+    expected = Config.PROFILE_TOKEN
+    if not token or len(expected) < PROFILE_TOKEN_MIN_LENGTH:
+        return False
+    return hmac.compare_digest(str(token).encode('utf-8'), expected.encode('utf-8'))
+
+
+def _frame_label(code):
+    # Semicolons separate frames in the collapsed format
+    filename = code.co_filename
+    if os.path.isabs(filename):
+        relative = os.path.relpath(filename)
+        # Library frames keep their package folder rather than a long ../.. path
+        filename = relative if not relative.startswith('..') else os.path.join(
+            os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class RequestProfiler:
+    """
+    Profiles the calling thread between start() and stop(): deterministically with
+    cProfile (pstats) and by sampling its stack every interval_ms from a helper thread
+    (collapsed stacks, one `frame;frame;... count` line per stack, root first, as read
+    by flamegraph.pl and speedscope).
+    """
+    def __init__(self, interval_ms=None):
+        self.interval = (Config.PROFILE_SAMPLE_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+        self.samples = Counter()
+        self._profile = None
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._result = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Another profiler already runs in this thread; the samples are still taken
+            print(f"Deterministic profiling unavailable: {str(e)}")
+            self._profile = None
+        self._sampler = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def _sample(self):
+        labels = {}
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """
+        Stops profiling; returns (collapsed stacks text, marshalled pstats data or None).
+        """
+        if self._result is not None:
+            return self._result
+        if self._profile is not None:
+            self._profile.disable()
+        self._stopped.set()
+        self._sampler.join()
+        collapsed = ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+        pstats_data = None
+        if self._profile is not None:
+            # The format pstats.Stats(path) loads, as written by Profile.dump_stats
+            self._profile.create_stats()
+            pstats_data = marshal.dumps(self._profile.stats)
+        self._result = collapsed, pstats_data
+        return self._result
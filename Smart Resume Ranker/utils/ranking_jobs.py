@@ -0,0 +1,99 @@
+import time
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RankingJobs:
+    """
+    Runs ranking jobs on background threads and buffers their progress events,
+    so a request can return immediately and clients can follow the job (e.g. over SSE).
+
+    A job is a function taking a `report(event)` callable; every event is a dict that
+    gets a sequential 'id'. The job's return value becomes its result.
+    """
+    def __init__(self, max_workers=2, keep_seconds=3600):
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ranking-job')
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def submit(self, target):
+        """
+        Queues target(report) and returns the job id.
+        """
+        self._prune()
+        job_id = secrets.token_urlsafe(12)
+        with self._changed:
+            self._jobs[job_id] = {
+                'status': 'queued', 'events': [], 'result': None, 'error': None,
+                'created_at': time.time(), 'finished_at': None
+            }
+        self._executor.submit(self._run, job_id, target)
+        return job_id
+
+    def _run(self, job_id, target):
+        self._update(job_id, status='running')
+        try:
+            result = target(lambda event: self._update(job_id, event=event))
+        except Exception as e:
+            print(f"Ranking job {job_id} failed: {str(e)}")
+            self._update(job_id, event={'stage': 'error', 'message': str(e)},
+                         status='error', error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, event={'stage': 'done'},
+                         status='done', result=result, finished_at=time.time())
+
+    def _update(self, job_id, event=None, **fields):
+        # Final events and the final status change together, so followers never see one without the other
+        with self._changed:
+            job = self._jobs[job_id]
+            if event is not None:
+                job['events'].append(dict(event, id=len(job['events']) + 1))
+            job.update(fields)
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        """
+        Status, result and error of a job, or None for an unknown job.
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: job[key] for key in ('status', 'result', 'error')}
+
+    def events(self, job_id, after=0, timeout=15):
+        """
+        Events with an id above `after`, waiting up to timeout seconds for new ones.
+        Returns (events, finished); events is None for an unknown job.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None, True
+                finished = job['status'] in ('done', 'error')
+                new = job['events'][after:]
+                remaining = deadline - time.monotonic()
+                if new or finished or remaining <= 0:
+                    return new, finished
+                self._changed.wait(remaining)
+
+    def counts(self):
+        """
+        Number of jobs per status ('queued', 'running', 'done', 'error').
+        """
+        with self._changed:
+            counts = dict.fromkeys(('queued', 'running', 'done', 'error'), 0)
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        with self._changed:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['finished_at'] and job['finished_at'] < cutoff]:
+                del self._jobs[job_id]
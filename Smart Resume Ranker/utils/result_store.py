@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import zlib
+import secrets
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+
+
+def to_json(value):
+    # Ranking results may carry numpy scalars/arrays from the scoring modules
+    def default(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return json.dumps(value, default=default)
+
+
+class ResultStore:
+    """
+    Server-side storage of ranking runs in a local SQLite database.
+
+    A run (algorithm, metrics, accuracy, GA convergence data, ...) is stored once and
+    its ranked results one row each, so pages of results can be read without loading
+    the whole run. Only the run id needs to live in the user's session.
+    """
+    def __init__(self, path, retention_days=7):
+        self.path = path
+        self.retention_days = retention_days
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    algorithm TEXT,
+                    accuracy REAL,
+                    resumes_count INTEGER,
+                    metrics TEXT,
+                    algorithm_scores TEXT,
+                    convergence_data TEXT,
+                    score_matrix TEXT,
+                    job_description TEXT
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    run_id TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    filename TEXT,
+                    score REAL,
+                    data TEXT NOT NULL,
+                    text BLOB,
+                    PRIMARY KEY (run_id, rank)
+                );
+                CREATE TABLE IF NOT EXISTS profiles (
+                    id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    collapsed BLOB,
+                    pstats BLOB
+                );
+                CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+            """)
+            # Databases created before raw module scores, job descriptions and resume texts were kept
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(runs)")}
+            if 'score_matrix' not in columns:
+                conn.execute("ALTER TABLE runs ADD COLUMN score_matrix TEXT")
+            if 'job_description' not in columns:
+                conn.execute("ALTER TABLE runs ADD COLUMN job_description TEXT")
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(results)")}
+            if 'text' not in columns:
+                conn.execute("ALTER TABLE results ADD COLUMN text BLOB")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the store safe across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_run(self, ranked_results, algorithm, metrics=None, accuracy=None, algorithm_scores=None,
+                 convergence_data=None, weights=None, job_description=None):
+        """
+        Stores a ranking run and returns its id.
+        Convergence data is kept once per run instead of on every result, and the raw
+        per-module scores of the results ('raw_scores') as one matrix, for re-ranking.
+        A result's 'text' (kept for results explained later, against the run's
+        job_description) is stored compressed next to it.
+        """
+        run_id = secrets.token_urlsafe(16)
+        modules = None
+        matrix = []
+        rows = []
+        for rank, result in enumerate(ranked_results, 1):
+            result = dict(result)
+            result.pop('rank', None)
+            convergence_data = result.pop('convergence_data', None) or convergence_data
+            text = result.pop('text', None)
+            raw_scores = result.pop('raw_scores', None)
+            if raw_scores is not None:
+                modules = modules or list(raw_scores)
+                matrix.append([float(raw_scores[module]) for module in modules])
+            rows.append((run_id, rank, result.get('filename'), result.get('score'), to_json(result),
+                         zlib.compress(text.encode('utf-8')) if text is not None else None))
+
+        score_matrix = None
+        if modules and len(matrix) == len(rows):
+            score_matrix = {'modules': modules, 'rows': matrix, 'weights': weights}
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs (id, created_at, algorithm, accuracy, resumes_count, metrics, "
+                "algorithm_scores, convergence_data, score_matrix, job_description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, time.time(), algorithm, accuracy, len(rows), to_json(metrics),
+                 to_json(algorithm_scores), to_json(convergence_data), score_matrix and to_json(score_matrix),
+                 job_description)
+            )
+            conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.prune()
+        return run_id
+
+    def get_run(self, run_id):
+        """
+        Run-level data (without the results), or None when the run does not exist.
+        """
+        if not run_id:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run.pop('score_matrix')
+        for key in ('metrics', 'algorithm_scores', 'convergence_data'):
+            run[key] = json.loads(run[key]) if run[key] else None
+        return run
+
+    def get_results(self, run_id, offset=0, limit=None, with_text=False):
+        """
+        Results of a run in rank order, each with its 'rank'; offset/limit select a page.
+        with_text adds the stored 'text' of results that have one.
+        """
+        columns = "rank, data, text" if with_text else "rank, data"
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {columns} FROM results WHERE run_id = ? AND rank > ? ORDER BY rank LIMIT ?",
+                (run_id, offset, -1 if limit is None else limit)
+            ).fetchall()
+        results = []
+        for row in rows:
+            result = json.loads(row['data'])
+            result['rank'] = row['rank']
+            if with_text and row['text'] is not None:
+                result['text'] = zlib.decompress(row['text']).decode('utf-8')
+            results.append(result)
+        return results
+
+    def iter_pages(self, run_id, batch_size=500, with_text=False):
+        """
+        Yields the results of a run page by page without holding them all in memory.
+        """
+        offset = 0
+        while True:
+            page = self.get_results(run_id, offset, batch_size, with_text)
+            if not page:
+                return
+            yield page
+            offset += len(page)
+
+    def iter_results(self, run_id, batch_size=500, with_text=False):
+        for page in self.iter_pages(run_id, batch_size, with_text):
+            yield from page
+
+    def update_results(self, run_id, results):
+        """
+        Rewrites the data of results (identified by their 'rank'), e.g. once they are
+        explained; texts are kept.
+        """
+        rows = []
+        for result in results:
+            result = dict(result)
+            rank = result.pop('rank')
+            result.pop('text', None)
+            rows.append((to_json(result), result.get('score'), run_id, rank))
+        with self._connect() as conn:
+            conn.executemany("UPDATE results SET data = ?, score = ? WHERE run_id = ? AND rank = ?", rows)
+
+    def get_score_matrix(self, run_id):
+        """
+        Raw per-module scores of a run in rank order: {'modules', 'rows', 'weights',
+        'filenames'}, or None when the run has none.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT score_matrix FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None or not row['score_matrix']:
+                return None
+            filenames = conn.execute("SELECT filename FROM results WHERE run_id = ? ORDER BY rank", (run_id,)).fetchall()
+        score_matrix = json.loads(row['score_matrix'])
+        score_matrix['filenames'] = [r['filename'] for r in filenames]
+        return score_matrix
+
+    def get_scores(self, run_id):
+        """
+        Final scores of a run in rank order.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT score FROM results WHERE run_id = ? ORDER BY rank", (run_id,)).fetchall()
+        return [row['score'] for row in rows]
+
+    def save_profile(self, profile_id, collapsed, pstats_data=None):
+        """
+        Stores the profile of a ranking request under its run id (or another id, for
+        requests that store no run): collapsed stacks text and marshalled pstats data.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)",
+                (profile_id, time.time(), zlib.compress(collapsed.encode('utf-8')),
+                 zlib.compress(pstats_data) if pstats_data is not None else None)
+            )
+
+    def get_profile(self, profile_id, kind):
+        """
+        A stored profile as bytes, kind being 'collapsed' or 'pstats'; None when missing.
+        """
+        if kind not in ('collapsed', 'pstats'):
+            raise ValueError(f"Unknown profile kind '{kind}'")
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {kind} FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        if row is None or row[kind] is None:
+            return None
+        return zlib.decompress(row[kind])
+
+    def prune(self):
+        """
+        Deletes runs older than the retention period.
+        """
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE run_id IN (SELECT id FROM runs WHERE created_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM runs WHERE created_at < ?", (cutoff,))
+            conn.execute("DELETE FROM profiles WHERE created_at < ?", (cutoff,))
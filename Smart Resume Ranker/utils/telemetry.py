@@ -0,0 +1,185 @@
+import bisect
+import threading
+
+# Upper bounds (seconds) of the default latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, telemetry, name, help_text):
+        self.telemetry = telemetry
+        self.name = name
+        self.help_text = help_text
+
+    def inc(self, amount=1, **labels):
+        counters = self.telemetry._shard()[0]
+        key = (self.name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + amount
+
+
+class Histogram:
+    """Fixed-bucket histogram (count per bucket, sum and count), optionally split by labels"""
+    kind = 'histogram'
+
+    def __init__(self, telemetry, name, help_text, buckets=LATENCY_BUCKETS):
+        self.telemetry = telemetry
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        histograms = self.telemetry._shard()[1]
+        key = (self.name, tuple(sorted(labels.items())))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Per-bucket (not cumulative) counts, the last one for values above every bound, then the sum
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+
+class Collected:
+    """
+    Values read when scraped: callback() returns a number, or a dict mapping label
+    tuples ((name, value), ...) to numbers. kind is 'gauge', or 'counter' for
+    monotonic totals kept elsewhere (e.g. cache hit counts).
+    """
+    def __init__(self, telemetry, name, help_text, callback, kind='gauge'):
+        self.telemetry = telemetry
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.kind = kind
+
+
+class Telemetry:
+    """
+    Process-wide counters, histograms and collected values, exposed in the Prometheus text format.
+
+    Every thread records into its own shard, so recording takes no lock; a scrape adds
+    the shards up. Shards of finished threads are folded into one retired shard.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._retired = ({}, {})
+        # Taken when a thread gets its shard and while scraping, never while recording
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and type(existing) is type(metric):
+                if isinstance(metric, Collected):
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(self, name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help_text, buckets))
+
+    def collect(self, name, help_text, callback, kind='gauge'):
+        return self._register(Collected(self, name, help_text, callback, kind))
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > 64:
+                    self._fold_finished()
+        return shard
+
+    def _fold_finished(self):
+        # Caller holds the lock; finished threads no longer write to their shards
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = alive
+
+    @staticmethod
+    def _merge(totals, shard):
+        counters, histograms = totals
+        for key, value in list(shard[0].items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, values in list(shard[1].items()):
+            values = list(values)
+            current = histograms.get(key)
+            histograms[key] = values if current is None else [a + b for a, b in zip(current, values)]
+
+    def snapshot(self):
+        """
+        ({(name, labels): count}, {(name, labels): [bucket counts..., sum]}) over all threads.
+        """
+        with self._lock:
+            self._fold_finished()
+            totals = ({}, {})
+            self._merge(totals, self._retired)
+            for _, shard in self._shards:
+                self._merge(totals, shard)
+        return totals
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        counters, histograms = self.snapshot()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Counter):
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric.name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            elif isinstance(metric, Histogram):
+                for (name, labels), values in sorted(histograms.items()):
+                    if name != metric.name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), values):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(float(bound)))])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(values[-1]))}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+            else:
+                try:
+                    value = metric.callback()
+                except Exception as e:
+                    print(f"Telemetry collector {metric.name} failed: {str(e)}")
+                    continue
+                samples = value.items() if isinstance(value, dict) else [((), value)]
+                for labels, sample in sorted(samples):
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(sample)}")
+        return '\n'.join(lines) + '\n'
+
+
+default_telemetry = Telemetry()